@@ -1,19 +1,57 @@
 from django.contrib import admin
-from .models import Category, Item, Transaction
+from .admin_tables import LargeTableAdmin
+from .models import Category, Item, Job, StockMovement, Transaction
+from .sharding import ADMIN_SHARD_VAR, shards, tenant_db
+
+class ShardedAdminMixin:
+    """Change lists of sharded models, with links to browse the other shards."""
+    change_list_template = 'admin/dashboard/change_list.html'
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'shards': shards(), 'current_shard': tenant_db(), 'shard_var': ADMIN_SHARD_VAR}
+        return super().changelist_view(request, extra_context)
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(ShardedAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'created_at')
     search_fields = ('name',)
+    autocomplete_fields = ('user',)
 
 @admin.register(Item)
-class ItemAdmin(admin.ModelAdmin):
-    list_display = ('SN', 'name', 'category', 'stock', 'price')
+class ItemAdmin(ShardedAdminMixin, LargeTableAdmin):
+    list_display = ('serial', 'name', 'category', 'stock', 'price')
+    list_select_related = ('category',)
     list_filter = ('category',)
-    search_fields = ('SN', 'name')
+    search_fields = ('sn', 'name')
+    item_search_lookup = 'pk'
+    autocomplete_fields = ('user', 'category')
+
+    @admin.display(description='SN', ordering='sn')
+    def serial(self, obj):
+        return obj.sn
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(ShardedAdminMixin, LargeTableAdmin):
     list_display = ('id', 'item', 'amount', 'created_at')
+    list_select_related = ('item',)
     list_filter = ('created_at',)
     search_fields = ('item__name',)
+    item_search_lookup = 'item_id'
+    autocomplete_fields = ('item', 'user')
+
+@admin.register(StockMovement)
+class StockMovementAdmin(ShardedAdminMixin, LargeTableAdmin):
+    list_display = ('item', 'kind', 'quantity', 'stock_after', 'created_at')
+    list_select_related = ('item',)
+    list_filter = ('kind',)
+    search_fields = ('item__name',)
+    item_search_lookup = 'item_id'
+    autocomplete_fields = ('item', 'transaction')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'user', 'status', 'attempts', 'progress_done', 'created_at', 'finished_at')
+    list_select_related = ('user',)
+    list_filter = ('status', 'task')
+    readonly_fields = ('created_at', 'started_at', 'heartbeat_at', 'finished_at')
+    autocomplete_fields = ('user',)
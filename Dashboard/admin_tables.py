@@ -0,0 +1,193 @@
+"""Admin change lists that stay fast on tables with millions of rows.
+
+The stock ModelAdmin change list runs COUNT(*) over the filtered rows and
+again over the whole table, reads page N with OFFSET, follows nullable
+foreign keys with one query per row and renders every related row in a
+<select>. LargeTableAdmin instead:
+
+- counts with ``approximate_count``: the unfiltered table is estimated from
+  the planner statistics (sqlite_stat1 after an ANALYZE, pg_class.reltuples
+  on PostgreSQL) and shown as "~N"; without statistics its primary key
+  range, which deletes and archiving leave gaps in, is shown as "at most N".
+  A filtered list is counted up to COUNT_LIMIT rows and shown as "10000+";
+- pages with the keyset paginator (Dashboard.pagination) through the
+  ``cursor`` GET parameter whenever the list's ordering allows it (concrete
+  non-null fields ending in a unique one); other orderings fall back to
+  numbered pages;
+- hides the facet counts, which are one COUNT per filter choice.
+
+Subclasses still set ``list_select_related`` and ``autocomplete_fields``.
+Setting ``item_search_lookup`` makes the search box match items through
+the FTS index (Dashboard.search) and filter on that lookup, instead of a
+LIKE scan over a join.
+"""
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import search
+from .pagination import KeysetPaginator
+
+CURSOR_VAR = 'cursor'
+COUNT_LIMIT = 10000
+_INTEGER_KEYS = ('AutoField', 'BigAutoField', 'SmallAutoField')
+
+
+def _analyzed_row_count(model, using):
+    """Rows in ``model``'s SQLite table as of its last ANALYZE, or None if it has no statistics."""
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            return None
+        # The first number of every row of a table's statistics is its row count
+        cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [model._meta.db_table])
+        row = cursor.fetchone()
+    return None if row is None else int(row[0].split()[0])
+
+
+def estimated_count(model, using):
+    """Return (rows, upper_bound): roughly how many rows ``model``'s table holds, without scanning it.
+
+    ``upper_bound`` is set when the figure is the primary key range, which
+    counts deleted and archived rows too.
+    """
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        count = _analyzed_row_count(model, using)
+        if count is not None:
+            return count, False
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+                [connection.ops.quote_name(model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        # -1 until the table is first analyzed
+        if row is not None and row[0] >= 0:
+            return row[0], False
+    elif model._meta.pk.get_internal_type() in _INTEGER_KEYS:
+        # Two index lookups; SQLite only optimizes a lone MIN() or MAX()
+        keys = model._base_manager.using(using).values_list('pk', flat=True)
+        first, last = keys.order_by('pk').first(), keys.order_by('-pk').first()
+        return (0, False) if first is None else (last - first + 1, True)
+    return model._base_manager.using(using).count(), False
+
+
+def approximate_count(queryset, limit=COUNT_LIMIT):
+    """Return (count, approximate, capped, upper_bound) for ``queryset`` without a full COUNT(*)."""
+    if not queryset.query.has_filters():
+        count, upper_bound = estimated_count(queryset.model, queryset.db)
+        return count, True, False, upper_bound
+    # Sliced, so the list's ordering is kept and the newest rows are counted first
+    count = queryset[:limit + 1].count()
+    return min(count, limit), False, count > limit, False
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator counting with approximate_count (also used by the autocomplete views)."""
+    approximate = capped = upper_bound = False
+
+    @cached_property
+    def count(self):
+        count, self.approximate, self.capped, self.upper_bound = approximate_count(self.object_list)
+        return count
+
+
+class LargeTableChangeList(ChangeList):
+    keyset_page = None
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Changing the filters, search or ordering starts from the first page
+        return super().get_query_string(new_params, [*(remove or ()), CURSOR_VAR])
+
+    def keyset_ordering(self):
+        """The list's ordering as keyset fields, or None if it cannot be paginated that way."""
+        if self.list_editable:
+            # The formset needs a queryset, not a page of objects
+            return None
+        opts = self.lookup_opts
+        ordering = []
+        # The admin appends its own tie-breakers; anything after the first unique field is redundant
+        for name in self.queryset.query.order_by:
+            if not isinstance(name, str):
+                return None
+            try:
+                field = opts.pk if name.lstrip('-') == 'pk' else opts.get_field(name.lstrip('-'))
+            except FieldDoesNotExist:
+                return None
+            # Row comparisons skip NULLs
+            if not field.concrete or field.null:
+                return None
+            ordering.append(name)
+            if field.unique:
+                break
+        else:
+            return None
+        return ordering
+
+    def get_results(self, request):
+        ordering = self.keyset_ordering()
+        if ordering is None:
+            super().get_results(request)
+            self.count_approximate = self.paginator.approximate
+            self.count_capped = self.paginator.capped
+            self.count_upper_bound = self.paginator.upper_bound
+            return
+
+        paginator = KeysetPaginator(self.queryset, ordering, self.list_per_page)
+        page = paginator.get_page(request.GET.get(CURSOR_VAR))
+        self.result_count, self.count_approximate, self.count_capped, self.count_upper_bound = approximate_count(self.queryset)
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = page.object_list
+        self.can_show_all = False
+        # Numbered page links need Paginator.get_elided_page_range(); the
+        # keyset links come from keyset_page in admin/dashboard/pagination.html
+        self.multi_page = False
+        self.paginator = paginator
+        self.keyset_page = page
+
+    def cursor_url(self, cursor):
+        return self.get_query_string({CURSOR_VAR: cursor} if cursor else None)
+
+    def first_page_url(self):
+        return self.cursor_url(None)
+
+    def next_page_url(self):
+        return self.cursor_url(self.keyset_page.next_cursor)
+
+    def previous_page_url(self):
+        return self.cursor_url(self.keyset_page.previous_cursor)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin for tables too large to COUNT or OFFSET through (see the module docstring)."""
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    # 'pk' for the items themselves, 'item_id' for rows pointing at an item
+    item_search_lookup = None
+
+    def get_changelist(self, request, **kwargs):
+        return LargeTableChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        ids = search.matching_item_ids(search_term)
+        if self.item_search_lookup is None or connections[queryset.db].vendor != 'sqlite' or ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        matches = Q(**{f'{self.item_search_lookup}__in': ids})
+        if search_term.strip().isdigit():
+            matches |= Q(pk=int(search_term))
+        return queryset.filter(matches), False
@@ -0,0 +1,254 @@
+"""Time-series sales analytics over the raw Transaction table.
+
+A request names a range, a granularity and optionally a breakdown. The
+series come from one grouped query: transactions in the range (read through
+transaction_user_created_idx) are truncated to the bucket and grouped by
+bucket and series. On SQLite with UTC as the active time zone, buckets are
+cut from the stored UTC text with built-in functions, because Django's
+Trunc runs a Python function per row there.
+
+A category breakdown groups by every category and keeps the top N in
+Python. An item breakdown first ranks the items in the range (one more
+grouped query) so that only N + 1 series per bucket leave the database.
+Everything outside the top N is summed as "Other". Buckets without sales
+are zero-filled in Python. When the range holds more than MAX_POINTS
+buckets at the requested granularity, the next coarser granularity that
+fits is used instead.
+
+A range reaching back past the archive horizon also groups each
+overlapping per-year archive table (see Dashboard.archive) the same way and
+adds the rows in.
+"""
+import datetime
+from collections import Counter
+
+from django.db import connections
+from django.db.models import Case, CharField, Count, F, Func, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Substr, Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import archive
+from .models import Category, Item, Transaction
+from .sharding import tenant_db
+
+GRANULARITIES = ('hour', 'day', 'week', 'month', 'year')
+# Rough bucket lengths, only used to pick a granularity
+APPROX_SECONDS = {
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+    'month': 30.44 * 86400,
+    'year': 365.25 * 86400,
+}
+MAX_POINTS = 400
+DEFAULT_RANGE = datetime.timedelta(days=30)
+BREAKDOWNS = ('category', 'item')
+DEFAULT_TOP = 5
+MAX_TOP = 20
+OTHER = -1
+# Bucket keys on SQLite: prefixes of the stored "YYYY-MM-DD HH:MM:SS" text,
+# or the Monday's date for weeks; slots are formatted the same way
+SQLITE_KEY_FORMATS = {
+    'hour': '%Y-%m-%d %H',
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',
+    'month': '%Y-%m',
+    'year': '%Y',
+}
+
+
+def parse_bound(value, end=False):
+    """Parse an ISO date or datetime; a bare ``end`` date includes that whole day."""
+    # Dates first: parse_datetime() also accepts a bare date
+    day = parse_date(value)
+    if day is not None:
+        if end:
+            try:
+                day += datetime.timedelta(days=1)
+            except OverflowError:
+                raise ValueError(f'{value!r} is past the last supported date')
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(f'{value!r} is not an ISO date or datetime')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def choose_granularity(start, end, requested=None):
+    """Return the requested granularity, or the finest coarser one with at most MAX_POINTS buckets."""
+    span = (end - start).total_seconds()
+    candidates = GRANULARITIES[GRANULARITIES.index(requested):] if requested else GRANULARITIES
+    for granularity in candidates:
+        if span / APPROX_SECONDS[granularity] <= MAX_POINTS:
+            return granularity
+    return GRANULARITIES[-1]
+
+
+def bucket_start(moment, granularity):
+    """Truncate an aware datetime to its bucket in the current time zone."""
+    local = timezone.localtime(moment)
+    if granularity == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = local.date()
+    if granularity == 'week':
+        day -= datetime.timedelta(days=day.weekday())
+    elif granularity == 'month':
+        day = day.replace(day=1)
+    elif granularity == 'year':
+        day = day.replace(month=1, day=1)
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _next_bucket(start, granularity):
+    if granularity == 'hour':
+        return start + datetime.timedelta(hours=1)
+    day = timezone.localtime(start).date()
+    if granularity == 'day':
+        day += datetime.timedelta(days=1)
+    elif granularity == 'week':
+        day += datetime.timedelta(days=7)
+    elif granularity == 'month':
+        day = (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    else:
+        day = day.replace(year=day.year + 1)
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def buckets(start, end, granularity):
+    """Return the bucket starts covering [start, end)."""
+    slots = []
+    current = bucket_start(start, granularity)
+    while current < end:
+        slots.append(current)
+        current = _next_bucket(current, granularity)
+    return slots
+
+
+def _bucket_key(granularity):
+    """Return (bucket expression, function mapping a slot to the same key)."""
+    if connections[tenant_db()].vendor == 'sqlite' and timezone.get_current_timezone_name() == 'UTC':
+        key_format = SQLITE_KEY_FORMATS[granularity]
+        if granularity == 'week':
+            expression = Func(
+                F('created_at'), Value('-6 days'), Value('weekday 1'), function='date', output_field=CharField(),
+            )
+        else:
+            expression = Substr('created_at', 1, len(datetime.datetime(2000, 1, 1).strftime(key_format)))
+        return expression, lambda slot: slot.strftime(key_format)
+    return Trunc('created_at', granularity, tzinfo=timezone.get_current_timezone()), lambda slot: slot
+
+
+def _item_series(sources, top):
+    """Series key for the item breakdown: the ``top`` items by revenue, everything else OTHER."""
+    # Fetched up front: as a subquery SQLite would run it for both the
+    # SELECT and the GROUP BY clause
+    ranked = [
+        source.filter(item_id__isnull=False).values('item_id').annotate(total=Sum('amount')).order_by('-total')
+        for source in sources
+    ]
+    if len(ranked) == 1:
+        leaders = list(ranked[0].values_list('item_id', flat=True)[:top])
+    else:
+        totals = Counter()
+        for rows in ranked:
+            totals.update(dict(rows.values_list('item_id', 'total')))
+        leaders = [item_id for item_id, _ in totals.most_common(top)]
+    return Case(
+        When(item_id__isnull=True, then=Value(None)),
+        When(item_id__in=leaders, then=F('item_id')),
+        default=Value(OTHER),
+        output_field=IntegerField(),
+    )
+
+
+def _keep_top(series, top):
+    """Fold all but the ``top`` largest keyed series into OTHER."""
+    ranked = sorted((key for key in series if key not in (None, OTHER)), key=lambda key: -sum(series[key][0]))
+    for key in ranked[top:]:
+        totals, counts = series.pop(key)
+        other = series.setdefault(OTHER, ([0.0] * len(totals), [0] * len(counts)))
+        for n, (total, count) in enumerate(zip(totals, counts)):
+            other[0][n] += total
+            other[1][n] += count
+
+
+def _series_names(breakdown, keys):
+    if breakdown is None:
+        return {None: 'Total'}
+    model = Item if breakdown == 'item' else Category
+    names = dict(model.objects.filter(pk__in=[key for key in keys if key not in (None, OTHER)]).values_list('pk', 'name'))
+    names[None] = 'Deleted items' if breakdown == 'item' else 'Uncategorized'
+    names[OTHER] = 'Other'
+    return names
+
+
+def sales_series(user, start, end, granularity=None, breakdown=None, top=DEFAULT_TOP):
+    """Return the analytics payload for ``user``'s sales in [start, end).
+
+    ``granularity`` is one of GRANULARITIES (None picks the finest that
+    fits); ``breakdown`` is None, 'category' or 'item', with the ``top``
+    largest series kept and the rest summed into "Other". Raises
+    ValueError for invalid arguments.
+    """
+    if end <= start:
+        raise ValueError('end must be after start')
+    if granularity is not None and granularity not in GRANULARITIES:
+        raise ValueError(f'granularity must be one of {", ".join(GRANULARITIES)}')
+    if breakdown is not None and breakdown not in BREAKDOWNS:
+        raise ValueError(f'breakdown must be one of {", ".join(BREAKDOWNS)}')
+    if not 1 <= top <= MAX_TOP:
+        raise ValueError(f'top must be between 1 and {MAX_TOP}')
+
+    used = choose_granularity(start, end, granularity)
+    slots = buckets(start, end, used)
+    transactions = Transaction.objects.filter(user=user, created_at__gte=start, created_at__lt=end)
+    archived = archive.archived_querysets(user, start, end)
+    if breakdown == 'item':
+        item_key = _item_series([transactions, *archived], top)
+        keys = [item_key] * (1 + len(archived))
+    elif breakdown == 'category':
+        # A user has few categories: group by all of them and keep the top here.
+        # Archived rows hold a bare item id.
+        keys = [F('item__category_id')] + [Subquery(Item.objects.filter(pk=OuterRef('item_id')).values('category_id'))] * len(archived)
+    else:
+        keys = [Value(None, IntegerField())] * (1 + len(archived))
+    bucket, slot_key = _bucket_key(used)
+
+    index = {slot_key(slot): n for n, slot in enumerate(slots)}
+    series = {} if breakdown else {None: ([0.0] * len(slots), [0] * len(slots))}
+    for source, key in zip([transactions, *archived], keys):
+        rows = (
+            source.annotate(bucket=bucket, series=key)
+            .values('bucket', 'series').annotate(total=Sum('amount'), n=Count('id')).order_by()
+        )
+        for row in rows:
+            totals, counts = series.setdefault(row['series'], ([0.0] * len(slots), [0] * len(slots)))
+            n = index[row['bucket']]
+            totals[n] += float(row['total'])
+            counts[n] += row['n']
+    _keep_top(series, top)
+
+    names = _series_names(breakdown, series)
+    # Largest first; "Other" and the missing bucket go last
+    ordered = sorted(series, key=lambda key: (key in (OTHER, None), -sum(series[key][0])))
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': used,
+        'downsampled': granularity is not None and used != granularity,
+        'breakdown': breakdown,
+        'labels': [slot.isoformat() for slot in slots],
+        'series': [
+            {
+                'id': None if key == OTHER else key,
+                'name': names[key],
+                'totals': series[key][0],
+                'counts': series[key][1],
+            }
+            for key in ordered
+        ],
+    }
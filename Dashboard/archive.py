@@ -0,0 +1,209 @@
+"""Archival of old transactions into per-year tables.
+
+``archive_transactions`` moves transactions older than a horizon out of the
+hot Transaction table into ``Dashboard_transaction_archive_<year>`` (the
+UTC year of ``created_at``). The archive tables sit in the same database
+(tenant shard) as the rows they came from. Each user's old rows are found
+through transaction_user_created_idx and moved in batches of
+ARCHIVE_BATCH_SIZE. Each batch is one short transaction, so POS writes
+only wait for one batch, never for the whole run.
+
+Summaries are unaffected: the rows are deleted with plain DELETEs, so the
+SalesBucket rollups (and with them the yearly chart and the all-time
+totals) keep counting archived sales. Stock movements of archived sales
+keep their quantities; only their link to the transaction is cleared.
+
+Users being moved to another shard (TenantShard.moving) are skipped; a
+move that starts mid-run stops that user's batches.
+
+Archived rows stay queryable: ``archived_querysets`` covers a date range
+and is used by the analytics API, transaction exports with
+``archived=1`` and rebuild_sales_buckets.
+
+The archive tables are not in the app's migrations. Their models live in a
+private app registry, and each table is created when its year is first
+archived (or copied to another shard).
+"""
+import datetime
+import re
+import time
+from collections import defaultdict
+
+from django.apps.registry import Apps
+from django.db import DEFAULT_DB_ALIAS, connections, models, router, transaction
+
+from . import caching
+from .models import StockMovement, TenantShard, Transaction
+
+ARCHIVE_BATCH_SIZE = 1000
+TABLE_PREFIX = f'{Transaction._meta.db_table}_archive_'
+_TABLE_RE = re.compile(rf'^{re.escape(TABLE_PREFIX)}(\d{{4}})$')
+
+# Kept out of django.apps so makemigrations never sees the per-year models
+_apps = Apps()
+_models = {}
+
+
+def archive_model(year):
+    """Return the (unmanaged) model of ``year``'s archive table."""
+    if year not in _models:
+        meta = type('Meta', (), {
+            'apps': _apps,
+            'app_label': 'Dashboard',
+            'db_table': f'{TABLE_PREFIX}{year}',
+            'managed': False,
+            'indexes': [models.Index(fields=['user_id', 'created_at'], name=f'txn_archive_{year}_user_idx')],
+        })
+        _models[year] = type(f'ArchivedTransaction{year}', (models.Model,), {
+            '__module__': __name__,
+            'Meta': meta,
+            'id': models.BigAutoField(primary_key=True),
+            # The id the row had in the hot table (None for rows copied by move_tenants)
+            'transaction_id': models.BigIntegerField(null=True),
+            'item_id': models.BigIntegerField(null=True),
+            'user_id': models.BigIntegerField(null=True),
+            'amount': models.DecimalField(max_digits=12, decimal_places=2),
+            'created_at': models.DateTimeField(),
+        })
+    return _models[year]
+
+
+def archive_years(using):
+    """Years that have an archive table in the database ``using``, oldest first."""
+    tables = connections[using].introspection.table_names()
+    return sorted(int(match.group(1)) for match in map(_TABLE_RE.match, tables) if match)
+
+
+def ensure_tables(years, using):
+    """Create the archive tables of ``years`` that ``using`` lacks.
+
+    Call it outside transaction.atomic(): SQLite's schema editor refuses to
+    run inside a transaction.
+    """
+    missing = set(years) - set(archive_years(using))
+    if missing:
+        with connections[using].schema_editor() as editor:
+            for year in sorted(missing):
+                editor.create_model(archive_model(year))
+
+
+def _year_start(year):
+    return datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def archived_querysets(user, start=None, end=None, using=None):
+    """Querysets over ``user``'s archived transactions in [start, end), one per overlapping year.
+
+    ``using`` defaults to the database the router picks for reading
+    Transactions (the user's shard, or its replica).
+    """
+    using = using or router.db_for_read(Transaction)
+    querysets = []
+    for year in archive_years(using):
+        if (start is not None and start >= _year_start(year + 1)) or (end is not None and end <= _year_start(year)):
+            continue
+        rows = archive_model(year).objects.using(using).filter(user_id=user.pk)
+        if start is not None:
+            rows = rows.filter(created_at__gte=start)
+        if end is not None:
+            rows = rows.filter(created_at__lt=end)
+        querysets.append(rows)
+    return querysets
+
+
+def archived_until(user, using=None):
+    """Return when ``user``'s newest archived sale happened, or None if nothing is archived."""
+    using = using or router.db_for_read(Transaction)
+    for year in reversed(archive_years(using)):
+        newest = archive_model(year).objects.using(using).filter(user_id=user.pk).aggregate(newest=models.Max('created_at'))['newest']
+        if newest is not None:
+            return newest
+    return None
+
+
+def _move_batch(rows, using):
+    by_year = defaultdict(list)
+    for pk, item_id, user_id, amount, created_at in rows:
+        by_year[created_at.year].append((pk, item_id, user_id, amount, created_at))
+    for year, year_rows in by_year.items():
+        model = archive_model(year)
+        model.objects.using(using).bulk_create([
+            model(transaction_id=pk, item_id=item_id, user_id=user_id, amount=amount, created_at=created_at)
+            for pk, item_id, user_id, amount, created_at in year_rows
+        ])
+    ids = [row[0] for row in rows]
+    StockMovement.objects.using(using).filter(transaction_id__in=ids).update(transaction=None)
+    with connections[using].cursor() as cursor:
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f'DELETE FROM {Transaction._meta.db_table} WHERE id IN ({placeholders})', ids)
+
+
+def _moving(user_id):
+    # Not sharding.moving_user_ids(): Dashboard.sharding imports this module
+    return TenantShard.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id, moving=True).exists()
+
+
+def archive_transactions(before, using, batch_size=ARCHIVE_BATCH_SIZE, pause=0.0, log=None):
+    """Move transactions created before ``before`` in the database ``using`` into the archive tables.
+
+    ``pause`` seconds are slept between batches to leave room for other
+    writers. Returns the number of rows moved.
+    """
+    old = Transaction.objects.using(using).filter(created_at__lt=before)
+    ensure_tables({moment.year for moment in old.datetimes('created_at', 'year', tzinfo=datetime.timezone.utc)}, using)
+    user_ids = list(old.order_by().values_list('user_id', flat=True).distinct())
+    moved = 0
+    for user_id in user_ids:
+        user_rows = old.filter(user_id=user_id) if user_id is not None else old.filter(user__isnull=True)
+        user_rows = user_rows.order_by('created_at', 'pk').values_list('pk', 'item_id', 'user_id', 'amount', 'created_at')
+        user_moved = 0
+        while user_id is None or not _moving(user_id):
+            with transaction.atomic(using=using):
+                rows = list(user_rows[:batch_size])
+                if rows:
+                    _move_batch(rows, using)
+            if not rows:
+                break
+            user_moved += len(rows)
+            if pause:
+                time.sleep(pause)
+        if user_id is not None:
+            # The transaction list pages changed; the sales rollups did not
+            caching.bump_data_version(user_id)
+        if log is not None:
+            log(f'user {user_id}: {user_moved} row(s)')
+        moved += user_moved
+    return moved
+
+
+def copy_tenant(user_id, source, target, item_keys, batch_size=ARCHIVE_BATCH_SIZE):
+    """Copy ``user_id``'s archived rows from ``source`` to ``target`` (see sharding.move_tenant).
+
+    ``item_keys`` maps the user's item ids in ``source`` to their ids in
+    ``target``. The tables must already exist in ``target`` (ensure_tables).
+    Returns the number of rows copied.
+    """
+    copied = 0
+    for year in archive_years(source):
+        model = archive_model(year)
+        rows = model.objects.using(source).filter(user_id=user_id).order_by('pk')
+        last_pk = 0
+        while batch := list(rows.filter(pk__gt=last_pk)[:batch_size]):
+            last_pk = batch[-1].pk
+            for row in batch:
+                row.pk = row.transaction_id = None
+                row.item_id = item_keys.get(row.item_id)
+                row._state.adding, row._state.db = True, None
+            model.objects.using(target).bulk_create(batch)
+            copied += len(batch)
+    return copied
+
+
+def purge_tenant(user_id, using):
+    """Delete ``user_id``'s archived rows from ``using``; return the number deleted."""
+    deleted = 0
+    with connections[using].cursor() as cursor:
+        for year in archive_years(using):
+            cursor.execute(f'DELETE FROM {archive_model(year)._meta.db_table} WHERE user_id = %s', [user_id])
+            deleted += cursor.rowcount
+    return deleted
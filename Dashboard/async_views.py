@@ -0,0 +1,136 @@
+"""Async (ASGI) variants of the read-only dashboard views.
+
+Served under /async/ when the project runs under IMS.asgi. Single queries
+use Django's async ORM; independent queries of one page run concurrently,
+each in its own worker thread with its own database connection, so a slow
+aggregate does not hold up the rest of the page or a worker thread.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.db import connections
+from django.db.models import F
+from django.http import JsonResponse
+from django.shortcuts import render
+
+from . import archive, caching, sales
+from .metrics import get_user_metrics
+from .models import Category, Item, Transaction
+from .pagination import KeysetPaginator
+
+
+def _in_own_thread(func, *args):
+    def run():
+        try:
+            return func(*args)
+        finally:
+            # Worker threads get their own connections; don't leave them open
+            connections.close_all()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+async def concurrently(*calls):
+    """Run each (func, *args) in parallel threads and return their results in order."""
+    return await asyncio.gather(*(_in_own_thread(func, *args) for func, *args in calls))
+
+
+async def _render(request, template_name, context):
+    # Context processors touch request.user synchronously
+    return await sync_to_async(render)(request, template_name, context)
+
+
+def _metrics_dict(rollup):
+    return {
+        'total_items': rollup.total_items,
+        'categories': rollup.categories,
+        'low_stock': rollup.low_stock,
+        'total_value': rollup.total_value,
+    }
+
+
+@login_required(login_url='dashboard:login')
+async def index(request):
+    user = await request.auser()
+    # Read first: it may insert the user's first version row
+    data_version = await sync_to_async(caching.data_version)(user.pk)
+    rollup, categories, low_stock_items = await concurrently(
+        (get_user_metrics, user),
+        (list, Category.objects.filter(user=user).select_related('metrics')),
+        (list, user.reorder_suggestions.filter(item__stock__lt=F('item__reorder_level')).select_related('item')),
+    )
+    context = {
+        'title': 'Dashboard',
+        'low_stock_items': low_stock_items,
+        'metrics': _metrics_dict(rollup),
+        'categories': categories,
+        # Fragment cache key (see views.index)
+        'data_version': data_version,
+    }
+    return await _render(request, 'Dashboard/index.html', context)
+
+
+@login_required(login_url='dashboard:login')
+async def dashboard_metrics(request):
+    """JSON version of the dashboard metric cards."""
+    user = await request.auser()
+    rollup = await sync_to_async(get_user_metrics)(user)
+    metrics = _metrics_dict(rollup)
+    metrics['total_value'] = float(metrics['total_value'])
+    return JsonResponse(metrics)
+
+
+@login_required(login_url='dashboard:login')
+async def sales_data(request):
+    """Async version of views.sales_data."""
+    user = await request.auser()
+    slots, rows = sales.chart_query(user, sales.normalize_period(request.GET.get('period')))
+    return JsonResponse(sales.chart_payload(slots, [row async for row in rows]))
+
+
+async def _item_list(request, title, low_stock=False):
+    user = await request.auser()
+    queryset = Item.objects.filter(user=user)
+    if low_stock:
+        queryset = queryset.low_stock()
+    queryset = queryset.select_related('category', 'forecast').with_total_value()
+    page = await KeysetPaginator(queryset, ('pk',), 20).aget_page(request.GET.get('cursor'))
+    context = {
+        'items': page.object_list,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'title': title,
+        'data_version': await sync_to_async(caching.data_version)(user.pk),
+    }
+    return await _render(request, 'Dashboard/items_list.html', context)
+
+
+@login_required(login_url='dashboard:login')
+async def items_list(request):
+    return await _item_list(request, 'All Items')
+
+
+@login_required(login_url='dashboard:login')
+async def low_stock(request):
+    return await _item_list(request, 'Low Stock Items', low_stock=True)
+
+
+@login_required(login_url='dashboard:login')
+async def transaction_list(request):
+    user = await request.auser()
+    transactions = Transaction.objects.filter(user=user).select_related('item')
+    paginator = KeysetPaginator(transactions, ['-created_at', '-pk'], 10)
+    page_obj, totals, archived_until = await concurrently(
+        (paginator.get_page, request.GET.get('cursor')),
+        (sales.sales_totals, user),
+        (archive.archived_until, user),
+    )
+    context = {
+        'page_obj': page_obj,
+        'transactions': page_obj,
+        'transaction_count': totals['count'],
+        'sum_transactions': totals['amount'],
+        'archived_until': archived_until,
+        'title': 'Sales Transactions'
+    }
+    return await _render(request, 'Dashboard/transaction_list.html', context)
@@ -1,19 +1,74 @@
+import hashlib
+
 from django.contrib.auth.backends import ModelBackend
-from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+
+from .models import LoginIdentifier
+
+# Unknown identifiers are remembered this long (seconds), so a credential
+# stuffing burst re-trying the same names does not reach the database
+FAILED_IDENTIFIER_TIMEOUT = 60
+
+
+def normalize_identifier(value):
+    return value.strip().lower()
+
+
+def _failed_key(identifier):
+    # Hashed: cache keys must not contain spaces or control characters
+    return 'dashboard:unknown-login:' + hashlib.sha256(identifier.encode()).hexdigest()
+
+
+def sync_login_identifiers(user):
+    """Point the user's lowercased username and email at ``user`` in LoginIdentifier."""
+    wanted = {}
+    if user.email:
+        wanted[normalize_identifier(user.email)] = LoginIdentifier.EMAIL
+    if user.username:
+        wanted[normalize_identifier(user.username)] = LoginIdentifier.USERNAME
+    with transaction.atomic():
+        LoginIdentifier.objects.filter(user=user).exclude(identifier__in=wanted).delete()
+        for identifier, kind in wanted.items():
+            row = LoginIdentifier.objects.filter(identifier=identifier).first()
+            if row is None:
+                try:
+                    with transaction.atomic():
+                        LoginIdentifier.objects.create(identifier=identifier, user=user, kind=kind)
+                except IntegrityError:
+                    pass  # claimed concurrently by another account
+            elif row.user_id == user.pk:
+                if row.kind != kind:
+                    row.kind = kind
+                    row.save(update_fields=['kind'])
+            elif kind == LoginIdentifier.USERNAME and row.kind == LoginIdentifier.EMAIL:
+                # A username beats another account's email
+                row.user = user
+                row.kind = kind
+                row.save(update_fields=['user', 'kind'])
+            cache.delete(_failed_key(identifier))
 
 
 class EmailOrUsernameModelBackend(ModelBackend):
-    """Authenticate with either username or email (case-insensitive)."""
+    """Authenticate with either username or email (case-insensitive).
+
+    The identifier is lowercased and looked up in LoginIdentifier's unique
+    index, so there is one seek and never more than one match.
+    """
     def authenticate(self, request, username=None, password=None, **kwargs):
-        UserModel = get_user_model()
         identifier = username or kwargs.get('email')
         if identifier is None or password is None:
             return None
-        try:
-            user = UserModel.objects.get(Q(username__iexact=identifier) | Q(email__iexact=identifier))
-        except UserModel.DoesNotExist:
+        identifier = normalize_identifier(identifier)
+        key = _failed_key(identifier)
+        if cache.get(key):
+            # Stop the backend chain too: ModelBackend would query and hash again
+            raise PermissionDenied
+        entry = LoginIdentifier.objects.select_related('user').filter(identifier=identifier).first()
+        if entry is None:
+            cache.set(key, True, FAILED_IDENTIFIER_TIMEOUT)
             return None
-        else:
-            if user.check_password(password) and self.user_can_authenticate(user):
-                return user
+        user = entry.user
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
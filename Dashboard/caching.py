@@ -0,0 +1,97 @@
+"""Per-user data versions, cached JSON payloads and template fragments.
+
+A user's sales version is the millisecond timestamp of their last sales
+write (it is bumped by the Transaction signal handlers once the write
+commits). Cached payloads and ETags include the version, so a write makes
+every older entry unreachable instead of having to find and delete it.
+
+The data version works the same way for every Item, Category and
+Transaction write (and for the bulk paths that skip the signals). The
+dashboard and item-list templates include it in their ``{% cache %}``
+fragment keys.
+
+The versions are DataVersion rows in the default database, not cache
+entries: the run_jobs worker and management commands write in their own
+processes, and a per-process cache would leave the web workers serving
+entries from before those writes. The payloads and fragments themselves
+can stay in a per-process cache, since their keys carry the version.
+"""
+import datetime
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from . import sharding
+from .models import DataVersion
+
+SALES_PAYLOAD_TIMEOUT = 60 * 60 * 24
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _versions():
+    return DataVersion.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _version(user_id, field):
+    version = _versions().filter(user_id=user_id).values_list(field, flat=True).first()
+    if version is None:
+        # New user: start from "now" so no stale entry matches
+        now = _now_ms()
+        row, _ = _versions().get_or_create(user_id=user_id, defaults={'data': now, 'sales': now})
+        version = getattr(row, field)
+    return version
+
+
+def _bump(user_id, field):
+    # A user without a row has nothing cached under a version yet; the
+    # first read starts one from "now". Creating it here would also break
+    # for a user deleted in the transaction that queued this bump.
+    _versions().filter(user_id=user_id).update(**{field: Greatest(Value(_now_ms()), F(field) + 1)})
+
+
+def sales_version(user_id):
+    """Return the user's current sales version, starting one if they have none."""
+    return _version(user_id, 'sales')
+
+
+def bump_sales_version(user_id):
+    _bump(user_id, 'sales')
+
+
+def bump_sales_version_on_commit(user_id):
+    """Bump after the current transaction commits, so readers never cache pre-commit data under the new version."""
+    transaction.on_commit(lambda: bump_sales_version(user_id), using=sharding.tenant_db())
+
+
+def data_version(user_id):
+    """Return the user's current data version, starting one if they have none."""
+    return _version(user_id, 'data')
+
+
+def bump_data_version(user_id):
+    _bump(user_id, 'data')
+
+
+def bump_data_version_on_commit(user_id):
+    """Bump after the current transaction commits (see bump_sales_version_on_commit)."""
+    transaction.on_commit(lambda: bump_data_version(user_id), using=sharding.tenant_db())
+
+
+def sales_etag(user_id, period, today):
+    return f'sales-{user_id}-{period}-{today:%Y%m%d}-{sales_version(user_id)}'
+
+
+def sales_last_modified(user_id):
+    return datetime.datetime.fromtimestamp(sales_version(user_id) / 1000, tz=datetime.timezone.utc)
+
+
+def cached_sales_payload(user_id, period, today, build):
+    """Return the chart payload for (user, period, day, version), calling ``build()`` on a miss."""
+    key = f'dashboard:sales:{sales_etag(user_id, period, today)}'
+    return cache.get_or_set(key, build, SALES_PAYLOAD_TIMEOUT)
@@ -0,0 +1,173 @@
+"""Streaming CSV/NDJSON export of items and transactions.
+
+Rows are read with ``values_list().iterator()`` so the database driver hands
+them over in chunks, and each row is formatted as soon as it arrives. Memory
+stays flat and the first bytes go out before the query has finished.
+"""
+import csv
+import datetime
+import itertools
+import json
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import archive
+from .models import Item, Transaction
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+ITEM_COLUMNS = [
+    ('id', 'id'),
+    ('sn', 'sn'),
+    ('name', 'name'),
+    ('category', 'category__name'),
+    ('description', 'description'),
+    ('stock', 'stock'),
+    ('reorder_level', 'reorder_level'),
+    ('price', 'price'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+TRANSACTION_COLUMNS = [
+    ('id', 'id'),
+    ('item_id', 'item_id'),
+    ('item_sn', 'item__sn'),
+    ('item_name', 'item__name'),
+    ('category', 'item__category__name'),
+    ('amount', 'amount'),
+    ('created_at', 'created_at'),
+]
+
+# The same columns read from an archive table; ids are the original transaction ids
+ARCHIVED_TRANSACTION_COLUMNS = [
+    ('id', 'transaction_id'),
+    ('item_id', 'item_id'),
+    ('item_sn', 'item_sn'),
+    ('item_name', 'item_name'),
+    ('category', 'category'),
+    ('amount', 'amount'),
+    ('created_at', 'created_at'),
+]
+
+
+class Echo:
+    """File-like object whose write() returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def parse_filters(params):
+    """Read format/category/start/end/archived from a dict-like; raise ValueError if malformed."""
+    fmt = params.get('format') or 'csv'
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+    filters = {
+        'format': fmt, 'category': None, 'start': None, 'end': None,
+        'archived': str(params.get('archived', '')).lower() in ('1', 'true'),
+    }
+    if params.get('category'):
+        try:
+            filters['category'] = int(params['category'])
+        except (TypeError, ValueError):
+            raise ValueError('category must be a category id')
+    for key in ('start', 'end'):
+        if params.get(key):
+            value = parse_date(str(params[key]))
+            if value is None:
+                raise ValueError(f'{key} must be a date (YYYY-MM-DD)')
+            filters[key] = value
+    return filters
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def item_queryset(user, category=None, start=None, end=None, **kwargs):
+    qs = Item.objects.filter(user=user)
+    if category:
+        qs = qs.filter(category_id=category)
+    if start:
+        qs = qs.filter(created_at__gte=_day_start(start))
+    if end:
+        qs = qs.filter(created_at__lt=_day_start(end + datetime.timedelta(days=1)))
+    return qs.order_by('pk')
+
+
+def transaction_queryset(user, category=None, start=None, end=None, **kwargs):
+    qs = Transaction.objects.filter(user=user)
+    if category:
+        qs = qs.filter(item__category_id=category)
+    if start:
+        qs = qs.filter(created_at__gte=_day_start(start))
+    if end:
+        qs = qs.filter(created_at__lt=_day_start(end + datetime.timedelta(days=1)))
+    return qs.order_by('created_at', 'pk')
+
+
+def archived_transaction_querysets(user, category=None, start=None, end=None, **kwargs):
+    """Querysets over the user's archived transactions (oldest year first), annotated like TRANSACTION_COLUMNS."""
+    querysets = archive.archived_querysets(
+        user,
+        _day_start(start) if start else None,
+        _day_start(end + datetime.timedelta(days=1)) if end else None,
+    )
+    item = Item.objects.filter(pk=OuterRef('item_id'))
+    for qs in querysets:
+        if category:
+            qs = qs.filter(item_id__in=Item.objects.filter(category_id=category).values('pk'))
+        yield qs.annotate(
+            item_sn=Subquery(item.values('sn')),
+            item_name=Subquery(item.values('name')),
+            category=Subquery(item.values('category__name')),
+        ).order_by('created_at', 'pk')
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def stream_rows(queryset, columns, fmt, header=True):
+    """Yield the export as text chunks, one per row (plus a CSV header)."""
+    names = [name for name, _ in columns]
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).iterator(chunk_size=CHUNK_SIZE)
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        if header:
+            yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow([_json_default(v) if isinstance(v, datetime.date) else v for v in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(names, row)), default=_json_default) + '\n'
+
+
+def export_items(user, fmt='csv', **filters):
+    return stream_rows(item_queryset(user, **filters), ITEM_COLUMNS, fmt)
+
+
+def export_transactions(user, fmt='csv', archived=False, **filters):
+    """``archived`` puts the matching archived transactions first (see Dashboard.archive)."""
+    streams = []
+    if archived:
+        for qs in archived_transaction_querysets(user, **filters):
+            streams.append(stream_rows(qs, ARCHIVED_TRANSACTION_COLUMNS, fmt, header=not streams))
+    streams.append(stream_rows(transaction_queryset(user, **filters), TRANSACTION_COLUMNS, fmt, header=not streams))
+    return itertools.chain.from_iterable(streams)
+
+
+EXPORTS = {
+    'items': export_items,
+    'transactions': export_transactions,
+}
@@ -0,0 +1,134 @@
+"""Demand forecasts and reorder points from sales history.
+
+For each user the job reads the items (id, price) and the sales window in
+one columnar fetch each. It bins unit sales into an items x weeks matrix with
+``numpy.bincount``. Every statistic below is then a whole-matrix operation;
+there is no per-item Python loop:
+
+* daily demand: the mean of the last SHORT_WEEKS weeks blended with the mean
+  of the whole window, so a recent change shows up without one odd week
+  dominating;
+* variability: the standard deviation of weekly demand, scaled to days;
+* safety stock: z(service level) * daily std * sqrt(lead time);
+* reorder point: daily demand * lead time + safety stock.
+
+Transactions record an amount rather than a quantity, so units sold are
+estimated as amount / the item's current price. Results are written to
+ItemForecast. NumPy is only needed to run the job; reading forecasts does
+not need it.
+"""
+import datetime
+import itertools
+from statistics import NormalDist
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .caching import bump_data_version_on_commit
+from .models import Item, ItemForecast, Transaction
+from .sharding import moving_user_ids, tenant_db
+
+try:
+    import numpy as np
+except ImportError:  # optional; only forecast_demand needs it
+    np = None
+
+WINDOW_WEEKS = 52
+SHORT_WEEKS = 4
+LEAD_TIME_DAYS = 7
+SERVICE_LEVEL = 0.95
+INSERT_SQL = (
+    f'INSERT INTO {ItemForecast._meta.db_table} '
+    '(item_id, user_id, daily_demand, demand_std, safety_stock, reorder_point, computed_at) '
+    'VALUES (%s, %s, %s, %s, %s, %s, %s)'
+)
+
+
+def require_numpy():
+    if np is None:
+        raise ImproperlyConfigured('Demand forecasting needs NumPy (pip install numpy).')
+
+
+def fetch_sales(user_id, since):
+    """Return (item ids, day offsets from ``since``, amounts) arrays for the user's sales since ``since``."""
+    connection = connections[tenant_db()]
+    if connection.vendor == 'sqlite':
+        start = connection.ops.adapt_datetimefield_value(since)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT item_id, CAST(julianday(created_at) - julianday(%s) AS INTEGER), CAST(amount AS REAL) '
+                'FROM Dashboard_transaction WHERE user_id = %s AND item_id IS NOT NULL AND created_at >= %s',
+                [start, user_id, start],
+            )
+            rows = cursor.fetchall()
+    else:
+        rows = [
+            (item_id, (created_at - since).days, amount)
+            for item_id, created_at, amount in Transaction.objects.filter(
+                user_id=user_id, item__isnull=False, created_at__gte=since,
+            ).values_list('item_id', 'created_at', 'amount').iterator()
+        ]
+    if not rows:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    data = np.array(rows, dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), data[:, 2]
+
+
+def forecast(item_ids, prices, sale_items, sale_days, amounts,
+             weeks=WINDOW_WEEKS, lead_time=LEAD_TIME_DAYS, service_level=SERVICE_LEVEL):
+    """Forecast every item at once.
+
+    ``item_ids`` must be sorted. ``sale_days`` count from the start of a
+    window of exactly ``weeks`` * 7 days. Returns (daily demand, daily std,
+    safety stock, reorder point) arrays aligned with ``item_ids``.
+    """
+    n = len(item_ids)
+    # Map each sale to its item's row; sales of items not in the list, or
+    # outside the window, are dropped rather than piled into an edge week
+    rows = np.searchsorted(item_ids, sale_items)
+    known = (rows < n) & (sale_days >= 0) & (sale_days < weeks * 7)
+    known[known] = item_ids[rows[known]] == sale_items[known]
+    rows, days, amounts = rows[known], sale_days[known], amounts[known]
+
+    price = prices[rows]
+    units = np.divide(amounts, price, out=np.zeros_like(amounts), where=price > 0)
+    week = days // 7
+    weekly = np.bincount(rows * weeks + week, weights=units, minlength=n * weeks).reshape(n, weeks)
+
+    short = weekly[:, -min(SHORT_WEEKS, weeks):].mean(axis=1)
+    daily = (short + weekly.mean(axis=1)) / 2 / 7
+    std = (weekly.std(axis=1, ddof=1) if weeks > 1 else np.zeros(n)) / np.sqrt(7)
+    z = NormalDist().inv_cdf(service_level)
+    safety = np.ceil(z * std * np.sqrt(lead_time))
+    reorder_point = np.ceil(daily * lead_time + safety)
+    return daily, std, safety.astype(np.int64), reorder_point.astype(np.int64)
+
+
+def forecast_user(user_id, weeks=WINDOW_WEEKS, lead_time=LEAD_TIME_DAYS, service_level=SERVICE_LEVEL):
+    """Recompute the user's ItemForecast rows; return how many were written (none while the user moves shard)."""
+    require_numpy()
+    items = list(Item.objects.filter(user_id=user_id).order_by('pk').values_list('pk', 'price'))
+    if not items:
+        return 0
+    item_ids = np.fromiter((pk for pk, _ in items), dtype=np.int64, count=len(items))
+    prices = np.fromiter((price for _, price in items), dtype=np.float64, count=len(items))
+    now = timezone.now()
+    sales = fetch_sales(user_id, now - datetime.timedelta(days=weeks * 7))
+    daily, std, safety, reorder_point = forecast(item_ids, prices, *sales, weeks=weeks,
+                                                 lead_time=lead_time, service_level=service_level)
+
+    if user_id in moving_user_ids():
+        return 0
+
+    # The user's rows are replaced wholesale; executemany skips building
+    # 100k model instances and compiling their INSERTs
+    connection = connections[tenant_db()]
+    computed_at = connection.ops.adapt_datetimefield_value(now)
+    rows = zip(item_ids.tolist(), itertools.repeat(user_id), daily.tolist(), std.tolist(),
+               safety.tolist(), reorder_point.tolist(), itertools.repeat(computed_at))
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        ItemForecast.objects.filter(user_id=user_id).delete()
+        cursor.executemany(INSERT_SQL, rows)
+        bump_data_version_on_commit(user_id)
+    return len(item_ids)
@@ -39,12 +39,16 @@ class ItemForm(forms.ModelForm):
         })
     )
 
+    # Stock the form was rendered with; edits apply the difference to it
+    original_stock = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
     class Meta:
         model = Item
-        fields = ['name', 'category', 'stock', 'price']
+        fields = ['name', 'category', 'stock', 'reorder_level', 'price']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'stock': forms.NumberInput(attrs={'class': 'form-control'}),
+            'reorder_level': forms.NumberInput(attrs={'class': 'form-control', 'min': '0'}),
             'price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
         }
     
@@ -55,6 +59,12 @@ class ItemForm(forms.ModelForm):
             self.fields['category'].queryset = Category.objects.filter(user=user)
         else:
             self.fields['category'].queryset = Category.objects.none()
+        if self.instance.pk:
+            self.fields['original_stock'].initial = self.instance.stock
+
+    def clean_original_stock(self):
+        original = self.cleaned_data.get('original_stock')
+        return self.instance.stock if original is None else original
 class TransactionForm(forms.ModelForm):
     item = forms.ModelChoiceField(
         queryset=Item.objects.none(),
@@ -62,6 +72,8 @@ class TransactionForm(forms.ModelForm):
         label="Select Item"
     )
     
+    quantity = forms.IntegerField(min_value=1, initial=1, label="Quantity Sold")
+
     class Meta:
         model = Transaction
         fields = ['item', 'amount']
@@ -80,4 +92,19 @@ class TransactionForm(forms.ModelForm):
             # Only show items for this user
             self.fields['item'].queryset = Item.objects.filter(user=user)
         self.fields['item'].label = "Item Sold"
-        self.fields['amount'].label = "Sale Amount (Rs.)"
\ No newline at end of file
+        self.fields['amount'].label = "Sale Amount (Rs.)"
+
+
+class ItemImportForm(forms.Form):
+    FORMAT_CHOICES = [('', 'Detect from file name'), ('csv', 'CSV'), ('ndjson', 'NDJSON (one JSON object per line)')]
+
+    file = forms.FileField(
+        label="Items file",
+        help_text="Columns: name, price, stock, reorder_level, category, description, sn. Rows with an existing SN update that item.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.ndjson,.jsonl,.json'}),
+    )
+    format = forms.ChoiceField(
+        choices=FORMAT_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
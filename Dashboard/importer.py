@@ -0,0 +1,203 @@
+"""Streaming bulk import of items from CSV or NDJSON.
+
+Rows are read one at a time and written in chunks: each chunk resolves its
+categories from an in-memory cache, reserves a block of SNs for new items and
+is saved with one bulk_create/bulk_update inside its own transaction, together
+with the StockMovement rows for the stock it sets (opening receipts for new
+items, adjustments for changed stock). Memory use depends on the chunk size,
+not on the file size.
+
+Columns (CSV header or NDJSON keys): name, price, stock, reorder_level,
+category, description and sn. A row whose ``sn`` matches an existing item of
+the user updates that item; a row without ``sn`` creates a new item.
+"""
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import stock
+from .metrics import rebuild_user_metrics
+from .models import DEFAULT_REORDER_LEVEL, Category, Item
+from .serials import allocate_sns
+from .sharding import tenant_db
+
+DEFAULT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+UPDATE_FIELDS = ['name', 'category', 'description', 'stock', 'reorder_level', 'price', 'updated_at']
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    @property
+    def rows(self):
+        return self.created + self.updated + self.failed
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'line {line}: {message}')
+
+
+def detect_format(filename):
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def iter_rows(stream, fmt):
+    """Yield (line_number, dict) from a text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, exc
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError('expected a JSON object')
+
+
+def text_stream(fileobj, encoding='utf-8'):
+    """Wrap a binary file (e.g. an UploadedFile) as a text stream without reading it all."""
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+
+
+def _text(row, field):
+    """The stripped text of ``field``; NDJSON numbers are taken as text, other JSON values rejected."""
+    value = row.get(field)
+    if value is None:
+        return ''
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f'{field} must be text')
+    return str(value).strip()
+
+
+def _clean(row):
+    name = _text(row, 'name')
+    if not name:
+        raise ValueError('name is required')
+    try:
+        price = Decimal(str(row.get('price', '')).strip()).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"invalid price {row.get('price')!r}")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"invalid price {row.get('price')!r}")
+    try:
+        stock = int(row.get('stock') or 0)
+        reorder_level = row.get('reorder_level')
+        reorder_level = DEFAULT_REORDER_LEVEL if reorder_level in (None, '') else int(reorder_level)
+    except (TypeError, ValueError):
+        raise ValueError('stock and reorder_level must be integers')
+    return {
+        'sn': _text(row, 'sn'),
+        'name': name[:100],
+        'category': _text(row, 'category')[:100],
+        'description': _text(row, 'description'),
+        'stock': stock,
+        'reorder_level': reorder_level,
+        'price': price,
+    }
+
+
+class ItemImporter:
+    def __init__(self, user, batch_size=DEFAULT_BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        self.categories = dict(Category.objects.filter(user=user).values_list('name', 'pk'))
+
+    def run(self, stream, fmt='csv', progress=None):
+        """Import every row; ``progress(rows)`` is called after each chunk."""
+        result = ImportResult()
+        started = time.perf_counter()
+        chunk = []
+        for line, row in iter_rows(stream, fmt):
+            if isinstance(row, Exception):
+                result.add_error(line, row)
+                continue
+            try:
+                chunk.append((line, _clean(row)))
+            except ValueError as exc:
+                result.add_error(line, exc)
+                continue
+            if len(chunk) >= self.batch_size:
+                self._write_chunk(chunk, result)
+                chunk = []
+                if progress is not None:
+                    progress(result.rows)
+        if chunk:
+            self._write_chunk(chunk, result)
+        if progress is not None:
+            progress(result.rows)
+
+        # bulk_create/bulk_update skip the signal handlers, so refresh the
+        # dashboard rollup once for the whole import
+        rebuild_user_metrics(self.user.pk)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def _category_id(self, name):
+        if not name:
+            return None
+        if name not in self.categories:
+            category = Category.objects.create(user=self.user, name=name)
+            self.categories[name] = category.pk
+        return self.categories[name]
+
+    def _write_chunk(self, chunk, result):
+        with transaction.atomic(using=tenant_db()):
+            sns = {data['sn'] for _, data in chunk if data['sn']}
+            existing = {}
+            if sns:
+                existing = {item.sn: item for item in Item.objects.filter(user=self.user, sn__in=sns)}
+
+            new_items, changed = [], {}
+            # Stock of each updated item before this chunk, for the ledger
+            previous = {}
+            now = timezone.now()
+            for line, data in chunk:
+                category_id = self._category_id(data.pop('category'))
+                sn = data.pop('sn')
+                if sn:
+                    item = existing.get(sn)
+                    if item is None:
+                        result.add_error(line, f'no item with SN {sn}')
+                        continue
+                    previous.setdefault(item.pk, item.stock)
+                    for field, value in data.items():
+                        setattr(item, field, value)
+                    item.category_id = category_id
+                    item.updated_at = now
+                    changed[item.pk] = item
+                else:
+                    new_items.append(Item(user=self.user, category_id=category_id, **data))
+
+            if new_items:
+                for item, sn in zip(new_items, allocate_sns(self.user.pk, len(new_items))):
+                    item.sn = str(sn)
+                Item.objects.bulk_create(new_items, batch_size=self.batch_size)
+            if changed:
+                Item.objects.bulk_update(list(changed.values()), UPDATE_FIELDS, batch_size=self.batch_size)
+            stock.record_bulk_stock([*new_items, *changed.values()], previous, note='Import')
+        result.created += len(new_items)
+        result.updated += len(changed)
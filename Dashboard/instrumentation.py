@@ -0,0 +1,235 @@
+"""Per-view SQL and latency metrics, exposed in Prometheus text format.
+
+Every database connection gets an execute wrapper (installed when the
+connection opens) that times each statement and hands it to the recorder of
+the request being served. The recorder lives in a context variable, so
+queries run from sync_to_async worker threads of an async view are counted
+against that view too. Outside a request the wrapper is a single
+ContextVar lookup.
+
+At the end of each request RequestMetricsMiddleware folds the recorder into
+process-wide histograms keyed by URL name. Statements run more than once in
+one request (same SQL, parameters aside) are counted as duplicate-query
+signatures, which is what an N+1 looks like from here.
+"""
+import contextvars
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+MAX_SIGNATURES = 500
+SQL_SAMPLE_LENGTH = 200
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+_current = contextvars.ContextVar('dashboard_query_recorder', default=None)
+
+
+class QueryRecorder:
+    """Counts, times and fingerprints the statements of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+
+def record_queries(execute, sql, params, many, context):
+    recorder = _current.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def signature(sql):
+    """Short stable id for a statement; IN lists of any length collapse together."""
+    normalized = _IN_LIST.sub('IN (...)', sql)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """Yield (le, cumulative count) pairs, ending with +Inf."""
+        running = 0
+        for bound, n in zip(self.buckets, self.counts):
+            running += n
+            yield _format_number(bound), running
+        yield '+Inf', self.count
+
+
+class Registry:
+    """Process-wide metric store; one instance per worker process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.latency = {}
+        self.sql_time = {}
+        self.queries = {}
+        self.requests = Counter()
+        self.duplicates = Counter()
+        self.statements = {}
+
+    def observe(self, view, method, status, seconds, recorder):
+        with self.lock:
+            self.requests[(view, method, str(status))] += 1
+            self.latency.setdefault(view, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.sql_time.setdefault(view, Histogram(LATENCY_BUCKETS)).observe(recorder.seconds)
+            self.queries.setdefault(view, Histogram(QUERY_COUNT_BUCKETS)).observe(recorder.count)
+            for sql, n in recorder.statements.items():
+                if n < 2:
+                    continue
+                sig, normalized = signature(sql)
+                if sig not in self.statements:
+                    if len(self.statements) >= MAX_SIGNATURES:
+                        continue
+                    self.statements[sig] = normalized[:SQL_SAMPLE_LENGTH]
+                self.duplicates[(view, sig)] += n - 1
+
+    def render(self):
+        lines = []
+        with self.lock:
+            lines += _counter('dashboard_requests_total', 'Requests served, by view, method and status.',
+                              ('view', 'method', 'status'), self.requests)
+            lines += _histograms('dashboard_request_duration_seconds', 'Time spent handling the request.', self.latency)
+            lines += _histograms('dashboard_request_sql_seconds', 'Time spent in SQL per request.', self.sql_time)
+            lines += _histograms('dashboard_request_queries', 'SQL statements executed per request.', self.queries)
+            lines += _counter('dashboard_duplicate_queries_total',
+                              'Repeats of the same statement within one request (N+1 candidates).',
+                              ('view', 'signature'), self.duplicates)
+            lines += ['# HELP dashboard_duplicate_query_info SQL behind each duplicate-query signature.',
+                      '# TYPE dashboard_duplicate_query_info gauge']
+            lines += [f'dashboard_duplicate_query_info{{signature="{sig}",sql="{_escape(sql)}"}} 1'
+                      for sig, sql in sorted(self.statements.items())]
+        return '\n'.join(lines) + '\n'
+
+
+def _format_number(value):
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _counter(name, help_text, label_names, counter):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+    for key, value in sorted(counter.items()):
+        lines.append(f'{name}{{{_labels(label_names, key)}}} {value}')
+    return lines
+
+
+def _histograms(name, help_text, by_view):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for view, histogram in sorted(by_view.items()):
+        view_label = _labels(('view',), (view,))
+        for le, count in histogram.samples():
+            lines.append(f'{name}_bucket{{{view_label},le="{le}"}} {count}')
+        lines.append(f'{name}_sum{{{view_label}}} {_format_number(histogram.sum)}')
+        lines.append(f'{name}_count{{{view_label}}} {histogram.count}')
+    return lines
+
+
+registry = Registry()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    """Record latency and SQL statistics for every request into ``registry``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, recorder, started)
+        return response
+
+    async def __acall__(self, request):
+        recorder, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, recorder, started)
+        return response
+
+    def _start(self):
+        recorder = QueryRecorder()
+        return recorder, _current.set(recorder), time.perf_counter()
+
+    def _finish(self, request, response, recorder, started):
+        view = _view_name(request)
+        if view == 'metrics':
+            return
+        registry.observe(view, request.method, response.status_code, time.perf_counter() - started, recorder)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; open to METRICS_ALLOWED_IPS and staff users."""
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
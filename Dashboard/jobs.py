@@ -0,0 +1,335 @@
+"""Database-backed background jobs.
+
+Heavy work (imports, exports, rollup and forecast rebuilds) is queued as a
+Job row and run by ``manage.py run_jobs``, so web workers only insert a row.
+The worker claims jobs and runs them on a process pool (one process per
+core by default, so CPU-bound tasks are not held back by the GIL) or, with
+``--threads``, a thread pool.
+
+A task is registered with ``@task`` and called as ``func(job, progress)``
+inside ``use_tenant(job.user)``. It returns a JSON-serialisable result and
+reports progress with ``progress(done, total=None, message=None)``.
+
+Jobs of a user who is being moved to another shard are not claimed until
+the move is over (see Dashboard.sharding).
+
+Concurrency is limited three ways: the pool size, a task's
+``concurrency`` (running jobs of that task across all workers) and
+MAX_RUNNING_PER_USER, so one tenant's jobs do not all queue on their
+shard's single SQLite writer at once. A failed job is retried up to its
+task's ``max_attempts`` with exponential backoff. A running job whose
+worker stops sending heartbeats for STALE_AFTER counts as a failed
+attempt.
+"""
+import datetime
+import multiprocessing
+import os
+import socket
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import exporter, forecasting, metrics, sales
+from .importer import ItemImporter, text_stream
+from .models import Job, TenantShard
+from .sharding import use_tenant
+
+RETRY_DELAY = datetime.timedelta(seconds=30)
+STALE_AFTER = datetime.timedelta(minutes=5)
+HEARTBEAT_SECONDS = 30
+PROGRESS_SECONDS = 1.0
+POLL_SECONDS = 1.0
+MAX_RUNNING_PER_USER = 1
+MAX_RESULT_ERRORS = 20
+
+TASKS = {}
+# Tasks users may queue through the jobs API (imports go through the upload form)
+USER_TASKS = ('export', 'rebuild_metrics', 'rebuild_sales_buckets', 'forecast_demand')
+
+
+class Task:
+    def __init__(self, name, func, max_attempts, concurrency):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+
+def task(name, max_attempts=3, concurrency=None):
+    """Register ``func`` as the task ``name``.
+
+    ``concurrency`` caps how many jobs of this task run at once across all
+    workers (None: only the pool size).
+    """
+    def register(func):
+        TASKS[name] = Task(name, func, max_attempts, concurrency)
+        return func
+    return register
+
+
+def enqueue(task_name, user=None, **params):
+    """Queue ``task_name`` for ``user`` and return the Job; raise ValueError for an unknown task."""
+    if task_name not in TASKS:
+        raise ValueError(f'Unknown task {task_name!r}')
+    return Job.objects.create(user=user, task=task_name, params=params, max_attempts=TASKS[task_name].max_attempts)
+
+
+def job_file(name):
+    """Path of ``name`` in settings.JOB_FILES_DIR (created if missing)."""
+    os.makedirs(settings.JOB_FILES_DIR, exist_ok=True)
+    return os.path.join(settings.JOB_FILES_DIR, name)
+
+
+def save_upload(upload):
+    """Copy an uploaded file to JOB_FILES_DIR for a job to read; return its path."""
+    path = job_file(f'upload-{uuid.uuid4().hex}')
+    with open(path, 'wb') as out:
+        for chunk in upload.chunks():
+            out.write(chunk)
+    return path
+
+
+def describe(job):
+    """JSON-ready status of ``job`` for the status endpoint."""
+    total = job.progress_total
+    return {
+        'id': job.pk,
+        'task': job.task,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': {
+            'done': job.progress_done,
+            'total': total,
+            'percent': round(100 * job.progress_done / total, 1) if total else None,
+        },
+        'message': job.message,
+        'result': job.result,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def claim(worker):
+    """Mark the next runnable job as running on ``worker`` and return it, or None.
+
+    With BEGIN IMMEDIATE (settings.SQLITE_TUNED) the limit checks and the
+    claim are serialized across workers; the conditional UPDATE alone keeps
+    two workers from claiming the same job.
+    """
+    now = timezone.now()
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        running = Job.objects.filter(status=Job.RUNNING)
+        per_task = dict(running.values_list('task').annotate(n=Count('id')).order_by())
+        full = [
+            name for name, registered in TASKS.items()
+            if registered.concurrency is not None and per_task.get(name, 0) >= registered.concurrency
+        ]
+        busy_users = (
+            running.filter(user__isnull=False).values('user_id')
+            .annotate(n=Count('id')).filter(n__gte=MAX_RUNNING_PER_USER).values('user_id')
+        )
+        moving_users = TenantShard.objects.filter(moving=True).values('user_id')
+        candidates = (
+            Job.objects.filter(status=Job.QUEUED, run_after__lte=now, task__in=list(TASKS))
+            .exclude(task__in=full).exclude(user_id__in=busy_users).exclude(user_id__in=moving_users)
+            .order_by('run_after', 'pk')
+        )
+        for pk in candidates.values_list('pk', flat=True)[:1]:
+            claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, worker=worker, attempts=F('attempts') + 1,
+                started_at=now, heartbeat_at=now, finished_at=None,
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+    return None
+
+
+def fail_attempt(job, error):
+    """Record a failed attempt: queue a retry with backoff, or fail the job if it is out of attempts."""
+    now = timezone.now()
+    rows = Job.objects.filter(pk=job.pk, status=Job.RUNNING)
+    if job.attempts < job.max_attempts:
+        delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+        rows.update(status=Job.QUEUED, run_after=now + delay, error=error, worker='', heartbeat_at=None)
+    else:
+        rows.update(status=Job.FAILED, finished_at=now, error=error)
+
+
+def requeue_stale():
+    """Fail the current attempt of jobs whose worker stopped sending heartbeats; return how many."""
+    stale = list(Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=timezone.now() - STALE_AFTER))
+    for job in stale:
+        fail_attempt(job, f'Worker {job.worker} stopped responding')
+    return len(stale)
+
+
+class Progress:
+    """The ``progress`` callable handed to tasks; writes at most every PROGRESS_SECONDS."""
+
+    def __init__(self, job):
+        self.job = job
+        self.done = 0
+        self.total = None
+        self.written = 0.0
+
+    def __call__(self, done, total=None, message=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if message is None and now - self.written < PROGRESS_SECONDS:
+            return
+        self.written = now
+        fields = {'progress_done': done, 'progress_total': self.total}
+        if message is not None:
+            fields['message'] = message[:255]
+        Job.objects.filter(pk=self.job.pk).update(**fields)
+
+
+def _run(job_id):
+    job = Job.objects.select_related('user').get(pk=job_id)
+    progress = Progress(job)
+    try:
+        func = TASKS[job.task].func
+        if job.user is not None:
+            with use_tenant(job.user):
+                result = func(job, progress)
+        else:
+            result = func(job, progress)
+    except Exception:
+        fail_attempt(job, traceback.format_exc())
+    else:
+        Job.objects.filter(pk=job_id, status=Job.RUNNING).update(
+            status=Job.SUCCEEDED, result=result, error='', finished_at=timezone.now(),
+            progress_done=progress.done, progress_total=progress.total if progress.total is not None else progress.done,
+        )
+    return Job.objects.values_list('status', flat=True).get(pk=job_id)
+
+
+def execute(job_id):
+    """Run a claimed job (in a pool worker); return its new status."""
+    try:
+        return _run(job_id)
+    finally:
+        # Thread workers each hold their own connections
+        connections.close_all()
+
+
+def _pool(size, threads):
+    if threads:
+        return ThreadPoolExecutor(size, thread_name_prefix='job')
+    # Fresh interpreters rather than forks of a process with open database connections
+    return ProcessPoolExecutor(size, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup)
+
+
+def run_worker(size=None, threads=False, poll=POLL_SECONDS, burst=False, log=None):
+    """Claim and run jobs until interrupted, or with ``burst`` until nothing is runnable.
+
+    Returns the number of jobs run. Jobs still running when the worker stops
+    are put back in the queue as failed attempts.
+    """
+    size = size or os.cpu_count() or 1
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    log = log or (lambda message: None)
+    running = {}
+    finished = 0
+    heartbeat = 0.0
+    pool = _pool(size, threads)
+    try:
+        while True:
+            if time.monotonic() - heartbeat >= HEARTBEAT_SECONDS:
+                heartbeat = time.monotonic()
+                Job.objects.filter(pk__in=[job.pk for job in running.values()], status=Job.RUNNING).update(
+                    heartbeat_at=timezone.now(),
+                )
+                requeue_stale()
+            while len(running) < size and (job := claim(name)) is not None:
+                running[pool.submit(execute, job.pk)] = job
+                log(f'Started {job.task} #{job.pk} (attempt {job.attempts}/{job.max_attempts}).')
+            if not running:
+                if burst:
+                    break
+                time.sleep(poll)
+                continue
+
+            done, _ = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                job = running.pop(future)
+                try:
+                    status = future.result()
+                except BrokenProcessPool as exc:
+                    broken = True
+                    fail_attempt(job, f'Worker process died: {exc}')
+                    status = 'worker process died'
+                finished += 1
+                log(f'{job.task} #{job.pk}: {status}.')
+            if broken:
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = _pool(size, threads)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        for job in running.values():
+            fail_attempt(job, 'Worker stopped')
+    return finished
+
+
+@task('import_items', max_attempts=1, concurrency=2)
+def import_items(job, progress):
+    """Import a file saved with save_upload(); not retried, since a partial import is not idempotent."""
+    path = job.params['path']
+    try:
+        with open(path, 'rb') as fileobj:
+            result = ItemImporter(job.user).run(text_stream(fileobj), job.params['format'], progress=progress)
+    finally:
+        os.remove(path)
+    return {
+        'created': result.created,
+        'updated': result.updated,
+        'failed': result.failed,
+        'errors': result.errors[:MAX_RESULT_ERRORS],
+        'rows_per_second': round(result.rows_per_second),
+    }
+
+
+@task('export')
+def export(job, progress):
+    """Write an items/transactions export to JOB_FILES_DIR; the result names the file."""
+    kind = job.params['kind']
+    filters = exporter.parse_filters(job.params)
+    fmt = filters.pop('format')
+    filename = f'export-{job.pk}.{fmt}'
+    chunks = 0
+    with open(job_file(filename), 'w', encoding='utf-8', newline='') as out:
+        for chunk in exporter.EXPORTS[kind](job.user, fmt, **filters):
+            out.write(chunk)
+            chunks += 1
+            progress(chunks)
+    return {'file': filename, 'kind': kind, 'format': fmt, 'rows': chunks - (fmt == 'csv')}
+
+
+@task('rebuild_metrics')
+def rebuild_metrics(job, progress):
+    rollup = metrics.rebuild_user_metrics(job.user_id)
+    return {'total_items': rollup.total_items, 'low_stock': rollup.low_stock}
+
+
+@task('rebuild_sales_buckets')
+def rebuild_sales_buckets(job, progress):
+    return {'buckets': sales.rebuild_sales_buckets([job.user_id])}
+
+
+@task('forecast_demand')
+def forecast_demand(job, progress):
+    return {'items': forecasting.forecast_user(job.user_id)}
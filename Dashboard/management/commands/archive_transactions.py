@@ -0,0 +1,41 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from Dashboard.archive import ARCHIVE_BATCH_SIZE, archive_transactions
+from Dashboard.forecasting import WINDOW_WEEKS
+from Dashboard.sharding import shards
+
+
+class Command(BaseCommand):
+    help = ('Move transactions older than --keep-days into per-year archive tables, a batch at a time. '
+            'Sales summaries keep counting them.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=settings.TRANSACTION_ARCHIVE_AFTER_DAYS,
+                            help='Keep transactions from the last N days in the hot table')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Rows moved per transaction')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        # Demand forecasts read the hot table only
+        minimum = WINDOW_WEEKS * 7
+        if options['keep_days'] < minimum:
+            raise CommandError(f'--keep-days must be at least {minimum} (the demand forecast window).')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        before = timezone.now() - datetime.timedelta(days=options['keep_days'])
+        verbose = options['verbosity'] > 1
+
+        for alias in shards():
+            started = time.perf_counter()
+            moved = archive_transactions(
+                before, alias, batch_size=options['batch_size'], pause=options['pause'],
+                log=(lambda message, alias=alias: self.stdout.write(f'{alias}: {message}')) if verbose else None,
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: archived {moved} transaction(s) before {before:%Y-%m-%d} in {time.perf_counter() - started:.1f}s.'
+            ))
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from Dashboard.probes import percentile
+
+# (sync view, async view, query string)
+PAIRS = [
+    ('index', 'async_index', ''),
+    ('items_list', 'async_items_list', ''),
+    ('low_stock', 'async_low_stock', ''),
+    ('transaction_list', 'async_transaction_list', ''),
+    ('sales_data', 'async_sales_data', 'period=weekly'),
+    ('sales_data', 'async_sales_data', 'period=yearly'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare WSGI (sync views, thread pool) and ASGI (async views, event loop) latency against the configured database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username to run the views as')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per view and handler')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+        total, concurrency = options['requests'], options['concurrency']
+
+        setup_test_environment()
+        try:
+            self.stdout.write(f'{total} requests per view, {concurrency} concurrent, database {connection.settings_dict["NAME"]}')
+            self.stdout.write(f'{"view":<32}{"handler":<8}{"p50 ms":>10}{"p95 ms":>10}{"req/s":>10}')
+            for sync_name, async_name, query in PAIRS:
+                suffix = f'?{query}' if query else ''
+                for handler, name, run in (('wsgi', sync_name, self.run_wsgi), ('asgi', async_name, self.run_asgi)):
+                    path = reverse(f'dashboard:{name}') + suffix
+                    started = time.perf_counter()
+                    latencies = run(user, path, total, concurrency)
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f'{name + suffix:<32}{handler:<8}'
+                        f'{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}'
+                        f'{len(latencies) / elapsed:>10.0f}'
+                    )
+        finally:
+            teardown_test_environment()
+
+    def run_wsgi(self, user, path, total, concurrency):
+        local = threading.local()
+
+        def one(_):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+                local.client.force_login(user)
+            started = time.perf_counter()
+            response = local.client.get(path)
+            latency = time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(f'GET {path} returned {response.status_code}')
+            return latency
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(one, range(total)))
+
+    def run_asgi(self, user, path, total, concurrency):
+        async def main():
+            client = AsyncClient()
+            await client.aforce_login(user)
+            limit = asyncio.Semaphore(concurrency)
+
+            async def one():
+                async with limit:
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    latency = time.perf_counter() - started
+                if response.status_code != 200:
+                    raise CommandError(f'GET {path} returned {response.status_code}')
+                return latency
+
+            return await asyncio.gather(*(one() for _ in range(total)))
+
+        return asyncio.run(main())
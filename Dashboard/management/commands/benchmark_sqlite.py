@@ -0,0 +1,127 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+from Dashboard.models import Item, Transaction
+from Dashboard.probes import percentile
+from Dashboard.sqlite_tuning import journal_mode
+
+MODES = {
+    # SQLite's defaults: rollback journal, deferred transactions, a new connection per request
+    'default': {'PRAGMAS': {'journal_mode': 'DELETE'}, 'CONN_MAX_AGE': 0, 'OPTIONS': {}},
+    'tuned': {'PRAGMAS': settings.SQLITE_PRAGMAS, 'CONN_MAX_AGE': 600, 'OPTIONS': {'transaction_mode': 'IMMEDIATE'}},
+}
+
+
+class Command(BaseCommand):
+    help = ('Run concurrent readers and writers (sale inserts with stock decrements) against two copies of the '
+            'SQLite database, one with SQLite defaults and one in the tuned production mode, and compare throughput.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Reader threads')
+        parser.add_argument('--writers', type=int, default=4, help='Writer threads')
+        parser.add_argument('--seconds', type=float, default=10, help='Duration of each run')
+
+    def handle(self, *args, **options):
+        source = connections['default'].settings_dict
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('The default database is not SQLite')
+        items = list(Item.objects.values_list('pk', 'user_id', 'price')[:1000])
+        if not items:
+            raise CommandError('No items to sell; run generate_sample_data first')
+
+        workdir = tempfile.mkdtemp(prefix='ims-bench-')
+        try:
+            self.stdout.write(f'{options["readers"]} readers, {options["writers"]} writers, {options["seconds"]:g}s per mode')
+            self.stdout.write(f'{"mode":<9}{"journal":<9}{"reads/s":>10}{"writes/s":>10}{"read p95 ms":>13}'
+                              f'{"write p95 ms":>14}{"locked":>8}')
+            for mode, overrides in MODES.items():
+                path = os.path.join(workdir, f'{mode}.sqlite3')
+                self.copy_database(source['NAME'], path)
+                alias = f'bench_{mode}'
+                connections.settings[alias] = dict(source, NAME=path, **overrides)
+                try:
+                    self.report(mode, alias, items, options)
+                finally:
+                    connections.close_all()
+                    del connections.settings[alias]
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def copy_database(self, source, target):
+        with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+            src.backup(dst)
+        src.close()
+        dst.close()
+
+    def report(self, mode, alias, items, options):
+        stop = threading.Event()
+        results = {'read': [], 'write': [], 'locked': 0}
+        lock = threading.Lock()
+
+        def reader(n):
+            user_id = items[n % len(items)][1]
+            while not stop.is_set():
+                self.timed(alias, results, lock, 'read', lambda: (
+                    list(Item.objects.using(alias).filter(user_id=user_id).order_by('pk')[:20]),
+                    Transaction.objects.using(alias).filter(user_id=user_id).count(),
+                ))
+            connections[alias].close()
+
+        def writer(n):
+            i = n
+            while not stop.is_set():
+                item_id, user_id, price = items[i % len(items)]
+                i += options['writers']
+                self.timed(alias, results, lock, 'write', lambda: self.sell(alias, item_id, user_id, price))
+            connections[alias].close()
+
+        threads = [threading.Thread(target=reader, args=(n,)) for n in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(n,)) for n in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        seconds = options['seconds']
+        self.stdout.write(
+            f'{mode:<9}{journal_mode(connections[alias]):<9}'
+            f'{len(results["read"]) / seconds:>10.0f}{len(results["write"]) / seconds:>10.0f}'
+            f'{percentile(results["read"], 95) * 1000:>13.1f}{percentile(results["write"], 95) * 1000:>14.1f}'
+            f'{results["locked"]:>8}'
+        )
+
+    def sell(self, alias, item_id, user_id, price):
+        # Raw statements: the model signals would write to the default database
+        with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+            cursor.execute('UPDATE Dashboard_item SET stock = stock - 1 WHERE id = %s', [item_id])
+            cursor.execute(
+                'INSERT INTO Dashboard_transaction (item_id, user_id, amount, created_at) VALUES (%s, %s, %s, %s)',
+                [item_id, user_id, str(Decimal(price)), timezone.now()],
+            )
+
+    def timed(self, alias, results, lock, kind, work):
+        # Each operation stands in for one request: the connection is released
+        # (or kept, with CONN_MAX_AGE) the way request_finished would
+        started = time.perf_counter()
+        try:
+            work()
+        except DatabaseError:
+            with lock:
+                results['locked'] += 1
+            return
+        finally:
+            connections[alias].close_if_unusable_or_obsolete()
+        with lock:
+            results[kind].append(time.perf_counter() - started)
@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard.probes import ViewProbe, percentile, view_paths
+from Dashboard.sample_data import generate
+
+
+class Command(BaseCommand):
+    help = ('Request every dashboard URL through the test client and report p50/p95 latency and SQL query '
+            'counts per view. With --sizes, first generates a bench user per catalogue size (writes to the database).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Benchmark the existing data of this username')
+        parser.add_argument('--sizes', help='Comma-separated items-per-user sizes to generate and benchmark, e.g. 1000,10000')
+        parser.add_argument('--transactions-per-item', type=int, default=10, help='With --sizes: transactions generated per item')
+        parser.add_argument('--years', type=int, default=3, help='With --sizes: years of transaction history')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per URL')
+
+    def handle(self, *args, **options):
+        if not options['user'] and not options['sizes']:
+            raise CommandError('Pass --user and/or --sizes.')
+
+        runs = []
+        if options['user']:
+            try:
+                runs.append(('existing data', User.objects.get(username=options['user'])))
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist")
+        if options['sizes']:
+            for size in (int(s) for s in options['sizes'].split(',')):
+                [user] = generate(
+                    users=1,
+                    items=size,
+                    transactions=size * options['transactions_per_item'],
+                    years=options['years'],
+                    prefix=f'bench-{size}',
+                    log=self.stdout.write,
+                )
+                runs.append((f'{size} items', user))
+
+        for label, user in runs:
+            self.benchmark(label, user, options['repeat'])
+
+    def benchmark(self, label, user, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{label} ({user.username})'))
+        self.stdout.write(f'{"view":<22}{"path":<40}{"status":>7}{"p50 ms":>9}{"p95 ms":>9}{"queries":>9}')
+        with ViewProbe(user) as probe:
+            for name, path in view_paths(user):
+                latencies = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    response, queries = probe.get(path)
+                    latencies.append(time.perf_counter() - started)
+                self.stdout.write(
+                    f'{name:<22}{path[:39]:<40}{response.status_code:>7}'
+                    f'{percentile(latencies, 50) * 1000:>9.1f}{percentile(latencies, 95) * 1000:>9.1f}{len(queries):>9}'
+                )
@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from Dashboard.probes import ViewProbe, view_paths
+
+
+class Command(BaseCommand):
+    help = "Request every dashboard view as a user and print the SQLite query plan of each SELECT it runs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username to run the views as')
+        parser.add_argument('--scans-only', action='store_true', help='Only print queries whose plan contains a full table SCAN')
+
+    def handle(self, *args, **options):
+        if any(connection.vendor != 'sqlite' for connection in connections.all()):
+            raise CommandError('explain_queries reads SQLite query plans; not every database is SQLite.')
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+
+        scans = 0
+        with ViewProbe(user) as probe:
+            for name, path in view_paths(user):
+                response, queries = probe.get(path)
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{name}  GET {path}  -> {response.status_code}, {len(queries)} queries'))
+                for query in queries:
+                    sql = query['sql']
+                    if not sql.lstrip().upper().startswith('SELECT'):
+                        continue
+                    plan = self.explain(query['alias'], sql)
+                    full_scan = any(line.startswith('SCAN') and 'USING' not in line for line in plan)
+                    scans += full_scan
+                    if options['scans_only'] and not full_scan:
+                        continue
+                    self.stdout.write(f"  [{query['alias']}] {sql}")
+                    for line in plan:
+                        style = self.style.WARNING if line.startswith('SCAN') and 'USING' not in line else str
+                        self.stdout.write(style(f'    {line}'))
+
+        self.stdout.write(self.style.SUCCESS(f'{scans} query plan(s) with a full table scan.'))
+
+    def explain(self, alias, sql):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
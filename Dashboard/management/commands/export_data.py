@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard import exporter
+from Dashboard.sharding import use_tenant
+
+
+class Command(BaseCommand):
+    help = "Stream a user's items or transactions to CSV/NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['items', 'transactions'])
+        parser.add_argument('--user', required=True, help='Username whose data is exported')
+        parser.add_argument('--format', choices=exporter.FORMATS, default='csv')
+        parser.add_argument('--category', help='Only rows in this category id')
+        parser.add_argument('--start', help='Only rows created on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Only rows created on or before this date (YYYY-MM-DD)')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+        try:
+            filters = exporter.parse_filters(options)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        fmt = filters.pop('format')
+
+        export = exporter.export_items if options['kind'] == 'items' else exporter.export_transactions
+        with use_tenant(user):
+            chunks = export(user, fmt, **filters)
+            if options['output']:
+                with open(options['output'], 'w', newline='', encoding='utf-8') as out:
+                    out.writelines(chunks)
+            else:
+                for chunk in chunks:
+                    self.stdout.write(chunk, ending='')
@@ -0,0 +1,42 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard import forecasting
+from Dashboard.sharding import use_tenant
+
+
+class Command(BaseCommand):
+    help = 'Compute per-item demand forecasts and reorder points from sales history (requires NumPy).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', help='Username to forecast (repeatable). Defaults to all users.')
+        parser.add_argument('--weeks', type=int, default=forecasting.WINDOW_WEEKS, help='Weeks of sales history to use')
+        parser.add_argument('--lead-time', type=float, default=forecasting.LEAD_TIME_DAYS, help='Supplier lead time in days')
+        parser.add_argument('--service-level', type=float, default=forecasting.SERVICE_LEVEL,
+                            help='Chance of not running out during the lead time (0-1)')
+
+    def handle(self, *args, **options):
+        if forecasting.np is None:
+            raise CommandError('forecast_demand needs NumPy: pip install numpy')
+        if options['weeks'] < 1:
+            raise CommandError('--weeks must be at least 1')
+        if not 0 < options['service_level'] < 1:
+            raise CommandError('--service-level must be between 0 and 1')
+
+        users = User.objects.order_by('pk')
+        if options['users']:
+            users = users.filter(username__in=options['users'])
+
+        total = 0
+        started = time.perf_counter()
+        for user in users.only('pk').iterator():
+            with use_tenant(user):
+                total += forecasting.forecast_user(
+                    user.pk,
+                    weeks=options['weeks'],
+                    lead_time=options['lead_time'],
+                    service_level=options['service_level'],
+                )
+        self.stdout.write(self.style.SUCCESS(f'Forecast {total} item(s) in {time.perf_counter() - started:.1f}s.'))
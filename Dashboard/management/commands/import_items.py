@@ -0,0 +1,42 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard.importer import DEFAULT_BATCH_SIZE, ItemImporter, detect_format
+from Dashboard.sharding import moving_user_ids, use_tenant
+
+
+class Command(BaseCommand):
+    help = 'Stream-import items for a user from a CSV or NDJSON file ("-" reads stdin).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV/NDJSON file to import, or - for stdin')
+        parser.add_argument('--user', required=True, help='Username that will own the items')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']!r} does not exist")
+        if user.pk in moving_user_ids():
+            raise CommandError(f"User {options['user']!r} is being moved to another shard; try again later")
+
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        with use_tenant(user):
+            importer = ItemImporter(user, batch_size=options['batch_size'])
+            if path == '-':
+                result = importer.run(sys.stdin, fmt)
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    result = importer.run(stream, fmt)
+
+        for error in result.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created}, updated {result.updated}, failed {result.failed} '
+            f'in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s).'
+        ))
@@ -0,0 +1,48 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard.reorder import scan_user
+from Dashboard.sharding import (
+    MOVE_BATCH_SIZE, MOVE_JOB_TIMEOUT, MOVE_SETTLE_SECONDS, move_tenant, placement, shards, use_shard,
+)
+
+
+class Command(BaseCommand):
+    help = ("Move users' inventory to another shard database. Their writes are refused and their jobs held "
+            'while they move, and item/category/transaction ids change.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', required=True, help='Username to move (repeatable)')
+        parser.add_argument('--to', required=True, dest='target', help='Shard database alias to move them to')
+        parser.add_argument('--batch-size', type=int, default=MOVE_BATCH_SIZE, help='Rows per bulk_create batch')
+        parser.add_argument('--settle', type=float, default=MOVE_SETTLE_SECONDS,
+                            help='Seconds to let in-flight writes finish before copying')
+        parser.add_argument('--job-timeout', type=float, default=MOVE_JOB_TIMEOUT,
+                            help="Seconds to wait for a user's running jobs before giving up on them")
+
+    def handle(self, *args, **options):
+        target = options['target']
+        if target not in shards():
+            raise CommandError(f"Unknown shard {target!r}; configured: {', '.join(shards())}")
+        users = list(User.objects.filter(username__in=options['users']).order_by('pk'))
+        missing = set(options['users']) - {user.username for user in users}
+        if missing:
+            raise CommandError(f"No such user(s): {', '.join(sorted(missing))}")
+
+        for user in users:
+            source, _ = placement(user)
+            started = time.perf_counter()
+            try:
+                copied = move_tenant(user, target, batch_size=options['batch_size'],
+                                     settle=options['settle'], job_timeout=options['job_timeout'])
+            except TimeoutError as exc:
+                raise CommandError(str(exc))
+            # The scanners skipped the user during the move, and the new
+            # shard's incremental pass does not see the copied items
+            with use_shard(target):
+                scan_user(user.pk)
+            self.stdout.write(self.style.SUCCESS(
+                f'{user.username}: {source} -> {target}, {copied} row(s) in {time.perf_counter() - started:.1f}s.'
+            ))
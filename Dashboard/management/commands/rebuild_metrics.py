@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from Dashboard.metrics import rebuild_user_metrics
+from Dashboard.sharding import moving_user_ids, use_tenant
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-user and per-category dashboard metrics from the item tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', help='Username to rebuild (repeatable). Defaults to all users.')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['users']:
+            users = users.filter(username__in=options['users'])
+
+        count = 0
+        for user in users.only('pk').iterator():
+            if user.pk in moving_user_ids():
+                self.stdout.write(f'Skipped user {user.pk}: moving to another shard.')
+                continue
+            with use_tenant(user):
+                rebuild_user_metrics(user.pk)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt metrics for {count} user(s).'))
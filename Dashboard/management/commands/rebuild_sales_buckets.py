@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from Dashboard.sales import rebuild_sales_buckets
+from Dashboard.sharding import shards, use_shard, use_tenant
+
+
+class Command(BaseCommand):
+    help = 'Backfill the daily/monthly/yearly sales rollups from the Transaction table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', help='Username to rebuild (repeatable). Defaults to all users.')
+
+    def handle(self, *args, **options):
+        written = 0
+        if options['users']:
+            for user in User.objects.filter(username__in=options['users']).only('pk'):
+                with use_tenant(user):
+                    written += rebuild_sales_buckets([user.pk])
+        else:
+            for alias in shards():
+                with use_shard(alias):
+                    written += rebuild_sales_buckets()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} sales bucket(s).'))
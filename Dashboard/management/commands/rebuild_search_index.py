@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from Dashboard.search import rebuild_index
+from Dashboard.sharding import shards, use_shard
+
+
+class Command(BaseCommand):
+    help = 'Refill the item full-text search index (SQLite FTS5) from the item table, on every shard.'
+
+    def handle(self, *args, **options):
+        count = 0
+        for alias in shards():
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError('The full-text index is only used with SQLite')
+            with use_shard(alias), transaction.atomic(using=alias):
+                count += rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} item(s).'))
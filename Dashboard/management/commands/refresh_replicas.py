@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from Dashboard.replicas import refresh_sqlite_replica, replicas
+
+
+class Command(BaseCommand):
+    help = ('Re-copy each SQLite database to its read replica (settings.DASHBOARD_REPLICAS). '
+            'Run from cron, or keep running with --loop.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep refreshing every --interval seconds')
+        parser.add_argument('--interval', type=float, default=settings.REPLICA_REFRESH_SECONDS,
+                            help='Seconds between refreshes with --loop')
+
+    def handle(self, *args, **options):
+        pairs = replicas()
+        if not pairs:
+            raise CommandError('No replicas configured (set IMS_REPLICAS=1).')
+        for primary in pairs:
+            if connections[primary].vendor != 'sqlite':
+                raise CommandError(f'{primary!r} is not SQLite; replicate it with the database\'s own tooling.')
+
+        while True:
+            for primary, replica in pairs.items():
+                started = time.perf_counter()
+                size = refresh_sqlite_replica(primary, replica)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{primary} -> {replica}: {size / 1024 / 1024:.1f} MiB in {time.perf_counter() - started:.2f}s.'
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Dashboard import jobs
+
+
+class Command(BaseCommand):
+    help = ('Run queued background jobs (imports, exports, rollup and forecast rebuilds) on a pool of '
+            'worker processes, one per core by default. Stop with Ctrl+C.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Jobs to run at once')
+        parser.add_argument('--threads', action='store_true', help='Use threads instead of processes')
+        parser.add_argument('--poll', type=float, default=jobs.POLL_SECONDS, help='Seconds between queue checks when idle')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is runnable')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        pool = 'threads' if options['threads'] else 'processes'
+        self.stdout.write(f"Running jobs on up to {options['workers']} {pool}.")
+        try:
+            count = jobs.run_worker(
+                size=options['workers'],
+                threads=options['threads'],
+                poll=options['poll'],
+                burst=options['burst'],
+                log=self.stdout.write,
+            )
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped; unfinished jobs were queued again.')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Ran {count} job(s).'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Dashboard.reorder import scan
+from Dashboard.sharding import shards, use_shard
+
+
+class Command(BaseCommand):
+    help = ('Refresh the reorder suggestions behind the dashboard low-stock panel, re-checking only items '
+            'changed since the last pass. Run from cron, or keep running with --loop.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Re-check every item instead of only changed ones')
+        parser.add_argument('--loop', action='store_true', help='Keep scanning every --interval seconds')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between passes with --loop')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.perf_counter()
+            checked = written = cleared = 0
+            for alias in shards():
+                with use_shard(alias):
+                    counts = scan(full=full)
+                checked, written, cleared = (total + n for total, n in zip((checked, written, cleared), counts))
+            self.stdout.write(self.style.SUCCESS(
+                f'Checked {checked} item(s): {written} suggestion(s) written, {cleared} cleared '
+                f'in {time.perf_counter() - started:.2f}s.'
+            ))
+            if not options['loop']:
+                break
+            full = False
+            time.sleep(options['interval'])
@@ -0,0 +1,111 @@
+"""Incrementally maintained dashboard metrics.
+
+Every Item/Category write turns into a small delta that is applied to the
+owner's InventoryMetrics row (and the affected CategoryMetrics rows) with
+``F()`` updates, so the dashboard reads a couple of precomputed rows instead
+of aggregating over every item the user owns.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .caching import bump_data_version_on_commit
+from .models import Category, CategoryMetrics, InventoryMetrics, Item
+from .sharding import tenant_db
+
+CENTS = Decimal('0.01')
+
+
+def item_contribution(item):
+    """Return what a single item adds to its owner's rollup."""
+    stock = item.stock or 0
+    price = Decimal(str(item.price or 0)).quantize(CENTS)
+    return {
+        'user_id': item.user_id,
+        'category_id': item.category_id,
+        'low_stock': 1 if stock < (item.reorder_level or 0) else 0,
+        'total_value': stock * price,
+    }
+
+
+def apply_item_delta(old=None, new=None):
+    """Move an item's contribution from ``old`` to ``new``.
+
+    Either side may be None (create / delete). Both are dicts produced by
+    item_contribution().
+    """
+    if old == new:
+        return
+    rebuilt = set()
+    with transaction.atomic(using=tenant_db()):
+        for sign, side in ((-1, old), (1, new)):
+            if not side or side['user_id'] in rebuilt:
+                continue
+            applied = _add_to_user(
+                side['user_id'],
+                total_items=sign,
+                low_stock=sign * side['low_stock'],
+                total_value=sign * side['total_value'],
+            )
+            if applied and side['category_id']:
+                applied = _add_to_category(side['category_id'], sign)
+            if not applied:
+                # No rollup row yet: rebuild it from the tables, which
+                # already include this write.
+                rebuild_user_metrics(side['user_id'])
+                rebuilt.add(side['user_id'])
+
+
+def apply_stock_delta(user_id, low_stock, total_value):
+    """Apply the net effect of bulk stock changes (item counts unchanged)."""
+    if not _add_to_user(user_id, low_stock=low_stock, total_value=total_value):
+        rebuild_user_metrics(user_id)
+
+
+def apply_category_delta(user_id, delta):
+    if not _add_to_user(user_id, categories=delta):
+        rebuild_user_metrics(user_id)
+
+
+def _add_to_user(user_id, **deltas):
+    updates = {field: F(field) + value for field, value in deltas.items() if value}
+    if not updates:
+        return InventoryMetrics.objects.filter(user_id=user_id).exists()
+    return bool(InventoryMetrics.objects.filter(user_id=user_id).update(**updates))
+
+
+def _add_to_category(category_id, delta):
+    return bool(CategoryMetrics.objects.filter(category_id=category_id).update(item_count=F('item_count') + delta))
+
+
+def rebuild_user_metrics(user_id):
+    """Recompute a user's rollup rows from the Item and Category tables."""
+    items = Item.objects.filter(user_id=user_id)
+    totals = items.aggregate(total_value=Sum(F('stock') * F('price')))
+    with transaction.atomic(using=tenant_db()):
+        metrics, _ = InventoryMetrics.objects.update_or_create(
+            user_id=user_id,
+            defaults={
+                'total_items': items.count(),
+                'categories': Category.objects.filter(user_id=user_id).count(),
+                'low_stock': items.filter(stock__lt=F('reorder_level')).count(),
+                'total_value': totals['total_value'] or 0,
+            },
+        )
+        counts = Category.objects.filter(user_id=user_id).annotate(n=Count('item'))
+        CategoryMetrics.objects.filter(category__user_id=user_id).delete()
+        CategoryMetrics.objects.bulk_create(
+            [CategoryMetrics(category_id=c.pk, item_count=c.n) for c in counts]
+        )
+        # Bulk writers (imports, sample data) rely on this to expire cached fragments
+        bump_data_version_on_commit(user_id)
+    return metrics
+
+
+def get_user_metrics(user):
+    """Return the user's rollup, building it on first access."""
+    try:
+        return InventoryMetrics.objects.get(user=user)
+    except InventoryMetrics.DoesNotExist:
+        return rebuild_user_metrics(user.pk)
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0006_category_user'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryMetrics',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics', serialize=False, to='Dashboard.category')),
+                ('item_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Category metrics',
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryMetrics',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory_metrics', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_items', models.IntegerField(default=0)),
+                ('categories', models.IntegerField(default=0)),
+                ('low_stock', models.IntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Inventory metrics',
+            },
+        ),
+    ]
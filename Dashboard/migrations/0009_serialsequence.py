@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0008_salesbucket'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerialSequence',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='serial_sequence', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+            ],
+        ),
+    ]
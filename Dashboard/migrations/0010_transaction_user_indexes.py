@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 10000
+
+
+def backfill_transaction_user(apps, schema_editor):
+    """Copy item.user onto each transaction, one committed pk range at a time."""
+    Item = apps.get_model('Dashboard', 'Item')
+    Transaction = apps.get_model('Dashboard', 'Transaction')
+    db = schema_editor.connection.alias
+    pending = Transaction.objects.using(db).filter(user__isnull=True, item__isnull=False)
+    bounds = pending.aggregate(low=models.Min('pk'), high=models.Max('pk'))
+    if bounds['low'] is None:
+        return
+    owner = Subquery(Item.objects.using(db).filter(pk=OuterRef('item_id')).values('user_id')[:1])
+    for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        with transaction.atomic(using=db):
+            pending.filter(pk__gte=start, pk__lt=start + BATCH_SIZE).update(user_id=owner)
+
+
+class Migration(migrations.Migration):
+
+    # Let each backfill batch commit on its own instead of holding one long lock
+    atomic = False
+
+    dependencies = [
+        ('Dashboard', '0009_serialsequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_transaction_user, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['user', 'sn'], name='item_user_sn_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['user', 'stock'], name='item_user_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'created_at'], name='transaction_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# Full-text index over each item's name, SN, description and category name.
+# rowid is the item id; ``owner`` holds "u<user id>" so a user's matches are
+# found by intersecting two doclists instead of filtering every match.
+# Triggers keep it in step with every write path, including bulk_create,
+# QuerySet.update() and category renames.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE Dashboard_item_fts USING fts5(
+        name, sn, description, category, owner,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '1 2 3 4'
+    )
+    """,
+    """
+    CREATE TRIGGER Dashboard_item_fts_insert AFTER INSERT ON Dashboard_item BEGIN
+        INSERT INTO Dashboard_item_fts (rowid, name, sn, description, category, owner)
+        VALUES (
+            new.id, new.name, coalesce(new.sn, ''), new.description,
+            coalesce((SELECT name FROM Dashboard_category WHERE id = new.category_id), ''),
+            'u' || new.user_id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER Dashboard_item_fts_update AFTER UPDATE OF name, sn, description, category_id, user_id ON Dashboard_item BEGIN
+        DELETE FROM Dashboard_item_fts WHERE rowid = old.id;
+        INSERT INTO Dashboard_item_fts (rowid, name, sn, description, category, owner)
+        VALUES (
+            new.id, new.name, coalesce(new.sn, ''), new.description,
+            coalesce((SELECT name FROM Dashboard_category WHERE id = new.category_id), ''),
+            'u' || new.user_id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER Dashboard_item_fts_delete AFTER DELETE ON Dashboard_item BEGIN
+        DELETE FROM Dashboard_item_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER Dashboard_category_fts_rename AFTER UPDATE OF name ON Dashboard_category BEGIN
+        UPDATE Dashboard_item_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM Dashboard_item WHERE category_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO Dashboard_item_fts (rowid, name, sn, description, category, owner)
+    SELECT i.id, i.name, coalesce(i.sn, ''), i.description, coalesce(c.name, ''), 'u' || i.user_id
+    FROM Dashboard_item i LEFT JOIN Dashboard_category c ON c.id = i.category_id
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS Dashboard_category_fts_rename',
+    'DROP TRIGGER IF EXISTS Dashboard_item_fts_delete',
+    'DROP TRIGGER IF EXISTS Dashboard_item_fts_update',
+    'DROP TRIGGER IF EXISTS Dashboard_item_fts_insert',
+    'DROP TABLE IF EXISTS Dashboard_item_fts',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite-only; other backends fall back to icontains (see Dashboard.search)
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0011_stockmovement'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def keep_old_threshold(apps, schema_editor):
+    """Items saved without a reorder level were flagged below the old fixed threshold of 20; keep that."""
+    Item = apps.get_model('Dashboard', 'Item')
+    Item.objects.using(schema_editor.connection.alias).filter(reorder_level=0).update(reorder_level=20)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0012_item_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderSuggestion',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reorder_suggestion', serialize=False, to='Dashboard.item')),
+                ('stock', models.IntegerField()),
+                ('reorder_level', models.IntegerField()),
+                ('quantity', models.IntegerField(help_text='Suggested order quantity')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_suggestions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScannerCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_scanned_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_user_stock_idx',
+        ),
+        # The default is applied by Django, not the database; altering the
+        # column on SQLite would rebuild the item table and drop the
+        # full-text search triggers
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='item',
+                name='reorder_level',
+                field=models.IntegerField(default=20),
+            ),
+        ]),
+        migrations.RunPython(keep_old_threshold, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('stock__lt', models.F('reorder_level'))), fields=['user'], name='item_user_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['updated_at'], name='item_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:43
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0013_reorder_levels'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemForecast',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='Dashboard.item')),
+                ('daily_demand', models.FloatField()),
+                ('demand_std', models.FloatField(help_text='Standard deviation of daily demand')),
+                ('safety_stock', models.IntegerField()),
+                ('reorder_point', models.IntegerField()),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_forecasts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
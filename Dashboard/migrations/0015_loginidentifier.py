@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_identifiers(apps, schema_editor):
+    """Index every existing username, then every email not already taken by a username."""
+    db = schema_editor.connection.alias
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    LoginIdentifier = apps.get_model('Dashboard', 'LoginIdentifier')
+    rows = {}
+    for pk, username in User.objects.using(db).order_by('pk').values_list('pk', 'username').iterator():
+        rows.setdefault(username.strip().lower(), (pk, 'username'))
+    for pk, email in User.objects.using(db).exclude(email='').order_by('pk').values_list('pk', 'email').iterator():
+        rows.setdefault(email.strip().lower(), (pk, 'email'))
+    LoginIdentifier.objects.using(db).bulk_create(
+        [LoginIdentifier(identifier=identifier, user_id=pk, kind=kind) for identifier, (pk, kind) in rows.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0014_itemforecast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginIdentifier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifier', models.CharField(max_length=254, unique=True)),
+                ('kind', models.CharField(choices=[('username', 'Username'), ('email', 'Email')], max_length=8)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='login_identifiers', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_identifiers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0015_loginidentifier'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaction',
+            name='transaction_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'created_at', 'item', 'amount'], name='transaction_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, migrations, models
+
+
+def keep_existing_tenants(apps, schema_editor):
+    """Users from before sharding keep their data where it is, on the default database."""
+    if schema_editor.connection.alias != DEFAULT_DB_ALIAS:
+        return
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    TenantShard = apps.get_model('Dashboard', 'TenantShard')
+    TenantShard.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+        [TenantShard(user_id=pk, database=DEFAULT_DB_ALIAS) for pk in User.objects.using(DEFAULT_DB_ALIAS).values_list('pk', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0016_transaction_covering_index'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tenant_shard', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('database', models.CharField(max_length=100)),
+                ('moving', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(keep_existing_tenants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Dashboard', '0018_job'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('data', models.BigIntegerField(help_text='Milliseconds since the epoch of the last inventory write')),
+                ('sales', models.BigIntegerField(help_text='Milliseconds since the epoch of the last sales write')),
+            ],
+        ),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+# Items are low on stock when stock < reorder_level; this was the fixed
+# threshold before reorder levels were used
+DEFAULT_REORDER_LEVEL = 20
+
 class Category(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
@@ -14,6 +18,19 @@ class Category(models.Model):
     class Meta:
         verbose_name_plural = 'Categories'
 
+class ItemQuerySet(models.QuerySet):
+    def low_stock(self):
+        """Items below their reorder level (served by item_user_low_stock_idx)."""
+        return self.filter(stock__lt=models.F('reorder_level'))
+
+    def with_total_value(self):
+        """Annotate stock * price in SQL as ``total_value``."""
+        return self.annotate(total_value=models.ExpressionWrapper(
+            models.F('stock') * models.F('price'),
+            output_field=models.DecimalField(max_digits=18, decimal_places=2),
+        ))
+
+
 class Item(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     sn = models.CharField(max_length=20, null=True, blank=True)
@@ -21,11 +38,13 @@ class Item(models.Model):
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     description = models.TextField(blank=True)
     stock = models.IntegerField(default=0)
-    reorder_level = models.IntegerField(default=0)
+    reorder_level = models.IntegerField(default=DEFAULT_REORDER_LEVEL)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ItemQuerySet.as_manager()
+
     @property
     def SN(self):
         return self.sn
@@ -33,18 +52,290 @@ class Item(models.Model):
     def __str__(self):
         return f"{self.name} ({self.SN})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'sn'], name='item_user_sn_idx'),
+            # Partial index holding only the low-stock rows
+            models.Index(fields=['user'], condition=models.Q(stock__lt=models.F('reorder_level')), name='item_user_low_stock_idx'),
+            # Lets the low-stock scanner find items changed since its last pass
+            models.Index(fields=['updated_at'], name='item_updated_idx'),
+        ]
+
+    @property
+    def is_low_stock(self):
+        return self.stock < self.reorder_level
+
+
+
+class LoginIdentifier(models.Model):
+    """A lowercased username or email that a user can log in with.
+
+    Kept in step with auth.User by Dashboard.signals, so
+    EmailOrUsernameModelBackend resolves a login with one unique-index
+    lookup. If another account's email equals someone's username, the
+    username wins.
+    """
+    USERNAME = 'username'
+    EMAIL = 'email'
+    KIND_CHOICES = [(USERNAME, 'Username'), (EMAIL, 'Email')]
+
+    identifier = models.CharField(max_length=254, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='login_identifiers')
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+
+    def __str__(self):
+        return self.identifier
+
+
+class TenantShard(models.Model):
+    """Which database holds a user's inventory (see Dashboard.sharding).
+
+    Lives in the default database. ``moving`` is set while move_tenants
+    copies the user's rows, and writes are refused until it clears.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='tenant_shard')
+    database = models.CharField(max_length=100)
+    moving = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.database}'
+
+
+class DataVersion(models.Model):
+    """A user's data and sales versions (see Dashboard.caching).
+
+    Lives in the default database, so web workers, the run_jobs worker and
+    management commands all read and bump the same versions.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    data = models.BigIntegerField(help_text='Milliseconds since the epoch of the last inventory write')
+    sales = models.BigIntegerField(help_text='Milliseconds since the epoch of the last sales write')
+
+    def __str__(self):
+        return f"Versions of {self.user_id}: data {self.data}, sales {self.sales}"
+
+
+class SerialSequence(models.Model):
+    """Next serial number (SN) to hand out for a user's items.
+
+    Allocated through Dashboard.serials so concurrent creates never share
+    an SN and bulk inserts can reserve a block in one statement.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='serial_sequence')
+    next_value = models.PositiveBigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.user}: next SN {self.next_value}"
 
 class Transaction(models.Model):
     """Simple transaction model to record sales amounts for aggregation.
 
     - item: optional ForeignKey to Item
+    - user: owner, copied from the item so queries skip the join
     - amount: Decimal total for the transaction
     - created_at: timestamp
     """
     item = models.ForeignKey(Item, on_delete=models.SET_NULL, null=True, blank=True)
+    # Indexed through (user, created_at, ...) below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, db_index=False)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # item and amount make it covering for the analytics grouping
+            models.Index(fields=['user', 'created_at', 'item', 'amount'], name='transaction_user_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.item_id:
+            self.user_id = self.item.user_id
+        # Keep the sales rollup update (post_save) in the same DB transaction
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Transaction, instance=self)):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Transaction, instance=self)):
+            return super().delete(*args, **kwargs)
+
     def __str__(self):
         item_label = self.item.name if self.item else 'Unknown'
-        return f"{item_label} - ${self.amount:.2f} on {self.created_at.date()}"
\ No newline at end of file
+        return f"{item_label} - ${self.amount:.2f} on {self.created_at.date()}"
+
+class StockMovement(models.Model):
+    """Append-only ledger of stock changes.
+
+    Sales, receipts and item edits change ``Item.stock`` through
+    Dashboard.stock, which applies ``quantity`` as a single
+    ``F('stock') + n`` UPDATE and records it here in the same DB transaction. ``quantity`` is signed:
+    receipts are positive, sales negative, adjustments either.
+    """
+    RECEIPT = 'receipt'
+    SALE = 'sale'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [(RECEIPT, 'Receipt'), (SALE, 'Sale'), (ADJUSTMENT, 'Adjustment')]
+
+    # Indexed through (item, created_at) below
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='movements', db_index=False)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    quantity = models.IntegerField()
+    stock_after = models.IntegerField()
+    transaction = models.ForeignKey(Transaction, on_delete=models.SET_NULL, null=True, blank=True, related_name='movements')
+    note = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['item', 'created_at'], name='movement_item_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.quantity:+d} of {self.item_id} on {self.created_at.date()}"
+
+class ReorderSuggestion(models.Model):
+    """An item below its reorder level, as of the low-stock scanner's last pass.
+
+    Maintained by Dashboard.reorder (``manage.py scan_low_stock``), which
+    re-evaluates only items changed since its previous pass; the dashboard's
+    low-stock panel reads these rows instead of scanning the item table.
+    """
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='reorder_suggestion')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reorder_suggestions')
+    stock = models.IntegerField()
+    reorder_level = models.IntegerField()
+    quantity = models.IntegerField(help_text='Suggested order quantity')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Reorder {self.quantity} of {self.item_id}"
+
+
+class ItemForecast(models.Model):
+    """Demand forecast and suggested reorder point for an item.
+
+    Computed from sales history by Dashboard.forecasting
+    (``manage.py forecast_demand``) and read by the item list views.
+    Demand is in units per day.
+    """
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='item_forecasts')
+    daily_demand = models.FloatField()
+    demand_std = models.FloatField(help_text='Standard deviation of daily demand')
+    safety_stock = models.IntegerField()
+    reorder_point = models.IntegerField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Forecast for {self.item_id}: reorder at {self.reorder_point}"
+
+
+class ScannerCheckpoint(models.Model):
+    """Where a background scanner left off."""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_scanned_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} at {self.last_scanned_at}"
+
+
+class InventoryMetrics(models.Model):
+    """Per-user dashboard rollup, kept in step with Item/Category writes.
+
+    Updated incrementally by the signal handlers in Dashboard.signals;
+    ``manage.py rebuild_metrics`` recomputes it from scratch if it drifts.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='inventory_metrics')
+    total_items = models.IntegerField(default=0)
+    categories = models.IntegerField(default=0)
+    low_stock = models.IntegerField(default=0)
+    total_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Inventory metrics'
+
+    def __str__(self):
+        return f"Metrics for {self.user}"
+
+
+class CategoryMetrics(models.Model):
+    """Per-category item count shown in the dashboard sidebar."""
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name='metrics')
+    item_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'Category metrics'
+
+    def __str__(self):
+        return f"{self.category.name}: {self.item_count}"
+
+
+class SalesBucket(models.Model):
+    """Pre-aggregated sales per user and day/month/year.
+
+    ``start`` is the first day of the bucket in the current timezone.
+    Maintained from Transaction writes (see Dashboard.signals) and rebuilt
+    with ``manage.py rebuild_sales_buckets``.
+    """
+    DAY = 'day'
+    MONTH = 'month'
+    YEAR = 'year'
+    PERIOD_CHOICES = [(DAY, 'Day'), (MONTH, 'Month'), (YEAR, 'Year')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sales_buckets')
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    start = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period', 'start'], name='unique_sales_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.period} {self.start}: {self.total}"
+
+
+class Job(models.Model):
+    """Background work for the run_jobs worker (see Dashboard.jobs).
+
+    Lives in the default database. ``run_after`` delays a retry;
+    ``heartbeat_at`` is refreshed while a worker runs the job, so jobs of a
+    worker that died can be picked up again.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    task = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    progress_done = models.PositiveBigIntegerField(default=0)
+    progress_total = models.PositiveBigIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's "next runnable job" lookup
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['user', 'created_at'], name='job_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
@@ -0,0 +1,184 @@
+"""Keyset (cursor) pagination.
+
+Offset pagination makes page N cost N pages of scanning plus a COUNT(*) over
+the whole result set. Keyset pagination instead remembers the ordering values
+of the last row shown and asks for rows strictly after it, so every page is
+a single index range read of ``per_page + 1`` rows.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(direction, values):
+    payload = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        direction, values = payload['d'], payload['v']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return direction, values
+
+
+class CursorPage:
+    """One page of a keyset-paginated queryset.
+
+    Mirrors the parts of django.core.paginator.Page the templates use.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` on ``ordering`` (e.g. ``['-created_at', '-pk']``).
+
+    The last ordering field must be unique (normally the primary key) so
+    that rows with equal leading values are still totally ordered.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def get_page(self, cursor=None):
+        """Return the page for ``cursor``; an invalid cursor gives the first page."""
+        direction, values, qs = self._prepare(cursor)
+        return self._build_page(list(qs[:self.per_page + 1]), direction, values)
+
+    async def aget_page(self, cursor=None):
+        """Async version of get_page() using the async ORM."""
+        direction, values, qs = self._prepare(cursor)
+        return self._build_page([obj async for obj in qs[:self.per_page + 1]], direction, values)
+
+    def _prepare(self, cursor):
+        direction, values = 'next', None
+        if cursor:
+            try:
+                direction, values = decode_cursor(cursor)
+                values = self._to_python(values)
+            except (ValueError, TypeError, ValidationError):
+                direction, values = 'next', None
+
+        ordering = self.ordering if direction == 'next' else [self._flip(o) for o in self.ordering]
+        qs = self.queryset.order_by(*ordering)
+        if values is not None:
+            qs = qs.filter(self._after(ordering, values))
+        return direction, values, qs
+
+    def _build_page(self, rows, direction, values):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'prev':
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor('next', self._values(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor('prev', self._values(rows[0]))
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+    def _after(self, ordering, values):
+        # (a, b, c) > (x, y, z)  ==  a > x  OR  (a = x AND b > y)  OR ...
+        condition = Q()
+        equal = {}
+        for name, value in zip(ordering, values):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def _values(self, obj):
+        model = self.queryset.model
+        values = []
+        for name in self.fields:
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            values.append(field.value_to_string(obj))
+        return values
+
+    def _to_python(self, values):
+        if len(values) != len(self.fields):
+            raise InvalidCursor(values)
+        model = self.queryset.model
+        converted = []
+        for name, value in zip(self.fields, values):
+            # Cursors only ever hold scalars; None cannot be compared with gt/lt
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                raise InvalidCursor(values)
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            value = field.to_python(value)
+            if value is None:
+                raise InvalidCursor(values)
+            converted.append(value)
+        return converted
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else '-' + name
+
+
+class KeysetPaginationMixin:
+    """ListView mixin that swaps offset pagination for keyset pagination.
+
+    Set ``keyset_ordering`` on the view. The page is selected with the
+    ``cursor`` GET parameter; templates link to ``page_obj.next_cursor`` and
+    ``page_obj.previous_cursor``.
+
+    The page is fetched the first time the template touches it, so a
+    template that serves the list from a cached fragment runs no query.
+    """
+    keyset_ordering = ('pk',)
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        page = SimpleLazyObject(lambda: paginator.get_page(cursor))
+        return (
+            paginator,
+            page,
+            SimpleLazyObject(lambda: page.object_list),
+            SimpleLazyObject(lambda: page.has_other_pages()),
+        )
@@ -0,0 +1,106 @@
+"""Drive the Dashboard views in-process for diagnostics.
+
+Used by the management commands that inspect query plans and benchmark the
+views: every GET-able URL in Dashboard/urls.py is requested through the
+Django test client as a given user, with the SQL it runs captured on every
+database (tenant shards and replicas included).
+"""
+import contextlib
+import math
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from . import urls
+from .models import Category, Item
+from .sharding import use_tenant
+
+# Views that change the session, only make sense logged out, or are POST-only
+SKIP = {'login', 'logout', 'register', 'sales_batch'}
+
+# Extra query strings worth probing separately
+VARIANTS = {
+    'sales_data': ['period=weekly', 'period=monthly', 'period=yearly'],
+    'async_sales_data': ['period=weekly', 'period=monthly', 'period=yearly'],
+    'item_search': ['q=item', 'q=item 1'],
+    'sales_analytics': ['', 'granularity=hour', 'breakdown=category', 'breakdown=item&top=10'],
+}
+
+
+def _sample_kwargs(user):
+    with use_tenant(user):
+        item = Item.objects.filter(user=user).order_by('pk').first()
+        category = Category.objects.filter(user=user).order_by('pk').first()
+    return {
+        'pk': [item.pk] if item else [],
+        'kind': ['items', 'transactions'],
+        'category': [category.pk] if category else [],
+    }
+
+
+def view_paths(user):
+    """Yield (url name, path) for every GET-able dashboard URL."""
+    samples = _sample_kwargs(user)
+    for pattern in urls.urlpatterns:
+        name = getattr(pattern, 'name', None)
+        if not name or name in SKIP:
+            continue
+        converters = list(pattern.pattern.converters)
+        kwarg_sets = [{}]
+        for key in converters:
+            kwarg_sets = [dict(kw, **{key: value}) for kw in kwarg_sets for value in samples.get(key, [])]
+        for kwargs in kwarg_sets:
+            path = reverse(f'{urls.app_name}:{name}', kwargs=kwargs)
+            for query in VARIANTS.get(name, ['']):
+                yield name, f'{path}?{query}' if query else path
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class ViewProbe:
+    """Logged-in test client that records the SQL of each request."""
+
+    def __init__(self, user):
+        self.user = user
+
+    def __enter__(self):
+        setup_test_environment()
+        self.client = Client(raise_request_exception=False)
+        self.client.force_login(self.user)
+        return self
+
+    def __exit__(self, *exc):
+        teardown_test_environment()
+
+    def get(self, path):
+        """Request ``path``; return (response, captured queries).
+
+        Each query dict also carries the ``alias`` of the database it ran on.
+        Unlike CaptureQueriesContext this does not open a connection to every
+        database up front, only logs the ones the request uses.
+        """
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                # The query log is a bounded deque; start empty so nothing is cut off
+                connection.queries_log.clear()
+                stack.callback(setattr, connection, 'force_debug_cursor', connection.force_debug_cursor)
+                connection.force_debug_cursor = True
+            response = self.client.get(path)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        # Drop the session lookup that every request pays for
+        return response, [
+            dict(query, alias=connection.alias)
+            for connection in connections.all()
+            for query in connection.queries_log if 'django_session' not in query['sql']
+        ]
@@ -0,0 +1,101 @@
+"""Low-stock scanner and the materialized reorder-suggestion list.
+
+Each pass re-evaluates only items whose ``updated_at`` moved since the
+previous pass (every stock write bumps it, including the F() updates in
+Dashboard.stock and bulk imports). An item below its reorder level gets or
+refreshes a ReorderSuggestion row, and one that is not has its row removed.
+The window reaches back OVERLAP before the last pass, so writes that
+committed late are still seen. Re-evaluating an item twice is harmless.
+
+Items of a user being moved to another shard are skipped; move_tenants
+re-checks them all on the new shard with ``scan_user``.
+"""
+import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_data_version_on_commit
+from .models import Item, ReorderSuggestion, ScannerCheckpoint
+from .sharding import moving_user_ids, tenant_db
+
+SCANNER_NAME = 'low_stock'
+OVERLAP = datetime.timedelta(minutes=1)
+BATCH_SIZE = 2000
+# Suggestions restock to this multiple of the reorder level
+TARGET_MULTIPLE = 2
+
+
+def suggested_quantity(stock, reorder_level):
+    return max(reorder_level * TARGET_MULTIPLE - stock, 1)
+
+
+def _batches(since, batch_size, user_id=None):
+    """Yield lists of (pk, user_id, stock, reorder_level); every item if ``since`` is None."""
+    rows = Item.objects.values_list('pk', 'user_id', 'stock', 'reorder_level').order_by('pk')
+    if user_id is not None:
+        rows = rows.filter(user_id=user_id)
+    if since is None:
+        last_pk = 0
+        while batch := list(rows.filter(pk__gt=last_pk)[:batch_size]):
+            last_pk = batch[-1][0]
+            yield batch
+        return
+    # Read the changed ids from item_updated_idx alone, then fetch them by pk
+    changed = list(Item.objects.filter(updated_at__gte=since).values_list('pk', flat=True))
+    for start in range(0, len(changed), batch_size):
+        yield list(rows.filter(pk__in=changed[start:start + batch_size]))
+
+
+def _check(batches):
+    checked = written = cleared = 0
+    for batch in batches:
+        # Checked per batch: a move may start during a long pass
+        moving = moving_user_ids()
+        batch = [row for row in batch if row[1] not in moving]
+        low = [
+            ReorderSuggestion(
+                item_id=pk, user_id=user_id, stock=stock, reorder_level=level,
+                quantity=suggested_quantity(stock, level),
+            )
+            for pk, user_id, stock, level in batch if stock < level
+        ]
+        ok = [pk for pk, _, stock, level in batch if stock >= level]
+        with transaction.atomic(using=tenant_db()):
+            ReorderSuggestion.objects.bulk_create(
+                low,
+                update_conflicts=True,
+                unique_fields=['item'],
+                update_fields=['user', 'stock', 'reorder_level', 'quantity', 'updated_at'],
+            )
+            cleared += ReorderSuggestion.objects.filter(item_id__in=ok).delete()[0]
+            # The dashboard's low-stock panel is cached per data version
+            for user_id in {user_id for _, user_id, _, _ in batch}:
+                bump_data_version_on_commit(user_id)
+        checked += len(batch)
+        written += len(low)
+    return checked, written, cleared
+
+
+def scan(full=False, batch_size=BATCH_SIZE):
+    """Run one pass; return (items checked, suggestions written, suggestions cleared)."""
+    started = timezone.now()
+    checkpoint = ScannerCheckpoint.objects.filter(name=SCANNER_NAME).first()
+    since = None if full or checkpoint is None else checkpoint.last_scanned_at - OVERLAP
+
+    checked, written, cleared = _check(_batches(since, batch_size))
+    if full:
+        # Rows for items that no longer exist are removed by the cascade;
+        # anything not refreshed in this pass is stale
+        stale = ReorderSuggestion.objects.filter(updated_at__lt=started).exclude(user_id__in=moving_user_ids())
+        with transaction.atomic(using=tenant_db()):
+            for user_id in set(stale.values_list('user_id', flat=True)):
+                bump_data_version_on_commit(user_id)
+            cleared += stale.delete()[0]
+    ScannerCheckpoint.objects.update_or_create(name=SCANNER_NAME, defaults={'last_scanned_at': started})
+    return checked, written, cleared
+
+
+def scan_user(user_id, batch_size=BATCH_SIZE):
+    """Re-check every item of ``user_id`` in the current shard; return (checked, written, cleared)."""
+    return _check(_batches(None, batch_size, user_id=user_id))
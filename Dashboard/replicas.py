@@ -0,0 +1,165 @@
+"""Read-heavy views read from a replica of each database.
+
+settings.DASHBOARD_REPLICAS maps a database alias (the default database or
+a tenant shard) to the alias of its read-only replica. Views wrapped in
+``replica_reads`` route their reads there through ReplicaRouter, which
+asks the other routers (TenantRouter) for the primary database and returns
+that database's replica. Writes always go to the primary.
+
+Read-your-writes: a user's data and sales versions are the millisecond
+timestamps of their last write (see Dashboard.caching). The replica is only
+used when its snapshot was taken after that write. Otherwise the user stays
+on the primary until the next refresh. For a local SQLite replica the
+snapshot time is the copy's mtime. Any other replica is assumed to lag by
+up to REPLICA_STICKY_SECONDS, so a user reads from the primary for that
+long after each of their writes. A replica that has not been refreshed
+within REPLICA_MAX_LAG_SECONDS is not used.
+
+``refresh_replicas`` takes the SQLite copies with the online backup API
+into a temporary file and swaps it in. Replicas use CONN_MAX_AGE = 0 so
+that every request opens the newest copy.
+"""
+import contextlib
+import functools
+import os
+import sqlite3
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.template.response import SimpleTemplateResponse
+
+from . import caching
+from .sharding import tenant_db
+
+_reading = ContextVar('dashboard_replica_reads', default=False)
+
+
+def replicas():
+    return dict(getattr(settings, 'DASHBOARD_REPLICAS', {}))
+
+
+def primary_of(alias):
+    """The database ``alias`` replicates, or ``alias`` itself."""
+    return next((primary for primary, replica in replicas().items() if replica == alias), alias)
+
+
+def snapshot_time(alias):
+    """Return when the replica ``alias`` was copied (epoch seconds), or None if unknown or missing."""
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return None
+    try:
+        stat = os.stat(connection.settings_dict['NAME'])
+    except OSError:
+        return None
+    # Connecting to a replica that was never copied leaves an empty file
+    return stat.st_mtime if stat.st_size else None
+
+
+def is_fresh_for(user_id, alias):
+    """Whether the replica ``alias`` already holds ``user_id``'s last write."""
+    now = time.time()
+    taken = snapshot_time(alias)
+    if taken is None:
+        if connections[alias].vendor == 'sqlite':
+            # Not copied yet
+            return False
+        taken = now - settings.REPLICA_STICKY_SECONDS
+    elif now - taken > settings.REPLICA_MAX_LAG_SECONDS:
+        return False
+    last_write = max(caching.data_version(user_id), caching.sales_version(user_id)) / 1000
+    return taken > last_write
+
+
+@contextlib.contextmanager
+def use_replicas():
+    """Route reads to the replicas inside the block."""
+    token = _reading.set(True)
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+def replica_reads(view):
+    """Serve ``view``'s reads from the replica of the user's database when it is fresh enough.
+
+    Template responses are rendered inside, so their lazy querysets also
+    run on the replica.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replica = replicas().get(tenant_db())
+        if replica is None or not request.user.is_authenticated or not is_fresh_for(request.user.pk, replica):
+            return view(request, *args, **kwargs)
+        with use_replicas():
+            response = view(request, *args, **kwargs)
+            if isinstance(response, SimpleTemplateResponse):
+                response.render()
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """Inside use_replicas(), send reads to the replica of the database the other routers choose.
+
+    List it before TenantRouter in DATABASE_ROUTERS.
+    """
+
+    def _primary(self, model, **hints):
+        for other in router.routers:
+            if other is self or not hasattr(other, 'db_for_read'):
+                continue
+            alias = other.db_for_read(model, **hints)
+            if alias:
+                return primary_of(alias)
+        instance = hints.get('instance')
+        return primary_of(instance._state.db) if instance is not None and instance._state.db else DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        if not _reading.get():
+            return None
+        return replicas().get(self._primary(model, **hints))
+
+    def db_for_write(self, model, **hints):
+        # Saving an object that was read from a replica
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replicas().values():
+            return primary_of(instance._state.db)
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if primary_of(obj1._state.db) == primary_of(obj2._state.db):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of their primary
+        if db in replicas().values():
+            return False
+        return None
+
+
+def refresh_sqlite_replica(primary, replica):
+    """Copy the SQLite database ``primary`` over its replica; return the bytes written."""
+    source_path = connections[primary].settings_dict['NAME']
+    target_path = str(connections[replica].settings_dict['NAME'])
+    staging_path = f'{target_path}.refresh'
+    started = time.time()
+    source = sqlite3.connect(source_path)
+    try:
+        staging = sqlite3.connect(staging_path)
+        try:
+            # One step, so the copy is a consistent snapshot as of ``started``
+            source.backup(staging)
+            # Readers open the copy on its own; keep it out of WAL mode
+            staging.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            staging.close()
+    finally:
+        source.close()
+    os.utime(staging_path, (started, started))
+    os.replace(staging_path, target_path)
+    return os.path.getsize(target_path)
@@ -0,0 +1,168 @@
+"""Daily/monthly/yearly sales rollups behind the sales_data chart.
+
+Each Transaction adds its amount to three SalesBucket rows (its day, month
+and year) inside the transaction that writes it, so the chart reads at most
+a dozen rows instead of grouping over the raw Transaction table.
+"""
+import datetime
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncYear
+from django.utils import timezone
+
+from . import archive
+from .caching import bump_sales_version_on_commit
+from .models import SalesBucket, Transaction
+from .sharding import moving_user_ids, tenant_db
+
+TRUNCATE = {
+    SalesBucket.DAY: TruncDay,
+    SalesBucket.MONTH: TruncMonth,
+    SalesBucket.YEAR: TruncYear,
+}
+
+
+def bucket_starts(dt):
+    """Return {period: start date} for a transaction timestamp."""
+    day = timezone.localtime(dt).date() if timezone.is_aware(dt) else dt.date()
+    return {
+        SalesBucket.DAY: day,
+        SalesBucket.MONTH: day.replace(day=1),
+        SalesBucket.YEAR: day.replace(month=1, day=1),
+    }
+
+
+def sale_contribution(txn):
+    """Return what a Transaction adds to the rollups, or None if it has no owner."""
+    if txn.user_id is None:
+        return None
+    return {
+        'user_id': txn.user_id,
+        'created_at': txn.created_at,
+        'amount': Decimal(str(txn.amount)),
+    }
+
+
+def apply_sale_delta(old=None, new=None):
+    """Move a transaction's contribution from ``old`` to ``new`` (either may be None)."""
+    if old == new:
+        return
+    with transaction.atomic(using=tenant_db()):
+        if old:
+            add_sale(old['user_id'], old['created_at'], -old['amount'], count=-1)
+            bump_sales_version_on_commit(old['user_id'])
+        if new:
+            add_sale(new['user_id'], new['created_at'], new['amount'], count=1)
+            bump_sales_version_on_commit(new['user_id'])
+
+
+def add_sale(user_id, created_at, amount, count=1):
+    """Add ``amount`` to the day, month and year buckets containing ``created_at``."""
+    for period, start in bucket_starts(created_at).items():
+        bucket = SalesBucket.objects.filter(user_id=user_id, period=period, start=start)
+        if bucket.update(total=F('total') + amount, count=F('count') + count):
+            continue
+        try:
+            with transaction.atomic(using=tenant_db()):
+                SalesBucket.objects.create(user_id=user_id, period=period, start=start, total=amount, count=count)
+        except IntegrityError:
+            # Another writer created the bucket first
+            bucket.update(total=F('total') + amount, count=F('count') + count)
+
+
+def rebuild_sales_buckets(user_ids=None):
+    """Recompute the buckets from the Transaction table and its archives.
+
+    ``user_ids`` limits the rebuild to those users; None rebuilds everyone.
+    Users being moved to another shard are skipped. Returns the number of
+    bucket rows written.
+    """
+    alias = tenant_db()
+    sources = [Transaction.objects.all()] + [
+        archive.archive_model(year).objects.using(alias) for year in archive.archive_years(alias)
+    ]
+    buckets = SalesBucket.objects.all()
+    if user_ids is not None:
+        sources = [source.filter(user_id__in=user_ids) for source in sources]
+        buckets = buckets.filter(user_id__in=user_ids)
+
+    # A bucket that straddles the archive horizon gets rows from two sources
+    rows = {}
+    for source in sources:
+        for period, trunc in TRUNCATE.items():
+            grouped = (
+                source.filter(user_id__isnull=False).annotate(start=trunc('created_at'))
+                .values('user_id', 'start')
+                .annotate(total=Sum('amount'), n=Count('id'))
+                .order_by()
+            )
+            for entry in grouped.iterator():
+                key = (entry['user_id'], period, entry['start'].date())
+                bucket = rows.setdefault(key, SalesBucket(user_id=key[0], period=period, start=key[2], total=0, count=0))
+                bucket.total += entry['total'] or 0
+                bucket.count += entry['n']
+    moving = moving_user_ids()
+    rows = [row for row in rows.values() if row.user_id not in moving]
+    buckets = buckets.exclude(user_id__in=moving)
+
+    with transaction.atomic(using=tenant_db()):
+        if user_ids is None:
+            user_ids = set(buckets.values_list('user_id', flat=True).distinct())
+        buckets.delete()
+        SalesBucket.objects.bulk_create(rows, batch_size=1000)
+        for user_id in (set(user_ids) - moving) | {row.user_id for row in rows}:
+            bump_sales_version_on_commit(user_id)
+    return len(rows)
+
+
+CHART_PERIODS = ('weekly', 'monthly', 'yearly')
+
+
+def normalize_period(period):
+    """Map the ``period`` GET parameter onto one of CHART_PERIODS."""
+    if period is None:
+        return 'monthly'
+    return period if period in CHART_PERIODS else 'yearly'
+
+
+def chart_slots(period, today):
+    """Return (bucket period, [(label, bucket start), ...]) for a chart period.
+
+    weekly: the last 7 days; monthly: months of the current year;
+    yearly (default): the last 5 years.
+    """
+    if period == 'weekly':
+        days = [today - datetime.timedelta(days=i) for i in range(6, -1, -1)]
+        return SalesBucket.DAY, [(d.strftime('%a'), d) for d in days]
+    if period == 'monthly':
+        months = [datetime.date(today.year, m, 1) for m in range(1, 13)]
+        return SalesBucket.MONTH, [(d.strftime('%b'), d) for d in months]
+    years = [datetime.date(today.year - i, 1, 1) for i in range(4, -1, -1)]
+    return SalesBucket.YEAR, [(str(d.year), d) for d in years]
+
+
+def chart_query(user, period, today=None):
+    """Return (slots, queryset of (start, total)) for the sales chart."""
+    bucket_period, slots = chart_slots(period, today or timezone.localdate())
+    rows = SalesBucket.objects.filter(
+        user=user, period=bucket_period, start__gte=slots[0][1], start__lte=slots[-1][1],
+    ).values_list('start', 'total')
+    return slots, rows
+
+
+def chart_payload(slots, rows):
+    """Zero-fill the bucket rows into the {'labels', 'data'} chart payload."""
+    totals = {start: float(total) for start, total in rows}
+    return {
+        'labels': [label for label, _ in slots],
+        'data': [totals.get(start, 0.0) for _, start in slots],
+    }
+
+
+def sales_totals(user):
+    """Return {'count', 'amount'} over all of the user's sales, from the yearly buckets."""
+    totals = SalesBucket.objects.filter(user=user, period=SalesBucket.YEAR).aggregate(
+        count=Sum('count'), amount=Sum('total'))
+    return {'count': totals['count'] or 0, 'amount': totals['amount'] or 0}
@@ -0,0 +1,105 @@
+"""Synthetic inventory data for load testing.
+
+Builds N users with M items each and T transactions per user spread over
+the last Y years. Everything is written with bulk_create in batches and
+drawn from a seeded RNG, so a given set of parameters always produces the
+same data set. Rerunning with the same prefix replaces the data of the users
+it already created. Rollups (dashboard metrics, sales buckets) are rebuilt
+once at the end because bulk writes skip the signal handlers.
+"""
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_data_version, bump_sales_version
+from .metrics import rebuild_user_metrics
+from .models import Category, Item, Transaction
+from .sales import rebuild_sales_buckets
+from .serials import allocate_sns
+from .sharding import purge_tenant, tenant_db, use_tenant
+
+CATEGORY_NAMES = ['Electronics', 'Clothing', 'Food', 'Books', 'Others', 'Toys', 'Garden', 'Sports', 'Health', 'Office']
+DEFAULT_PASSWORD = 'password'
+
+
+def _batched(objects, batch_size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(users=1, items=10, transactions=300, years=5, categories=5, seed=0,
+             batch_size=5000, prefix='sample', log=None):
+    """Create the data set and return the list of users it was created for."""
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    password = make_password(DEFAULT_PASSWORD)
+    now = timezone.now()
+    span = datetime.timedelta(days=365 * years).total_seconds()
+
+    owners = []
+    for n in range(users):
+        username = f'{prefix}-{n + 1}@example.com'
+        user, _ = User.objects.get_or_create(username=username, defaults={'email': username, 'password': password})
+        owners.append(user)
+
+    for user in owners:
+        with use_tenant(user):
+            started = time.perf_counter()
+            # A rerun starts the user over (SNs included) rather than adding a second copy
+            if purge_tenant(user.pk, tenant_db()):
+                bump_data_version(user.pk)
+                bump_sales_version(user.pk)
+            with transaction.atomic(using=tenant_db()):
+                cats = Category.objects.bulk_create([
+                    Category(user=user, name=name)
+                    for name in (CATEGORY_NAMES * (categories // len(CATEGORY_NAMES) + 1))[:categories]
+                ])
+
+            def new_items():
+                for sn in allocate_sns(user.pk, items):
+                    yield Item(
+                        user=user,
+                        sn=str(sn),
+                        name=f'Item {sn}',
+                        category=rng.choice(cats) if cats else None,
+                        stock=rng.randint(0, 200),
+                        reorder_level=rng.randint(5, 30),
+                        price=Decimal(rng.randint(100, 50000)) / 100,
+                    )
+
+            for batch in _batched(new_items(), batch_size):
+                with transaction.atomic(using=tenant_db()):
+                    Item.objects.bulk_create(batch)
+
+            item_prices = list(Item.objects.filter(user=user).values_list('pk', 'price'))
+
+            def new_transactions():
+                for _ in range(transactions if item_prices else 0):
+                    item_id, price = rng.choice(item_prices)
+                    yield Transaction(
+                        item_id=item_id,
+                        user=user,
+                        amount=price * rng.randint(1, 5),
+                        created_at=now - datetime.timedelta(seconds=rng.uniform(0, span)),
+                    )
+
+            for batch in _batched(new_transactions(), batch_size):
+                with transaction.atomic(using=tenant_db()):
+                    Transaction.objects.bulk_create(batch)
+
+            rebuild_user_metrics(user.pk)
+            rebuild_sales_buckets([user.pk])
+            log(f'{user.username}: {items} items, {transactions} transactions in {time.perf_counter() - started:.1f}s')
+    return owners
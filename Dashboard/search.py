@@ -0,0 +1,95 @@
+"""Per-user item search backed by the SQLite FTS5 index.
+
+The index (Dashboard_item_fts, created by migration 0012) is maintained by
+triggers. Every word of the query is prefix-matched, so the same lookup
+serves both full searches and typeahead. On other database backends the
+search falls back to ``icontains``.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Item
+from .sharding import tenant_db
+
+FTS_TABLE = 'Dashboard_item_fts'
+MAX_RESULTS = 50
+# A short prefix can match most of a large catalogue, so only this many
+# matches (in index order) are considered for ordering. bm25() is not used:
+# scoring prefix matches costs tens of ms per query at that size.
+RANK_CANDIDATES = 500
+MAX_TERMS = 8
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def query_terms(query):
+    return _TERM.findall(query or '')[:MAX_TERMS]
+
+
+def match_expression(user_id, terms):
+    """FTS5 MATCH string: the user's rows (every user's for None) whose text columns contain every term as a prefix."""
+    prefixes = ' AND '.join(f'"{term}"*' for term in terms)
+    text = f'{{name sn description category}} : ({prefixes})'
+    return text if user_id is None else f'owner : "u{user_id}" AND {text}'
+
+
+def _ranked_ids(user_id, terms, limit):
+    # Typeahead order: names starting with the first word, then shorter names
+    name_prefix = terms[0].replace('\\', '\\\\').replace('_', '\\_') + '%'
+    with connections[tenant_db()].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM (SELECT rowid, name FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s) '
+            f"ORDER BY name LIKE %s ESCAPE '\\' DESC, length(name), rowid LIMIT %s",
+            [match_expression(user_id, terms), RANK_CANDIDATES, name_prefix, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_items(user, query, limit=10):
+    """Return up to ``limit`` of the user's items matching ``query``, best match first."""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    limit = max(1, min(limit, MAX_RESULTS))
+    items = Item.objects.filter(user=user).select_related('category')
+    if connections[tenant_db()].vendor != 'sqlite':
+        for term in terms:
+            items = items.filter(
+                Q(name__icontains=term) | Q(sn__icontains=term)
+                | Q(description__icontains=term) | Q(category__name__icontains=term)
+            )
+        return list(items.order_by('name')[:limit])
+    ids = _ranked_ids(user.pk, terms, limit)
+    by_id = items.in_bulk(ids)
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+def matching_item_ids(query):
+    """Subquery of the ids of every item of any user matching ``query`` (for the admin), or None for an empty query.
+
+    Use it as ``filter(pk__in=...)``: the match runs inside the change list's
+    own query, against the index of the database that query reads.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    return RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match_expression(None, terms)])
+
+
+def rebuild_index():
+    """Refill the current shard's FTS index from its item table; return the number of rows indexed."""
+    with connections[tenant_db()].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f"""
+            INSERT INTO {FTS_TABLE} (rowid, name, sn, description, category, owner)
+            SELECT i.id, i.name, coalesce(i.sn, ''), i.description, coalesce(c.name, ''), 'u' || i.user_id
+            FROM Dashboard_item i LEFT JOIN Dashboard_category c ON c.id = i.category_id
+            """
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
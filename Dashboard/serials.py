@@ -0,0 +1,50 @@
+"""Per-user serial number (SN) allocation.
+
+Each user has one SerialSequence row. Allocating is a single
+``UPDATE ... SET next_value = next_value + n`` which takes the row's write
+lock until the surrounding transaction commits, so concurrent clerks get
+distinct SNs and the cost does not depend on how many items exist.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, IntegerField, Max
+from django.db.models.functions import Cast
+
+from .models import Item, SerialSequence
+from .sharding import tenant_db
+
+
+def _first_free_sn(user_id):
+    # Seed a new sequence after the highest numeric SN the user already has
+    highest = (
+        Item.objects.filter(user_id=user_id, sn__regex=r'^[0-9]+$')
+        .aggregate(n=Max(Cast('sn', IntegerField())))['n']
+    )
+    return (highest or 0) + 1
+
+
+def allocate_sns(user_id, count=1):
+    """Reserve ``count`` consecutive SNs for the user and return them as a range."""
+    if count < 1:
+        raise ValueError('count must be at least 1')
+    with transaction.atomic(using=tenant_db()):
+        sequence = SerialSequence.objects.filter(user_id=user_id)
+        if not sequence.update(next_value=F('next_value') + count):
+            try:
+                with transaction.atomic(using=tenant_db()):
+                    SerialSequence.objects.create(user_id=user_id, next_value=_first_free_sn(user_id) + count)
+            except IntegrityError:
+                # Another request created the sequence first
+                sequence.update(next_value=F('next_value') + count)
+        end = sequence.values_list('next_value', flat=True).get()
+    return range(end - count, end)
+
+
+def allocate_sn(user_id):
+    """Reserve a single SN for the user."""
+    return allocate_sns(user_id, 1)[0]
+
+
+def peek_next_sn(user_id):
+    """Return the SN the next allocation will probably get, without reserving it."""
+    next_value = SerialSequence.objects.filter(user_id=user_id).values_list('next_value', flat=True).first()
+    return next_value if next_value is not None else _first_free_sn(user_id)
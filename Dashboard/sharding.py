@@ -0,0 +1,348 @@
+"""Tenant sharding across several SQLite databases.
+
+SQLite allows one writer per file, so with a single database every tenant's
+writes queue behind everyone else's. Each user's inventory (the models in
+SHARDED_MODELS) instead lives in one of settings.DASHBOARD_SHARDS. Users,
+sessions, login identifiers and the shard map itself (TenantShard) stay in
+the default database.
+
+TenantMiddleware looks up the request user's shard, and TenantRouter sends
+every query on a sharded model there. Views that already filter by
+``user=request.user`` therefore need no changes. In the admin, which lists
+every tenant's rows, staff browse one shard at a time instead: the one
+picked with ``?_shard=<alias>`` (kept in the session), the default database
+until then. Code outside a request
+selects the database with ``use_tenant(user)`` or ``use_shard(alias)``.
+``tenant_db()`` is the alias to pass to ``transaction.atomic(using=...)``
+and ``connections[...]``.
+
+New users are placed on ``shards[user id % len(shards)]``; users created
+before sharding stay on the default database. Each shard holds a stand-in
+auth_user row for its tenants so foreign keys to User hold there (deleting
+a User does not cascade into other databases). move_tenants copies a
+user's rows to another shard, giving them new primary keys, then deletes
+them from the old one.
+
+While a user moves (TenantShard.moving), nothing may write their rows on
+the old shard: TenantMiddleware refuses writes, run_jobs claims none of
+their jobs, and the cron commands (scan_low_stock, forecast_demand,
+rebuild_metrics, rebuild_sales_buckets, archive_transactions) skip them,
+checking ``moving_user_ids()`` before each write transaction. move_tenant
+waits for the user's running jobs, and MOVE_SETTLE_SECONDS for writers
+that checked just before the flag was set, before it copies anything.
+"""
+import contextlib
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpResponse, HttpResponseRedirect
+from django.urls import NoReverseMatch, reverse
+
+from . import archive, caching
+from .models import (
+    Category, CategoryMetrics, InventoryMetrics, Item, ItemForecast, Job, ReorderSuggestion,
+    SalesBucket, ScannerCheckpoint, SerialSequence, StockMovement, TenantShard, Transaction,
+)
+
+SHARDED_MODELS = frozenset([
+    Category, CategoryMetrics, InventoryMetrics, Item, ItemForecast, ReorderSuggestion,
+    SalesBucket, ScannerCheckpoint, SerialSequence, StockMovement, Transaction,
+])
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+MOVE_BATCH_SIZE = 2000
+MOVE_SETTLE_SECONDS = 5
+# How long move_tenant waits for the user's running jobs before giving up
+MOVE_JOB_TIMEOUT = 600
+# Query parameter and session key of the shard the admin browses
+ADMIN_SHARD_VAR = '_shard'
+ADMIN_SHARD_SESSION_KEY = 'dashboard_admin_shard'
+
+_current_db = ContextVar('dashboard_tenant_db', default=None)
+
+
+def shards():
+    return list(getattr(settings, 'DASHBOARD_SHARDS', [DEFAULT_DB_ALIAS]))
+
+
+def tenant_db():
+    """Alias of the database the current tenant's rows are in."""
+    return _current_db.get() or DEFAULT_DB_ALIAS
+
+
+@contextlib.contextmanager
+def use_shard(alias):
+    """Route sharded models to ``alias`` inside the block."""
+    token = _current_db.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_db.reset(token)
+
+
+def use_tenant(user):
+    """Route sharded models to ``user``'s shard inside the block."""
+    return use_shard(placement(user)[0])
+
+
+def moving_user_ids():
+    """Ids of the users being moved to another shard; background writers leave their rows alone."""
+    return set(TenantShard.objects.using(DEFAULT_DB_ALIAS).filter(moving=True).values_list('user_id', flat=True))
+
+
+def copy_user_row(user, alias):
+    """Give ``alias`` a stand-in auth_user row for ``user`` (no name, no usable password)."""
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    stand_in = User(pk=user.pk, username=f'tenant-{user.pk}', is_active=False)
+    stand_in.set_unusable_password()
+    User.objects.using(alias).bulk_create([stand_in], ignore_conflicts=True)
+
+
+def placement(user):
+    """Return (database alias, moving) for ``user``, placing a new user by id."""
+    row = TenantShard.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user.pk).values_list('database', 'moving').first()
+    if row is not None:
+        return row
+    available = shards()
+    alias = available[user.pk % len(available)]
+    copy_user_row(user, alias)
+    shard, _ = TenantShard.objects.using(DEFAULT_DB_ALIAS).get_or_create(user_id=user.pk, defaults={'database': alias})
+    return shard.database, shard.moving
+
+
+class TenantRouter:
+    """Sharded models go to the current tenant's database; everything else to default."""
+
+    def _db(self, model, **hints):
+        if model not in SHARDED_MODELS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and type(instance) in SHARDED_MODELS and instance._state.db:
+            return instance._state.db
+        return tenant_db()
+
+    db_for_read = _db
+    db_for_write = _db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Tenant rows point at auth.User, which lives in the default database
+        if obj1._state.db == obj2._state.db:
+            return True
+        return type(obj1) not in SHARDED_MODELS or type(obj2) not in SHARDED_MODELS
+
+
+def admin_shard(request):
+    """The shard staff browse in the admin (see the module docstring)."""
+    alias = request.session.get(ADMIN_SHARD_SESSION_KEY)
+    return alias if alias in shards() else DEFAULT_DB_ALIAS
+
+
+def _in_admin(request, user):
+    if not user.is_staff:
+        return False
+    try:
+        return request.path_info.startswith(reverse('admin:index'))
+    except NoReverseMatch:
+        return False
+
+
+def _choose_admin_shard(request):
+    # Remember the choice and drop the parameter, which the change list would reject as a filter
+    alias = request.GET[ADMIN_SHARD_VAR]
+    if alias in shards():
+        request.session[ADMIN_SHARD_SESSION_KEY] = alias
+    query = request.GET.copy()
+    del query[ADMIN_SHARD_VAR]
+    return HttpResponseRedirect(f'{request.path}?{query.urlencode()}' if query else request.path)
+
+
+class TenantMiddleware:
+    """Route the rest of the request to the user's shard (the chosen one in the admin).
+
+    Writes (non-GET requests) get a 503 while the user is being moved.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.user.is_authenticated:
+            return self.get_response(request)
+        alias = self._route(request, request.user)
+        if isinstance(alias, HttpResponse):
+            return alias
+        with use_shard(alias):
+            response = self.get_response(request)
+        if response.streaming and not response.is_async:
+            # Streamed bodies are generated after this returns
+            response.streaming_content = _in_shard(alias, response.streaming_content)
+        return response
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return await self.get_response(request)
+        alias = await sync_to_async(self._route)(request, user)
+        if isinstance(alias, HttpResponse):
+            return alias
+        with use_shard(alias):
+            return await self.get_response(request)
+
+    def _route(self, request, user):
+        """Return the alias to route the request to, or the response to send instead."""
+        if _in_admin(request, user):
+            if ADMIN_SHARD_VAR in request.GET:
+                return _choose_admin_shard(request)
+            return admin_shard(request)
+        alias, moving = placement(user)
+        if moving and request.method not in SAFE_METHODS:
+            return _moving_response()
+        return alias
+
+
+def _moving_response():
+    response = HttpResponse('Your data is being moved; please retry shortly.', status=503, content_type='text/plain')
+    response['Retry-After'] = '30'
+    return response
+
+
+def _in_shard(alias, chunks):
+    chunks = iter(chunks)
+    while True:
+        with use_shard(alias):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+# Copy order for move_tenant: (model, filter for the user's rows, {foreign key
+# attname: model whose new keys it takes}). Rows of models named on the
+# right get new primary keys; the rest keep theirs (the user or a remapped key).
+COPY_PLAN = [
+    (Category, 'user_id', {}),
+    (Item, 'user_id', {'category_id': Category}),
+    (Transaction, 'user_id', {'item_id': Item}),
+    (StockMovement, 'item__user_id', {'item_id': Item, 'transaction_id': Transaction}),
+    (CategoryMetrics, 'category__user_id', {'category_id': Category}),
+    (ReorderSuggestion, 'user_id', {'item_id': Item}),
+    (ItemForecast, 'user_id', {'item_id': Item}),
+    (SalesBucket, 'user_id', {}),
+    (InventoryMetrics, 'user_id', {}),
+    (SerialSequence, 'user_id', {}),
+]
+
+# purge_tenant deletes in this order, children first
+_ITEMS = f'SELECT id FROM {Item._meta.db_table} WHERE user_id = %s'
+_CATEGORIES = f'SELECT id FROM {Category._meta.db_table} WHERE user_id = %s'
+PURGE_PLAN = [
+    (StockMovement, f'item_id IN ({_ITEMS})'),
+    (ReorderSuggestion, 'user_id = %s'),
+    (ItemForecast, 'user_id = %s'),
+    (CategoryMetrics, f'category_id IN ({_CATEGORIES})'),
+    (Transaction, 'user_id = %s'),
+    (Item, 'user_id = %s'),
+    (Category, 'user_id = %s'),
+    (SalesBucket, 'user_id = %s'),
+    (InventoryMetrics, 'user_id = %s'),
+    (SerialSequence, 'user_id = %s'),
+]
+
+
+def purge_tenant(user_id, alias):
+    """Delete the user's sharded rows from ``alias``; return the number deleted.
+
+    Plain DELETEs: the rows are going away wholesale, so the per-row signal
+    handlers (metrics, sales rollups) have nothing useful to do.
+    """
+    deleted = 0
+    with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+        for model, where in PURGE_PLAN:
+            cursor.execute(f'DELETE FROM {model._meta.db_table} WHERE {where}', [user_id])
+            deleted += cursor.rowcount
+        deleted += archive.purge_tenant(user_id, alias)
+    return deleted
+
+
+def _copy_rows(user_id, source, target, batch_size):
+    new_keys = {}
+    copied = 0
+    for model, owner, remap in COPY_PLAN:
+        keys = new_keys.setdefault(model, {}) if model._meta.pk.auto_created else None
+        rows = model.objects.using(source).filter(**{owner: user_id}).order_by('pk')
+        last_pk = None
+        while True:
+            batch = list((rows.filter(pk__gt=last_pk) if last_pk is not None else rows)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            old_pks = []
+            for obj in batch:
+                old_pks.append(obj.pk)
+                for attname, parent in remap.items():
+                    value = getattr(obj, attname)
+                    if value is not None:
+                        setattr(obj, attname, new_keys[parent][value])
+                if keys is not None:
+                    obj.pk = None
+                obj._state.adding, obj._state.db = True, None
+            created = model.objects.using(target).bulk_create(batch)
+            if keys is not None:
+                keys.update(zip(old_pks, (obj.pk for obj in created)))
+            copied += len(batch)
+    return copied + archive.copy_tenant(user_id, source, target, new_keys[Item], batch_size)
+
+
+def _wait_for_writers(user_id, settle, job_timeout):
+    time.sleep(settle)
+    # claim() starts none of the user's jobs now; let the running ones finish
+    deadline = time.monotonic() + job_timeout
+    while Job.objects.filter(user_id=user_id, status=Job.RUNNING).exists():
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f'user {user_id} still has running jobs after {job_timeout}s; not moved')
+        time.sleep(1)
+
+
+def move_tenant(user, target, batch_size=MOVE_BATCH_SIZE, settle=MOVE_SETTLE_SECONDS, job_timeout=MOVE_JOB_TIMEOUT):
+    """Move ``user``'s rows to the ``target`` shard; return the number of rows copied.
+
+    The copy is one transaction on the target. The shard map switches once
+    it commits, and only then are the source rows deleted. Writes are held
+    off for the duration (see the module docstring); TimeoutError is raised,
+    with nothing moved, if the user's running jobs outlast ``job_timeout``
+    seconds. Item, category and transaction ids change.
+    """
+    if target not in shards():
+        raise ValueError(f'{target!r} is not one of the configured shards')
+    source, _ = placement(user)
+    if source == target:
+        return 0
+    shard_map = TenantShard.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user.pk)
+    shard_map.update(moving=True)
+    try:
+        _wait_for_writers(user.pk, settle, job_timeout)
+        copy_user_row(user, target)
+        archive.ensure_tables(archive.archive_years(source), target)
+        with transaction.atomic(using=target):
+            # Leftovers of an interrupted earlier move
+            purge_tenant(user.pk, target)
+            copied = _copy_rows(user.pk, source, target, batch_size)
+        shard_map.update(database=target)
+        purge_tenant(user.pk, source)
+    finally:
+        shard_map.update(moving=False)
+    # Cached fragments and payloads hold the old ids
+    caching.bump_data_version(user.pk)
+    caching.bump_sales_version(user.pk)
+    return copied
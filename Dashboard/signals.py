@@ -0,0 +1,101 @@
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import metrics, sales
+from .auth_backends import sync_login_identifiers
+from .caching import bump_data_version_on_commit
+from .models import Category, CategoryMetrics, Item, Transaction
+
+
+def _deleting_user(origin):
+    """True when the delete cascades from a User (their rollup goes too)."""
+    if isinstance(origin, QuerySet):
+        return origin.model is User
+    return isinstance(origin, User)
+
+
+@receiver(post_save, sender=User)
+def update_login_identifiers(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Every login saves last_login; that cannot change the identifiers
+    if raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    sync_login_identifiers(instance)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def bump_data_version_on_write(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _deleting_user(origin):
+        return
+    bump_data_version_on_commit(instance.user_id)
+
+
+@receiver(pre_save, sender=Item)
+def remember_item_contribution(sender, instance, raw=False, **kwargs):
+    instance._metrics_old = None
+    if raw or instance.pk is None:
+        return
+    previous = Item.objects.filter(pk=instance.pk).only('user_id', 'category_id', 'stock', 'reorder_level', 'price').first()
+    if previous is not None:
+        instance._metrics_old = metrics.item_contribution(previous)
+
+
+@receiver(post_save, sender=Item)
+def update_metrics_on_item_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    metrics.apply_item_delta(getattr(instance, '_metrics_old', None), metrics.item_contribution(instance))
+    instance._metrics_old = None
+
+
+@receiver(post_delete, sender=Item)
+def update_metrics_on_item_delete(sender, instance, origin=None, **kwargs):
+    if _deleting_user(origin):
+        return
+    metrics.apply_item_delta(metrics.item_contribution(instance), None)
+
+
+@receiver(post_save, sender=Category)
+def update_metrics_on_category_save(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    CategoryMetrics.objects.get_or_create(category=instance)
+    metrics.apply_category_delta(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=Category)
+def update_metrics_on_category_delete(sender, instance, origin=None, **kwargs):
+    if _deleting_user(origin):
+        return
+    metrics.apply_category_delta(instance.user_id, -1)
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_sale_contribution(sender, instance, raw=False, **kwargs):
+    instance._sales_old = None
+    if raw or instance.pk is None:
+        return
+    previous = Transaction.objects.filter(pk=instance.pk).only('user_id', 'created_at', 'amount').first()
+    if previous is not None:
+        instance._sales_old = sales.sale_contribution(previous)
+
+
+@receiver(post_save, sender=Transaction)
+def update_sales_on_transaction_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sales.apply_sale_delta(getattr(instance, '_sales_old', None), sales.sale_contribution(instance))
+    instance._sales_old = None
+
+
+@receiver(post_delete, sender=Transaction)
+def update_sales_on_transaction_delete(sender, instance, origin=None, **kwargs):
+    if _deleting_user(origin):
+        return
+    sales.apply_sale_delta(sales.sale_contribution(instance), None)
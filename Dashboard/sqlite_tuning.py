@@ -0,0 +1,30 @@
+"""Per-connection SQLite pragmas.
+
+A database alias opts in with a ``PRAGMAS`` dict in its DATABASES entry
+(see IMS/settings.py); each pragma is applied as soon as Django opens the
+connection. WAL lets readers run alongside the single writer, busy_timeout
+makes a blocked writer wait instead of failing with "database is locked",
+and the cache/mmap sizes keep hot pages in memory for the lifetime of a
+persistent (CONN_MAX_AGE) connection.
+"""
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(connection, pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor == 'sqlite' and pragmas:
+        apply_pragmas(connection, pragmas)
+
+
+def journal_mode(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        return cursor.fetchone()[0]
@@ -0,0 +1,198 @@
+"""Stock changes through the StockMovement ledger.
+
+Stock is never read, modified and written back. Each change is one
+``UPDATE ... SET stock = stock + n`` (for sales, guarded by ``stock >= n``
+so two tills cannot sell the same last unit). The ledger row, the sale's
+Transaction and the dashboard-metrics delta are written in the same DB
+transaction. Because ``QuerySet.update()`` skips the Item signals, the
+metrics delta is applied here.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from . import metrics, sales
+from .caching import bump_data_version_on_commit, bump_sales_version_on_commit
+from .models import Item, StockMovement, Transaction
+from .sharding import tenant_db
+
+MAX_BATCH_LINES = 1000
+
+
+class InsufficientStock(Exception):
+    def __init__(self, item, requested, available):
+        self.item = item
+        self.requested = requested
+        self.available = available
+        super().__init__(f'Not enough stock of {item} to sell {requested} ({available} left)')
+
+
+def _move(item, quantity, kind, note='', sale=None, require_stock=False):
+    """Apply ``quantity`` to the item's stock and log it; return the StockMovement."""
+    rows = Item.objects.filter(pk=item.pk)
+    if require_stock:
+        rows = rows.filter(stock__gte=-quantity)
+    if not rows.update(stock=F('stock') + quantity, updated_at=timezone.now()):
+        available = Item.objects.filter(pk=item.pk).values_list('stock', flat=True).first() or 0
+        raise InsufficientStock(item, -quantity, available)
+    # Our write holds the row until commit, so this reads exactly our result
+    current = Item.objects.only('user_id', 'category_id', 'stock', 'reorder_level', 'price').get(pk=item.pk)
+    new = metrics.item_contribution(current)
+    current.stock -= quantity
+    metrics.apply_item_delta(metrics.item_contribution(current), new)
+    bump_data_version_on_commit(current.user_id)
+    item.stock = current.stock + quantity
+    return StockMovement.objects.create(
+        item=item, kind=kind, quantity=quantity, stock_after=item.stock, transaction=sale, note=note,
+    )
+
+
+def receive(item, quantity, note=''):
+    """Add ``quantity`` units of incoming stock."""
+    with transaction.atomic(using=tenant_db()):
+        return _move(item, abs(quantity), StockMovement.RECEIPT, note)
+
+
+def adjust(item, quantity, note=''):
+    """Correct the stock by ``quantity`` (either sign), e.g. after a count."""
+    with transaction.atomic(using=tenant_db()):
+        return _move(item, quantity, StockMovement.ADJUSTMENT, note)
+
+
+def sell(item, quantity=1, amount=None, note=''):
+    """Sell ``quantity`` units; record the Transaction and return it.
+
+    ``amount`` defaults to quantity * the item's price. Raises
+    InsufficientStock (and changes nothing) if fewer units are in stock.
+    """
+    if amount is None:
+        amount = Decimal(quantity) * item.price
+    with transaction.atomic(using=tenant_db()):
+        sale = Transaction.objects.create(item=item, user_id=item.user_id, amount=amount)
+        _move(item, -abs(quantity), StockMovement.SALE, note, sale=sale, require_stock=True)
+    return sale
+
+
+def record_opening_stock(item):
+    """Log the stock a new item was created with."""
+    if item.stock:
+        StockMovement.objects.create(
+            item=item, kind=StockMovement.RECEIPT, quantity=item.stock, stock_after=item.stock, note='Opening stock',
+        )
+
+
+def record_bulk_stock(items, previous, note=''):
+    """Log stock set directly by bulk_create/bulk_update (the importer).
+
+    ``previous`` maps the pk of each updated item to its stock before the
+    write; the other items are new and get an opening receipt. Call it in
+    the same DB transaction as the write.
+    """
+    movements = []
+    for item in items:
+        if item.pk in previous:
+            kind, quantity = StockMovement.ADJUSTMENT, item.stock - previous[item.pk]
+        else:
+            kind, quantity = StockMovement.RECEIPT, item.stock
+        if quantity:
+            movements.append(StockMovement(
+                item=item, kind=kind, quantity=quantity, stock_after=item.stock,
+                note=note if kind == StockMovement.ADJUSTMENT else 'Opening stock',
+            ))
+    return StockMovement.objects.bulk_create(movements)
+
+
+def _parse_line(line):
+    """Return (item id, quantity, amount or None) for one batch line; raise ValueError if malformed."""
+    if not isinstance(line, dict):
+        raise ValueError('line must be an object')
+    try:
+        item_id = int(line['item'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('item must be an item id')
+    quantity = line.get('quantity', 1)
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+        raise ValueError('quantity must be a positive integer')
+    amount = line.get('amount')
+    if amount is not None:
+        try:
+            amount = Decimal(str(amount)).quantize(metrics.CENTS)
+        except InvalidOperation:
+            raise ValueError('amount must be a number')
+        # NaN survives quantize() and cannot be compared
+        if not amount.is_finite():
+            raise ValueError('amount must be a number')
+        if amount < 0:
+            raise ValueError('amount must not be negative')
+    return item_id, quantity, amount
+
+
+def sell_batch(user, lines):
+    """Sell many lines for ``user`` in one DB transaction; return one result dict per line.
+
+    Each line is ``{"item": <id>, "quantity": <n>, "amount": <optional>}``.
+    Lines fail on their own (malformed, not the user's item, not enough
+    stock) without affecting the rest. Ownership is checked with one IN
+    query, Transactions and StockMovements are bulk inserted, stock is
+    decremented with one CASE UPDATE, and the rollups the skipped signals
+    would have maintained are updated once for the whole batch.
+    """
+    results = [None] * len(lines)
+    parsed = []
+    for n, line in enumerate(lines):
+        try:
+            parsed.append((n, *_parse_line(line)))
+        except ValueError as exc:
+            results[n] = {'line': n, 'ok': False, 'error': str(exc)}
+
+    with transaction.atomic(using=tenant_db()):
+        items = Item.objects.filter(user=user).select_for_update().only(
+            'user_id', 'category_id', 'stock', 'reorder_level', 'price',
+        ).in_bulk({item_id for _, item_id, _, _ in parsed})
+        stock_left = {pk: item.stock for pk, item in items.items()}
+        sold = []
+        for n, item_id, quantity, amount in parsed:
+            item = items.get(item_id)
+            if item is None:
+                results[n] = {'line': n, 'ok': False, 'error': 'unknown item'}
+            elif stock_left[item_id] < quantity:
+                results[n] = {'line': n, 'ok': False, 'error': f'only {stock_left[item_id]} in stock'}
+            else:
+                stock_left[item_id] -= quantity
+                if amount is None:
+                    amount = quantity * item.price
+                sold.append((n, item, quantity, amount, stock_left[item_id]))
+        if not sold:
+            return results
+
+        now = timezone.now()
+        txns = Transaction.objects.bulk_create([
+            Transaction(item=item, user=user, amount=amount, created_at=now) for _, item, _, amount, _ in sold
+        ])
+        changed = {item.pk for _, item, _, _, _ in sold}
+        Item.objects.filter(pk__in=changed).update(
+            stock=Case(*[When(pk=pk, then=F('stock') - (items[pk].stock - stock_left[pk])) for pk in changed]),
+            updated_at=now,
+        )
+        StockMovement.objects.bulk_create([
+            StockMovement(item=item, kind=StockMovement.SALE, quantity=-quantity, stock_after=after, transaction=txn, created_at=now)
+            for (_, item, quantity, _, after), txn in zip(sold, txns)
+        ])
+
+        low_stock = total_value = 0
+        for pk in changed:
+            before = metrics.item_contribution(items[pk])
+            items[pk].stock = stock_left[pk]
+            after = metrics.item_contribution(items[pk])
+            low_stock += after['low_stock'] - before['low_stock']
+            total_value += after['total_value'] - before['total_value']
+        metrics.apply_stock_delta(user.pk, low_stock, total_value)
+        sales.add_sale(user.pk, now, sum(amount for _, _, _, amount, _ in sold), count=len(sold))
+        bump_sales_version_on_commit(user.pk)
+        bump_data_version_on_commit(user.pk)
+
+    for (n, item, quantity, amount, after), txn in zip(sold, txns):
+        results[n] = {'line': n, 'ok': True, 'item': item.pk, 'transaction': txn.pk, 'amount': str(amount), 'stock': after}
+    return results
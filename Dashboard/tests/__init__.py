@@ -0,0 +1,7 @@
+from django.conf import settings
+
+# Every database but the read replicas: a replica mirrors its primary's test
+# database, and a TestCase transaction opened on both would lock each other out
+PRIMARY_DATABASES = frozenset(
+    alias for alias, config in settings.DATABASES.items() if not config.get('TEST', {}).get('MIRROR')
+)
@@ -0,0 +1,79 @@
+import unittest
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TestCase
+from django.urls import reverse
+
+from Dashboard.admin import ItemAdmin
+from Dashboard.admin_tables import approximate_count
+from Dashboard.models import Category, Item, Transaction
+from Dashboard.sharding import use_shard
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'reads SQLite statistics and the FTS5 index')
+class LargeTableAdminTests(TestCase):
+    """Item and transaction change lists page by keyset, estimate counts and search through FTS."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        staff = User.objects.create_superuser('admin', password='secret-pass-1')
+        self.client.force_login(staff)
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        # Staff browse the default database until they pick a shard
+        self.enterContext(use_shard(DEFAULT_DB_ALIAS))
+        tools = Category.objects.create(user=self.user, name='Tools')
+        self.items = [
+            Item.objects.create(user=self.user, name=name, category=tools if n % 2 else None, price='1.00', stock=1)
+            for n, name in enumerate(['Hammer', 'Saw', 'Hammock', 'Drill', 'Rake'])
+        ]
+        Transaction.objects.create(item=self.items[0], amount='1.00')
+        Transaction.objects.create(item=self.items[1], amount='2.00')
+        self.url = reverse('admin:Dashboard_item_changelist')
+
+    def changelist(self, url=None, **params):
+        response = self.client.get(url or self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_pages_by_keyset_cursor(self):
+        with mock.patch.object(ItemAdmin, 'list_per_page', 2):
+            first = self.changelist()
+            self.assertEqual([item.name for item in first.result_list], ['Rake', 'Drill'])
+            self.assertFalse(first.keyset_page.has_previous())
+            second = self.client.get(self.url + first.next_page_url()).context['cl']
+            self.assertEqual([item.name for item in second.result_list], ['Hammock', 'Saw'])
+            self.assertNotIn('cursor', second.get_query_string({'q': 'x'}))
+
+            # Name order ends in the admin's pk tie-breaker, so it pages by keyset too
+            by_name = self.changelist(o='2')
+            self.assertEqual([item.name for item in by_name.result_list], ['Drill', 'Hammer'])
+            self.assertIsNotNone(by_name.keyset_page)
+            # The category is nullable: numbered pages
+            self.assertIsNone(self.changelist(o='3').keyset_page)
+
+    def test_counts_are_estimated(self):
+        self.items[2].delete()
+        cl = self.changelist()
+        # No statistics yet: the key range, which still spans the deleted row
+        self.assertEqual((cl.result_count, cl.count_upper_bound), (5, True))
+        self.assertContains(self.client.get(self.url), 'at most 5')
+
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cl = self.changelist()
+        self.assertEqual((cl.result_count, cl.count_approximate, cl.count_upper_bound), (4, True, False))
+        self.assertContains(self.client.get(self.url), '~4')
+
+    def test_filtered_counts_are_capped(self):
+        queryset = Item.objects.filter(stock=1)
+        self.assertEqual(approximate_count(queryset, limit=3), (3, False, True, False))
+        self.assertEqual(approximate_count(queryset, limit=10), (5, False, False, False))
+
+    def test_search_matches_through_the_index(self):
+        self.assertEqual(sorted(item.name for item in self.changelist(q='ham').result_list), ['Hammer', 'Hammock'])
+        self.assertEqual([item.pk for item in self.changelist(q=str(self.items[3].pk)).result_list], [self.items[3].pk])
+        transactions = self.changelist(reverse('admin:Dashboard_transaction_changelist'), q='ham').result_list
+        self.assertEqual([txn.item.name for txn in transactions], ['Hammer'])
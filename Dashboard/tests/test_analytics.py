@@ -0,0 +1,95 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from Dashboard import analytics
+from Dashboard.models import Category, Item, Transaction
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+UTC = datetime.timezone.utc
+
+
+def at(*args):
+    return datetime.datetime(*args, tzinfo=UTC)
+
+
+class SalesSeriesTests(TestCase):
+    """Grouped series over the raw transactions, zero-filled and ranked."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        tools = Category.objects.create(user=self.user, name='Tools')
+        garden = Category.objects.create(user=self.user, name='Garden')
+        self.hammer = Item.objects.create(user=self.user, name='Hammer', category=tools, price=Decimal('5.00'), stock=9)
+        self.rake = Item.objects.create(user=self.user, name='Rake', category=garden, price=Decimal('3.00'), stock=9)
+        self.glue = Item.objects.create(user=self.user, name='Glue', price=Decimal('1.00'), stock=9)
+        for item, amount, moment in [
+            (self.hammer, '10.00', at(2024, 3, 4, 9)),   # Monday
+            (self.hammer, '5.00', at(2024, 3, 4, 23, 30)),
+            (self.rake, '3.00', at(2024, 3, 6, 12)),
+            (self.glue, '1.00', at(2024, 3, 11, 8)),     # next Monday
+            (self.rake, '99.00', at(2024, 3, 20)),       # outside the range
+        ]:
+            Transaction.objects.create(item=item, amount=amount, created_at=moment)
+        self.start, self.end = at(2024, 3, 4), at(2024, 3, 18)
+
+    def series(self, payload):
+        return {row['name']: row['totals'] for row in payload['series']}
+
+    def test_daily_totals_are_zero_filled(self):
+        payload = analytics.sales_series(self.user, self.start, self.end, 'day')
+        self.assertEqual(len(payload['labels']), 14)
+        self.assertEqual(payload['labels'][0], '2024-03-04T00:00:00+00:00')
+        totals = self.series(payload)['Total']
+        self.assertEqual(totals[:3], [15.0, 0.0, 3.0])
+        self.assertEqual(sum(totals), 19.0)
+        self.assertEqual(payload['series'][0]['counts'][0], 2)
+
+    def test_weeks_start_on_monday(self):
+        payload = analytics.sales_series(self.user, self.start, self.end, 'week')
+        self.assertEqual(self.series(payload), {'Total': [18.0, 1.0]})
+
+    def test_non_utc_time_zones_bucket_by_local_day(self):
+        with timezone.override('Asia/Kolkata'):
+            # 23:30 UTC on the 4th is the 5th in India
+            start = timezone.make_aware(datetime.datetime(2024, 3, 4))
+            payload = analytics.sales_series(self.user, start, start + datetime.timedelta(days=3), 'day')
+        self.assertEqual(self.series(payload)['Total'], [10.0, 5.0, 3.0])
+
+    def test_breakdowns_keep_the_top_series(self):
+        by_category = analytics.sales_series(self.user, self.start, self.end, 'week', breakdown='category', top=1)
+        self.assertEqual(self.series(by_category), {'Tools': [15.0, 0.0], 'Other': [3.0, 0.0], 'Uncategorized': [0.0, 1.0]})
+
+        by_item = analytics.sales_series(self.user, self.start, self.end, 'week', breakdown='item', top=2)
+        self.assertEqual([row['name'] for row in by_item['series']], ['Hammer', 'Rake', 'Other'])
+        self.assertEqual(by_item['series'][0]['id'], self.hammer.pk)
+        self.assertIsNone(by_item['series'][-1]['id'])
+
+    def test_too_many_buckets_downsample(self):
+        payload = analytics.sales_series(self.user, self.start, self.start + datetime.timedelta(days=30), 'hour')
+        self.assertEqual((payload['granularity'], payload['downsampled']), ('day', True))
+        self.assertEqual(analytics.choose_granularity(self.start, self.start + datetime.timedelta(days=3)), 'hour')
+
+    def test_invalid_arguments(self):
+        for kwargs in ({'granularity': 'minute'}, {'breakdown': 'colour'}, {'top': 0}):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                analytics.sales_series(self.user, self.start, self.end, **kwargs)
+        with self.assertRaises(ValueError):
+            analytics.sales_series(self.user, self.end, self.start)
+
+    def test_api(self):
+        self.client.force_login(self.user)
+        url = reverse('dashboard:sales_analytics')
+        payload = self.client.get(url, {'start': '2024-03-04', 'end': '2024-03-17', 'granularity': 'week'}).json()
+        self.assertEqual(payload['series'][0]['totals'], [18.0, 1.0])
+        self.assertEqual(self.client.get(url, {'start': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'top': 'all'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '9999-12-01', 'end': '9999-12-31'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'end': '0001-01-02'}).status_code, 400)
@@ -0,0 +1,93 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.db.models import Sum
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from Dashboard import analytics, archive, sales
+from Dashboard.models import Item, SalesBucket, StockMovement, TenantShard, Transaction
+from Dashboard.sharding import tenant_db, use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+UTC = datetime.timezone.utc
+BEFORE = datetime.datetime(2024, 1, 1, tzinfo=UTC)
+
+
+class ArchiveTests(TransactionTestCase):
+    """Old sales move to per-year tables and stay in every summary.
+
+    TransactionTestCase: SQLite cannot create the archive tables inside the
+    transaction TestCase wraps each test in.
+    """
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.addCleanup(self.drop_archive_tables)
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        with use_tenant(self.user):
+            self.hammer = Item.objects.create(user=self.user, name='Hammer', price=Decimal('5.00'), stock=9)
+            self.old_sale = Transaction.objects.create(item=self.hammer, amount='5.00', created_at=datetime.datetime(2022, 6, 1, tzinfo=UTC))
+            StockMovement.objects.create(item=self.hammer, kind=StockMovement.SALE, quantity=-1, stock_after=9, transaction=self.old_sale)
+            for month in (3, 9):
+                Transaction.objects.create(item=self.hammer, amount='10.00', created_at=datetime.datetime(2023, month, 1, tzinfo=UTC))
+            Transaction.objects.create(item=self.hammer, amount='1.00')
+            self.year_totals = dict(SalesBucket.objects.filter(period=SalesBucket.YEAR).values_list('start', 'total'))
+
+    def drop_archive_tables(self):
+        for alias in PRIMARY_DATABASES:
+            years = archive.archive_years(alias)
+            if years:
+                with connections[alias].schema_editor() as editor:
+                    for year in years:
+                        editor.delete_model(archive.archive_model(year))
+
+    def archive(self, **kwargs):
+        with use_tenant(self.user):
+            return archive.archive_transactions(BEFORE, tenant_db(), **kwargs)
+
+    def test_old_sales_move_to_yearly_tables(self):
+        self.assertEqual(self.archive(batch_size=2), 3)
+        with use_tenant(self.user):
+            self.assertEqual(list(Transaction.objects.values_list('amount', flat=True)), [Decimal('1.00')])
+            self.assertEqual(archive.archive_years(tenant_db()), [2022, 2023])
+            self.assertEqual([qs.count() for qs in archive.archived_querysets(self.user)], [1, 2])
+            self.assertEqual(archive.archived_querysets(self.user, start=datetime.datetime(2023, 6, 1, tzinfo=UTC))[0].count(), 1)
+            self.assertEqual(archive.archived_until(self.user), datetime.datetime(2023, 9, 1, tzinfo=UTC))
+            # The ledger keeps the quantity, without the link
+            movement = StockMovement.objects.get(kind=StockMovement.SALE)
+            self.assertEqual((movement.quantity, movement.transaction_id), (-1, None))
+            # Rollups are untouched, and a rebuild counts the archives too
+            self.assertEqual(dict(SalesBucket.objects.filter(period=SalesBucket.YEAR).values_list('start', 'total')), self.year_totals)
+            sales.rebuild_sales_buckets([self.user.pk])
+            self.assertEqual(dict(SalesBucket.objects.filter(period=SalesBucket.YEAR).values_list('start', 'total')), self.year_totals)
+        self.assertEqual(self.archive(), 0)
+
+    def test_archived_sales_are_exported_and_charted(self):
+        self.archive()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard:export', args=['transactions']), {'archived': '1'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertIn('2022-06-01', lines[1])
+        with use_tenant(self.user):
+            payload = analytics.sales_series(self.user, datetime.datetime(2022, 1, 1, tzinfo=UTC), timezone.now(), 'year')
+        self.assertEqual(sum(payload['series'][0]['totals']), 26.0)
+
+    def test_moving_users_are_skipped(self):
+        TenantShard.objects.filter(user=self.user).update(moving=True)
+        self.assertEqual(self.archive(), 0)
+        with use_tenant(self.user):
+            self.assertEqual(Transaction.objects.count(), 4)
+
+    def test_command_keeps_the_forecast_window(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_transactions', keep_days=30)
+        call_command('archive_transactions', keep_days=400, stdout=io.StringIO())
+        with use_tenant(self.user):
+            self.assertEqual(Transaction.objects.aggregate(total=Sum('amount'))['total'], Decimal('1.00'))
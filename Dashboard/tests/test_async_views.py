@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from Dashboard.models import Category, Item, Transaction
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class AsyncViewTests(TransactionTestCase):
+    """The /async/ views serve the same data as their sync counterparts.
+
+    TransactionTestCase: the pages run their queries in worker threads,
+    which do not see a test transaction's uncommitted rows.
+    """
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        with use_tenant(self.user):
+            tools = Category.objects.create(user=self.user, name='Tools')
+            hammer = Item.objects.create(user=self.user, name='Hammer', category=tools, price=Decimal('12.50'), stock=2, reorder_level=5)
+            Transaction.objects.create(item=hammer, amount='25.00')
+        self.client.force_login(self.user)
+
+    async def test_metrics_match_the_dashboard(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('dashboard:async_metrics'))
+        self.assertEqual(response.json(), {'total_items': 1, 'categories': 1, 'low_stock': 1, 'total_value': 25.0})
+
+    async def test_sales_data_matches_the_sync_view(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        for period in ('weekly', 'monthly', 'yearly'):
+            with self.subTest(period=period):
+                expected = (await sync_to_async(self.client.get)(reverse('dashboard:sales_data'), {'period': period})).json()
+                response = await self.async_client.get(reverse('dashboard:async_sales_data'), {'period': period})
+                self.assertEqual(response.json(), expected)
+
+    async def test_transaction_list_shows_rows_and_totals(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get(reverse('dashboard:async_transaction_list'))
+        self.assertContains(response, 'Hammer')
+        self.assertEqual(response.context['transaction_count'], 1)
+        self.assertEqual(response.context['sum_transactions'], Decimal('25.00'))
+
+    async def test_anonymous_users_are_sent_to_login(self):
+        response = await self.async_client.get(reverse('dashboard:async_items_list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('dashboard:login'), response['Location'])
@@ -0,0 +1,47 @@
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from Dashboard.models import LoginIdentifier
+
+
+class EmailOrUsernameLoginTests(TestCase):
+    """Users log in with their username or email, in any case, with one index seek."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('Alice', email='Alice@Example.com', password='secret-pass-1')
+
+    def test_username_or_email_in_any_case(self):
+        for identifier in ('alice', 'ALICE', ' alice@example.com ', 'alice@EXAMPLE.com'):
+            with self.subTest(identifier=identifier):
+                self.assertEqual(authenticate(username=identifier, password='secret-pass-1'), self.user)
+        self.assertIsNone(authenticate(username='alice', password='wrong'))
+
+    def test_unknown_identifiers_are_remembered(self):
+        self.assertIsNone(authenticate(username='bob@example.com', password='secret-pass-1'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(authenticate(username='BOB@example.com', password='secret-pass-1'))
+        # Registering the address forgets the failure
+        bob = User.objects.create_user('bob', email='bob@example.com', password='secret-pass-1')
+        self.assertEqual(authenticate(username='bob@example.com', password='secret-pass-1'), bob)
+
+    def test_identifiers_follow_account_changes(self):
+        self.user.email = 'alice@new.example.com'
+        self.user.save()
+        self.assertEqual(set(LoginIdentifier.objects.filter(user=self.user).values_list('identifier', flat=True)),
+                         {'alice', 'alice@new.example.com'})
+        self.assertIsNone(authenticate(username='alice@example.com', password='secret-pass-1'))
+
+    def test_a_username_beats_another_accounts_email(self):
+        other = User.objects.create_user('mallory', email='carol', password='secret-pass-2')
+        carol = User.objects.create_user('Carol', password='secret-pass-3')
+        self.assertEqual(LoginIdentifier.objects.get(identifier='carol').user, carol)
+        self.assertIsNone(authenticate(username='carol', password='secret-pass-2'))
+        self.assertEqual(authenticate(username='mallory', password='secret-pass-2'), other)
+
+    def test_login_view_accepts_the_email(self):
+        response = self.client.post(reverse('dashboard:login'), {'email': 'ALICE@example.com', 'password': 'secret-pass-1'})
+        self.assertRedirects(response, reverse('dashboard:index'), fetch_redirect_response=False)
@@ -0,0 +1,58 @@
+import datetime
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from Dashboard.importer import ItemImporter
+from Dashboard.models import Category, Item, Transaction
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class ExportTests(TestCase):
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.tools = Category.objects.create(user=self.user, name='Tools')
+        self.hammer = Item.objects.create(user=self.user, sn='1', name='Hammer', category=self.tools,
+                                          description='Claw, "steel"', price='12.50', stock=4, reorder_level=2)
+        self.rake = Item.objects.create(user=self.user, sn='2', name='Rake', price='3.00', stock=0)
+        self.client.force_login(self.user)
+
+    def export(self, kind, **params):
+        response = self.client.get(reverse('dashboard:export', args=[kind]), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_item_csv_round_trips_through_the_importer(self):
+        fields = ('sn', 'name', 'category__name', 'description', 'stock', 'reorder_level', 'price')
+        before = list(Item.objects.filter(user=self.user).order_by('pk').values_list(*fields))
+        body = self.export('items')
+        self.assertTrue(body.startswith('id,sn,name,category,description,stock,reorder_level,price,'))
+
+        # Rows carry their SN, so re-importing the file updates every item to what it already was
+        result = ItemImporter(self.user).run(io.StringIO(body))
+        self.assertEqual((result.created, result.updated, result.failed), (0, 2, 0))
+        self.assertEqual(list(Item.objects.filter(user=self.user).order_by('pk').values_list(*fields)), before)
+
+    def test_transaction_ndjson_honours_the_filters(self):
+        today = timezone.now()
+        Transaction.objects.create(item=self.hammer, amount='12.50', created_at=today)
+        Transaction.objects.create(item=self.rake, amount='3.00', created_at=today)
+        Transaction.objects.create(item=self.hammer, amount='25.00', created_at=today - datetime.timedelta(days=10))
+
+        rows = [json.loads(line) for line in self.export(
+            'transactions', format='ndjson', category=self.tools.pk, start=timezone.localdate(today).isoformat(),
+        ).splitlines()]
+        self.assertEqual([(row['item_name'], row['category'], row['amount']) for row in rows], [('Hammer', 'Tools', '12.50')])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get(reverse('dashboard:export', args=['items']), {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('dashboard:export', args=['items']), {'start': '2024-13-45'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('dashboard:export', args=['users'])).status_code, 404)
@@ -0,0 +1,73 @@
+import datetime
+import unittest
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from Dashboard import forecasting
+from Dashboard.models import Item, ItemForecast, TenantShard, Transaction
+from Dashboard.sharding import tenant_db, use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+np = forecasting.np
+
+
+@unittest.skipIf(np is None, 'needs NumPy')
+class ForecastMathTests(SimpleTestCase):
+    def run_forecast(self, sales, weeks=4):
+        item_ids = np.array([1, 2, 5])
+        prices = np.array([2.0, 0.0, 1.0])
+        sale_items, sale_days, amounts = (np.array(column) for column in zip(*sales))
+        return forecasting.forecast(item_ids, prices, sale_items, sale_days, amounts.astype(float), weeks=weeks)
+
+    def test_steady_demand(self):
+        # Item 1 sells 14 units (28.00) every week of a 4-week window
+        daily, std, safety, reorder_point = self.run_forecast([(1, day, 28) for day in (0, 7, 14, 21)])
+        self.assertEqual(daily.tolist(), [2.0, 0.0, 0.0])
+        self.assertEqual(std.tolist(), [0.0, 0.0, 0.0])
+        self.assertEqual(reorder_point.tolist(), [14, 0, 0])
+
+    def test_sales_outside_the_window_or_of_unknown_items_are_dropped(self):
+        steady = [(1, day, 28) for day in (0, 7, 14, 21)]
+        noise = [(1, -1, 100), (1, 28, 100), (3, 3, 100), (9, 3, 100), (2, 3, 100)]
+        self.assertEqual([a.tolist() for a in self.run_forecast(steady + noise)],
+                         [a.tolist() for a in self.run_forecast(steady)])
+
+    def test_variable_demand_gets_safety_stock(self):
+        # Weekly units 0, 0, 0, 28: mean 7/week, sample std 14/week
+        daily, std, safety, reorder_point = self.run_forecast([(5, 27, 28)])
+        self.assertEqual(daily[2], 1.0)
+        self.assertAlmostEqual(std[2], 14 / 7 ** 0.5)
+        self.assertEqual(safety[2], 24)  # ceil(1.645 * 14)
+        self.assertEqual(reorder_point[2], 31)
+
+
+@unittest.skipIf(np is None, 'needs NumPy')
+class ForecastUserTests(TestCase):
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.hammer = Item.objects.create(user=self.user, name='Hammer', price=Decimal('2.00'), stock=3)
+        self.saw = Item.objects.create(user=self.user, name='Saw', price=Decimal('9.00'), stock=3)
+        now = timezone.now()
+        for days_ago in (1, 10, 20):
+            Transaction.objects.create(item=self.hammer, amount='14.00', created_at=now - datetime.timedelta(days=days_ago))
+
+    def test_writes_a_forecast_per_item(self):
+        self.assertEqual(forecasting.forecast_user(self.user.pk, weeks=2), 2)
+        hammer = ItemForecast.objects.get(item=self.hammer)
+        self.assertEqual((hammer.daily_demand, hammer.demand_std, hammer.reorder_point), (1.0, 0.0, 7))
+        self.assertEqual(ItemForecast.objects.get(item=self.saw).reorder_point, 0)
+
+        # Rerunning replaces the rows
+        self.assertEqual(forecasting.forecast_user(self.user.pk, weeks=4), 2)
+        self.assertEqual(ItemForecast.objects.filter(user=self.user).count(), 2)
+
+    def test_moving_users_are_left_alone(self):
+        TenantShard.objects.update_or_create(user=self.user, defaults={'database': tenant_db(), 'moving': True})
+        self.assertEqual(forecasting.forecast_user(self.user.pk), 0)
+        self.assertFalse(ItemForecast.objects.exists())
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from Dashboard.models import Category, DataVersion, Item, Transaction
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class FragmentCacheTests(TransactionTestCase):
+    """Cached dashboard and item-list fragments are replaced after a write."""
+    # The user's rows may live on any tenant shard
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.client.force_login(self.user)
+
+    def assert_shows_new_rows(self, dashboard, items):
+        # Fill the fragment caches first
+        self.assertNotContains(self.client.get(reverse(dashboard)), 'Garden tools')
+        self.assertNotContains(self.client.get(reverse(items)), 'Rake')
+
+        with use_tenant(self.user):
+            category = Category.objects.create(user=self.user, name='Garden tools')
+            Item.objects.create(user=self.user, name='Rake', category=category, price='9.50', stock=4)
+
+        self.assertContains(self.client.get(reverse(dashboard)), 'Garden tools')
+        self.assertContains(self.client.get(reverse(items)), 'Rake')
+
+    def test_views_show_rows_written_after_caching(self):
+        self.assert_shows_new_rows('dashboard:index', 'dashboard:items_list')
+
+    def test_async_views_show_rows_written_after_caching(self):
+        self.assert_shows_new_rows('dashboard:async_index', 'dashboard:async_items_list')
+
+    def test_unchanged_data_is_served_from_the_cache(self):
+        self.client.get(reverse('dashboard:items_list'))
+        # A write that skips the signals (and so the version bump) is not seen
+        with use_tenant(self.user):
+            Item.objects.bulk_create([Item(user=self.user, name='Hidden', price='1.00')])
+        self.assertNotContains(self.client.get(reverse('dashboard:items_list')), 'Hidden')
+
+    def test_deleting_a_user_with_data(self):
+        self.client.get(reverse('dashboard:index'))
+        with use_tenant(self.user):
+            item = Item.objects.create(user=self.user, name='Rake', category=Category.objects.create(user=self.user, name='Garden'),
+                                       price='9.50', stock=4)
+            Transaction.objects.create(item=item, amount='9.50')
+        # The cascade's version bumps run after the user is gone
+        self.user.delete()
+        self.assertFalse(DataVersion.objects.filter(user_id=self.user.pk).exists())
@@ -0,0 +1,70 @@
+import io
+
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.test import TestCase
+
+from Dashboard.importer import ItemImporter
+from Dashboard.models import Category, InventoryMetrics, Item, StockMovement
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+CSV = """name,price,stock,reorder_level,category
+Hammer,12.50,4,5,Tools
+Saw,20,10,,Tools
+Rake,3.00,0,1,Garden
+,1.00,1,1,Tools
+Drill,cheap,1,1,Tools
+"""
+
+
+class ItemImportTests(TestCase):
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+
+    def run_import(self, text, fmt='csv', batch_size=2):
+        return ItemImporter(self.user, batch_size=batch_size).run(io.StringIO(text), fmt)
+
+    def test_csv_rows_become_items_with_sns_and_categories(self):
+        result = self.run_import(CSV)
+        self.assertEqual((result.created, result.updated, result.failed), (3, 0, 2))
+        self.assertEqual(result.errors, ['line 5: name is required', "line 6: invalid price 'cheap'"])
+
+        items = Item.objects.filter(user=self.user).order_by('sn')
+        self.assertEqual(list(items.values_list('sn', 'name', 'category__name')),
+                         [('1', 'Hammer', 'Tools'), ('2', 'Saw', 'Tools'), ('3', 'Rake', 'Garden')])
+        self.assertEqual(Category.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(InventoryMetrics.objects.get(user=self.user).total_items, 3)
+
+    def test_rows_with_an_sn_update_that_item(self):
+        self.run_import(CSV)
+        result = self.run_import('{"sn": "1", "name": "Claw hammer", "price": "13.00", "stock": 9}\n'
+                                 '{"sn": "99", "name": "Ghost", "price": "1"}\n'
+                                 'not json\n', fmt='ndjson')
+        self.assertEqual((result.created, result.updated, result.failed), (0, 1, 2))
+        hammer = Item.objects.get(user=self.user, sn='1')
+        self.assertEqual((hammer.name, hammer.stock, str(hammer.price)), ('Claw hammer', 9, '13.00'))
+
+    def test_ndjson_values_of_the_wrong_type_fail_their_line(self):
+        result = self.run_import('{"name": 5, "price": "1.00"}\n'
+                                 '{"name": {"en": "Saw"}, "price": "1.00"}\n'
+                                 '{"name": "Rake", "category": ["Garden"], "price": "1.00"}\n', fmt='ndjson')
+        self.assertEqual((result.created, result.failed), (1, 2))
+        self.assertEqual(result.errors, ['line 2: name must be text', 'line 3: category must be text'])
+        self.assertEqual(Item.objects.get(user=self.user).name, '5')
+
+    def test_imported_stock_is_in_the_ledger(self):
+        self.run_import(CSV)
+        self.run_import('sn,name,price,stock\n1,Hammer,12.50,1\n2,Saw,20,10\n3,Rake,3.00,6\n')
+
+        for item in Item.objects.filter(user=self.user):
+            with self.subTest(item=item.name):
+                total = item.movements.aggregate(total=Sum('quantity'))['total'] or 0
+                self.assertEqual(total, item.stock)
+        self.assertEqual(
+            sorted(StockMovement.objects.filter(item__user=self.user).values_list('kind', 'quantity')),
+            [('adjustment', -3), ('adjustment', 6), ('receipt', 4), ('receipt', 10)],
+        )
@@ -0,0 +1,37 @@
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from Dashboard.models import Item, Transaction
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'reads SQLite query plans')
+class HotQueryIndexTests(TestCase):
+    """The list and dashboard queries are answered from their indexes."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.item = Item.objects.create(user=self.user, sn='1', name='Hammer', price='1.00', stock=1, reorder_level=5)
+
+    def assertUsesIndex(self, queryset, index):
+        self.assertIn(index, queryset.explain())
+
+    def test_transaction_list_reads_the_owner_index(self):
+        self.assertUsesIndex(Transaction.objects.filter(user=self.user).order_by('-created_at', '-pk'),
+                             'transaction_user_created_idx')
+
+    def test_low_stock_items_read_the_partial_index(self):
+        self.assertUsesIndex(Item.objects.filter(user=self.user).low_stock(), 'item_user_low_stock_idx')
+
+    def test_sn_lookup_reads_the_user_sn_index(self):
+        self.assertUsesIndex(Item.objects.filter(user=self.user, sn='1'), 'item_user_sn_idx')
+
+    def test_sales_are_owned_by_their_items_user(self):
+        sale = Transaction.objects.create(item=self.item, amount='1.00')
+        self.assertEqual(Transaction.objects.filter(user=self.user).get(), sale)
@@ -0,0 +1,63 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from Dashboard.instrumentation import QueryRecorder, registry, signature
+from Dashboard.models import Item
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class RequestMetricsTests(TestCase):
+    """Every request lands in the per-view histograms served at /metrics."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        with use_tenant(self.user):
+            Item.objects.create(user=self.user, sn='1', name='Hammer', price='1.00', stock=1)
+        self.client.force_login(self.user)
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_views_are_counted_with_their_queries(self):
+        self.client.get(reverse('dashboard:items_list'))
+        self.client.get(reverse('dashboard:items_list'))
+        body = self.scrape()
+        self.assertIn('dashboard_requests_total{view="dashboard:items_list",method="GET",status="200"} 2', body)
+        self.assertIn('dashboard_request_duration_seconds_count{view="dashboard:items_list"} 2', body)
+        self.assertIn('dashboard_request_queries_count{view="dashboard:items_list"} 2', body)
+        self.assertIn('dashboard_request_queries_bucket{view="dashboard:items_list",le="0"} 0', body)
+        # The scrape itself is not recorded
+        self.assertNotIn('view="metrics"', body)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_only_allowed_addresses_and_staff_can_scrape(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class DuplicateQueryTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_repeated_statements_are_reported_once_per_signature(self):
+        recorder = QueryRecorder()
+        recorder.statements.update({'SELECT 1 WHERE id = %s': 3, 'SELECT 2': 1})
+        registry.observe('items', 'GET', 200, 0.01, recorder)
+        sig, _ = signature('SELECT 1 WHERE id = %s')
+        body = registry.render()
+        self.assertIn(f'dashboard_duplicate_queries_total{{view="items",signature="{sig}"}} 2', body)
+        self.assertIn(f'dashboard_duplicate_query_info{{signature="{sig}",sql="SELECT 1 WHERE id = %s"}} 1', body)
+        self.assertEqual(body.count('dashboard_duplicate_query_info{'), 1)
+
+    def test_in_lists_of_any_length_share_a_signature(self):
+        self.assertEqual(signature('SELECT * FROM t WHERE id IN (%s, %s)')[0],
+                         signature('SELECT * FROM t WHERE id IN (%s, %s, %s, %s)')[0])
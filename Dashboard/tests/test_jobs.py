@@ -0,0 +1,142 @@
+import datetime
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from Dashboard import jobs
+from Dashboard.models import Item, Job, TenantShard
+from Dashboard.sharding import placement, use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class JobQueueTests(TestCase):
+    """claim() honours the run order, the concurrency limits and moving tenants."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='secret-pass-1')
+        self.bob = User.objects.create_user('bob', password='secret-pass-1')
+        self.calls = []
+
+        def flaky(job, progress):
+            self.calls.append(job.pk)
+            progress(1, total=2, message='halfway')
+            if len(self.calls) == 1:
+                raise RuntimeError('first attempt fails')
+            return {'ok': True}
+
+        jobs.task('test_flaky', max_attempts=2)(flaky)
+        jobs.task('test_single', concurrency=1)(lambda job, progress: None)
+        for name in ('test_flaky', 'test_single'):
+            self.addCleanup(jobs.TASKS.pop, name)
+
+    def test_unknown_tasks_are_refused(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('nope')
+
+    def test_one_running_job_per_user(self):
+        first = jobs.enqueue('test_flaky', self.alice)
+        second = jobs.enqueue('test_flaky', self.alice)
+        theirs = jobs.enqueue('test_flaky', self.bob)
+        self.assertEqual(jobs.claim('w').pk, first.pk)
+        self.assertEqual(jobs.claim('w').pk, theirs.pk)
+        self.assertIsNone(jobs.claim('w'))
+        Job.objects.filter(pk=first.pk).update(status=Job.SUCCEEDED)
+        self.assertEqual(jobs.claim('w').pk, second.pk)
+
+    def test_task_concurrency_caps_running_jobs(self):
+        jobs.enqueue('test_single')
+        queued = jobs.enqueue('test_single')
+        self.assertEqual(jobs.claim('w').attempts, 1)
+        self.assertIsNone(jobs.claim('w'))
+        self.assertEqual(Job.objects.get(pk=queued.pk).status, Job.QUEUED)
+
+    def test_moving_users_jobs_wait(self):
+        placement(self.alice)
+        TenantShard.objects.filter(user=self.alice).update(moving=True)
+        jobs.enqueue('test_flaky', self.alice)
+        self.assertIsNone(jobs.claim('w'))
+
+    def test_failed_attempts_are_retried_with_backoff(self):
+        job = jobs.enqueue('test_flaky', self.alice)
+        jobs.claim('w')
+        self.assertEqual(jobs._run(job.pk), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertIn('first attempt fails', job.error)
+        self.assertGreater(job.run_after, timezone.now() + jobs.RETRY_DELAY - datetime.timedelta(seconds=5))
+        self.assertEqual((job.progress_done, job.progress_total, job.message), (1, 2, 'halfway'))
+        self.assertIsNone(jobs.claim('w'))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.claim('w')
+        self.assertEqual(jobs._run(job.pk), Job.SUCCEEDED)
+        job.refresh_from_db()
+        self.assertEqual((job.attempts, job.result, job.error), (2, {'ok': True}, ''))
+
+    def test_out_of_attempts_fails_the_job(self):
+        job = jobs.enqueue('test_single')
+        jobs.claim('w')
+        job.refresh_from_db()
+        jobs.fail_attempt(job, 'boom')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.QUEUED, 'boom'))
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.claim('w')
+        job.refresh_from_db()
+        job.max_attempts = job.attempts
+        jobs.fail_attempt(job, 'boom again')
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+
+    def test_jobs_of_silent_workers_are_requeued(self):
+        job = jobs.enqueue('test_flaky', self.alice)
+        jobs.claim('w')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - jobs.STALE_AFTER - datetime.timedelta(seconds=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+
+class JobsApiTests(TestCase):
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.enterContext(override_settings(JOB_FILES_DIR=self.enterContext(tempfile.TemporaryDirectory())))
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        with use_tenant(self.user):
+            Item.objects.create(user=self.user, sn='1', name='Hammer', price='5.00', stock=2)
+        self.client.force_login(self.user)
+        self.url = reverse('dashboard:jobs')
+
+    def test_export_job_end_to_end(self):
+        response = self.client.post(self.url, {'task': 'export', 'params': {'kind': 'items', 'format': 'csv', 'x': 1}},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(pk=response.json()['id'])
+        self.assertEqual(job.params, {'kind': 'items', 'format': 'csv'})
+        self.assertEqual(response['Location'], reverse('dashboard:job_status', args=[job.pk]))
+
+        self.assertEqual(jobs.claim('w').pk, job.pk)
+        self.assertEqual(jobs._run(job.pk), Job.SUCCEEDED)
+        status = self.client.get(response['Location']).json()
+        self.assertEqual(status['result']['rows'], 1)
+        self.assertEqual(status['download'], reverse('dashboard:job_download', args=[job.pk]))
+        download = self.client.get(status['download'])
+        self.assertIn(b'Hammer', b''.join(download.streaming_content))
+        self.assertEqual([row['id'] for row in self.client.get(self.url).json()['jobs']], [job.pk])
+
+    def test_bad_requests(self):
+        post = lambda body: self.client.post(self.url, body, content_type='application/json')
+        self.assertEqual(post({'task': 'import_items'}).status_code, 400)
+        self.assertEqual(post({'task': 'export', 'params': {'kind': 'users'}}).status_code, 400)
+        self.assertEqual(post({'task': 'export', 'params': {'kind': ['items']}}).status_code, 400)
+        self.assertEqual(post({'task': 'export', 'params': {'kind': {'items': 1}}}).status_code, 400)
+        self.assertEqual(post({'task': 'export', 'params': {'kind': 'items', 'start': 'soon'}}).status_code, 400)
+        self.assertEqual(post('[]').status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_other_users_jobs_are_hidden(self):
+        other = User.objects.create_user('bob', password='secret-pass-1')
+        job = jobs.enqueue('rebuild_metrics', other)
+        self.assertEqual(self.client.get(reverse('dashboard:job_status', args=[job.pk])).status_code, 404)
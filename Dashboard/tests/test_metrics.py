@@ -0,0 +1,70 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from Dashboard import stock
+from Dashboard.metrics import rebuild_user_metrics
+from Dashboard.models import Category, CategoryMetrics, InventoryMetrics, Item
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class InventoryMetricsTests(TestCase):
+    """The per-user rollup follows every item and category write."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.tools = Category.objects.create(user=self.user, name='Tools')
+
+    def assert_matches_rebuild(self):
+        kept = InventoryMetrics.objects.values('total_items', 'categories', 'low_stock', 'total_value').get(user=self.user)
+        kept_counts = dict(CategoryMetrics.objects.values_list('category_id', 'item_count'))
+        rebuild_user_metrics(self.user.pk)
+        rebuilt = InventoryMetrics.objects.values('total_items', 'categories', 'low_stock', 'total_value').get(user=self.user)
+        self.assertEqual(kept, rebuilt)
+        self.assertEqual(kept_counts, dict(CategoryMetrics.objects.values_list('category_id', 'item_count')))
+        return rebuilt
+
+    def test_creates_edits_and_deletes_keep_the_rollup_exact(self):
+        hammer = Item.objects.create(user=self.user, name='Hammer', category=self.tools, price='12.50', stock=4, reorder_level=5)
+        saw = Item.objects.create(user=self.user, name='Saw', category=self.tools, price='20.00', stock=10, reorder_level=5)
+        hammer.stock, hammer.price = 8, Decimal('10.00')
+        hammer.save()
+        saw.category = None
+        saw.save()
+        Category.objects.create(user=self.user, name='Garden')
+        Item.objects.create(user=self.user, name='Rake', price='3.00', stock=0, reorder_level=1).delete()
+
+        metrics = self.assert_matches_rebuild()
+        self.assertEqual(metrics['total_items'], 2)
+        self.assertEqual(metrics['categories'], 2)
+        self.assertEqual(metrics['low_stock'], 0)
+        self.assertEqual(metrics['total_value'], Decimal('280.00'))
+
+    def test_ledger_stock_changes_update_the_rollup(self):
+        item = Item.objects.create(user=self.user, name='Hammer', category=self.tools, price=Decimal('2.00'), stock=6, reorder_level=5)
+        stock.sell(item, 3)
+        stock.receive(item, 1)
+
+        metrics = self.assert_matches_rebuild()
+        self.assertEqual(metrics['low_stock'], 1)
+        self.assertEqual(metrics['total_value'], Decimal('8.00'))
+
+    def test_deleting_a_category_keeps_its_items(self):
+        Item.objects.create(user=self.user, name='Hammer', category=self.tools, price='1.00', stock=1)
+        self.tools.delete()
+
+        metrics = self.assert_matches_rebuild()
+        self.assertEqual((metrics['total_items'], metrics['categories']), (1, 0))
+
+    def test_dashboard_shows_the_rollup(self):
+        Item.objects.create(user=self.user, name='Hammer', category=self.tools, price='12.50', stock=2, reorder_level=5)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard:index'))
+        self.assertEqual(response.context['metrics']['total_items'], 1)
+        self.assertEqual(response.context['metrics']['low_stock'], 1)
+        self.assertEqual(response.context['metrics']['total_value'], Decimal('25.00'))
@@ -0,0 +1,83 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from Dashboard.models import Item, Transaction
+from Dashboard.pagination import KeysetPaginator, encode_cursor
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class KeysetPaginatorTests(TestCase):
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        item = Item.objects.create(user=self.user, name='Hammer', price='1.00')
+        start = timezone.now()
+        # Pairs of sales share a timestamp, so pages must break ties on pk
+        Transaction.objects.bulk_create([
+            Transaction(item=item, user=self.user, amount=n, created_at=start - datetime.timedelta(minutes=n // 2))
+            for n in range(11)
+        ])
+        self.paginator = KeysetPaginator(Transaction.objects.filter(user=self.user), ['-created_at', '-pk'], 3)
+        self.expected = list(Transaction.objects.filter(user=self.user).order_by('-created_at', '-pk'))
+
+    def test_next_and_previous_walk_every_row_once(self):
+        pages = [self.paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([row for page in pages for row in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 2])
+        self.assertFalse(pages[0].has_previous())
+
+        back = [pages[-1]]
+        while back[-1].has_previous():
+            back.append(self.paginator.get_page(back[-1].previous_cursor))
+        self.assertEqual([list(page) for page in reversed(back)], [list(page) for page in pages])
+
+    def test_bad_cursors_give_the_first_page(self):
+        first = list(self.paginator.get_page())
+        for cursor in ['garbage', '!!!', encode_cursor('next', ['x']), encode_cursor('sideways', []),
+                       encode_cursor('next', ['not a date', 'abc']), encode_cursor('next', [None, None]),
+                       encode_cursor('next', [{'a': 1}, [2]]), encode_cursor('prev', [True, 1])]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(list(self.paginator.get_page(cursor)), first)
+
+
+class PaginatedViewTests(TestCase):
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        Item.objects.bulk_create([Item(user=self.user, name=f'Item {n}', price='2.50', stock=n) for n in range(25)])
+        self.client.force_login(self.user)
+
+    def test_item_list_pages_with_cursors(self):
+        first = self.client.get(reverse('dashboard:items_list'))
+        page = first.context['page_obj']
+        self.assertEqual(len(page), 20)
+        self.assertEqual(page[3].total_value, page[3].stock * page[3].price)
+
+        second = self.client.get(reverse('dashboard:items_list'), {'cursor': page.next_cursor})
+        self.assertEqual(len(second.context['page_obj']), 5)
+        self.assertFalse(second.context['page_obj'].has_next())
+
+        self.assertEqual(self.client.get(reverse('dashboard:items_list'), {'cursor': 'bogus'}).status_code, 200)
+
+    def test_crafted_transaction_cursors_give_the_first_page(self):
+        for cursor in (encode_cursor('next', [None, None]), encode_cursor('next', [{}, []])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(reverse('dashboard:transaction_list'), {'cursor': cursor}).status_code, 200)
+
+    def test_other_users_rows_are_not_listed(self):
+        other = User.objects.create_user('bob', password='secret-pass-1')
+        with use_tenant(other):
+            Item.objects.create(user=other, name='Not yours', price='1.00')
+        response = self.client.get(reverse('dashboard:items_list'))
+        self.assertNotContains(response, 'Not yours')
@@ -0,0 +1,62 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from Dashboard import reorder, stock
+from Dashboard.models import Item, ReorderSuggestion, ScannerCheckpoint, TenantShard
+from Dashboard.sharding import tenant_db, use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class ReorderScannerTests(TestCase):
+    """Passes keep one suggestion per item below its reorder level."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.hammer = Item.objects.create(user=self.user, name='Hammer', price=Decimal('5.00'), stock=2, reorder_level=5)
+        self.saw = Item.objects.create(user=self.user, name='Saw', price=Decimal('9.00'), stock=8, reorder_level=5)
+
+    def suggestions(self):
+        return dict(ReorderSuggestion.objects.values_list('item_id', 'quantity'))
+
+    def age_items(self):
+        """Make every item look unchanged since well before the next pass."""
+        Item.objects.update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+
+    def test_full_pass_suggests_restocking_to_twice_the_level(self):
+        self.assertEqual(reorder.scan(full=True), (2, 1, 0))
+        self.assertEqual(self.suggestions(), {self.hammer.pk: 8})
+        self.assertTrue(ScannerCheckpoint.objects.filter(name=reorder.SCANNER_NAME).exists())
+
+    def test_incremental_pass_only_checks_changed_items(self):
+        reorder.scan(full=True)
+        self.age_items()
+        stock.sell(self.saw, 4)
+        stock.receive(self.hammer, 10)
+        checked, written, cleared = reorder.scan()
+        self.assertEqual((checked, written, cleared), (2, 1, 1))
+        self.assertEqual(self.suggestions(), {self.saw.pk: 6})
+
+        self.age_items()
+        self.assertEqual(reorder.scan(), (0, 0, 0))
+
+    def test_full_pass_clears_stale_suggestions(self):
+        reorder.scan(full=True)
+        self.age_items()
+        # Changed behind the scanner's back, with no updated_at bump
+        Item.objects.filter(pk=self.hammer.pk).update(stock=20)
+        self.assertEqual(reorder.scan()[0], 0)
+        self.assertEqual(reorder.scan(full=True)[2], 1)
+        self.assertEqual(self.suggestions(), {})
+
+    def test_moving_users_are_skipped_until_rescanned(self):
+        TenantShard.objects.update_or_create(user=self.user, defaults={'database': tenant_db(), 'moving': True})
+        self.assertEqual(reorder.scan(full=True), (0, 0, 0))
+        TenantShard.objects.filter(user=self.user).update(moving=False)
+        self.assertEqual(reorder.scan_user(self.user.pk), (2, 1, 0))
+        self.assertEqual(self.suggestions(), {self.hammer.pk: 8})
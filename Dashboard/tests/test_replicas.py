@@ -0,0 +1,68 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import router
+from django.test import RequestFactory, TestCase, override_settings
+
+from Dashboard import caching, replicas
+from Dashboard.models import Item
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+REPLICAS = {'default': 'default_replica', 'shard1': 'shard1_replica'}
+
+
+@override_settings(DASHBOARD_REPLICAS=REPLICAS, REPLICA_MAX_LAG_SECONDS=300, REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(TestCase):
+    """Reads inside use_replicas() go to the replica of the tenant's database."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+
+    def test_reads_follow_the_primary_to_its_replica(self):
+        self.assertEqual(replicas.primary_of('shard1_replica'), 'shard1')
+        self.assertEqual(replicas.primary_of('shard1'), 'shard1')
+        with use_tenant(self.user):
+            primary = router.db_for_read(Item)
+            with replicas.use_replicas():
+                self.assertEqual(router.db_for_read(Item), REPLICAS.get(primary))
+                # Writes, and models outside the shards, are unaffected
+                self.assertEqual(router.db_for_write(Item), primary)
+                self.assertEqual(router.db_for_read(User), 'default_replica')
+
+    def test_objects_read_from_a_replica_save_to_the_primary(self):
+        item = Item(name='Hammer')
+        item._state.db = 'shard1_replica'
+        self.assertEqual(replicas.ReplicaRouter().db_for_write(Item, instance=item), 'shard1')
+
+    def test_replica_is_used_only_after_the_users_last_write(self):
+        now = time.time()
+        caching.bump_data_version(self.user.pk)
+        with mock.patch.object(replicas, 'snapshot_time', return_value=now - 1):
+            self.assertFalse(replicas.is_fresh_for(self.user.pk, 'default'))
+        with mock.patch.object(replicas, 'snapshot_time', return_value=time.time() + 1):
+            self.assertTrue(replicas.is_fresh_for(self.user.pk, 'default'))
+        # Too stale to use at all
+        with mock.patch.object(replicas, 'snapshot_time', return_value=now - 301):
+            self.assertFalse(replicas.is_fresh_for(self.user.pk - 1, 'default'))
+        # A SQLite replica that was never copied
+        with mock.patch.object(replicas, 'snapshot_time', return_value=None):
+            self.assertFalse(replicas.is_fresh_for(self.user.pk, 'default'))
+
+    @override_settings(DASHBOARD_REPLICAS={'default': 'default'})
+    def test_replica_reads_only_when_fresh(self):
+        @replicas.replica_reads
+        def view(request):
+            return replicas._reading.get()
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+        caching.bump_data_version(self.user.pk)
+        with mock.patch.object(replicas, 'snapshot_time', return_value=time.time() + 1):
+            self.assertIs(view(request), True)
+        with mock.patch.object(replicas, 'snapshot_time', return_value=time.time() - 1):
+            self.assertIs(view(request), False)
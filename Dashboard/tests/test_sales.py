@@ -0,0 +1,63 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from Dashboard.models import Item, SalesBucket, Transaction
+from Dashboard.sales import rebuild_sales_buckets
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class SalesBucketTests(TestCase):
+    """Transaction writes keep the day/month/year rollups equal to a rebuild."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.item = Item.objects.create(user=self.user, name='Hammer', price='5.00', stock=100)
+        self.now = timezone.now()
+
+    def buckets(self):
+        return sorted(SalesBucket.objects.filter(user=self.user).exclude(count=0).values_list('period', 'start', 'total', 'count'))
+
+    def test_writes_match_a_rebuild(self):
+        last_year = self.now - datetime.timedelta(days=400)
+        Transaction.objects.create(item=self.item, amount='5.00', created_at=self.now)
+        moved = Transaction.objects.create(item=self.item, amount='10.00', created_at=self.now)
+        Transaction.objects.create(item=self.item, amount='2.50', created_at=last_year)
+        moved.amount, moved.created_at = Decimal('7.00'), last_year
+        moved.save()
+        Transaction.objects.create(item=self.item, amount='1.00', created_at=self.now).delete()
+
+        kept = self.buckets()
+        rebuild_sales_buckets([self.user.pk])
+        self.assertEqual(kept, self.buckets())
+        year = SalesBucket.objects.get(user=self.user, period=SalesBucket.YEAR, start=timezone.localdate(last_year).replace(month=1, day=1))
+        self.assertEqual((year.total, year.count), (Decimal('9.50'), 2))
+
+    def test_transaction_owner_comes_from_the_item(self):
+        sale = Transaction.objects.create(item=self.item, amount='5.00')
+        self.assertEqual(sale.user_id, self.user.pk)
+
+    def test_chart_reads_the_buckets(self):
+        Transaction.objects.create(item=self.item, amount='5.00', created_at=self.now)
+        Transaction.objects.create(item=self.item, amount='2.25', created_at=self.now)
+        self.client.force_login(self.user)
+
+        payload = self.client.get(reverse('dashboard:sales_data'), {'period': 'weekly'}).json()
+        self.assertEqual(len(payload['labels']), 7)
+        self.assertEqual(payload['data'][-1], 7.25)
+        self.assertEqual(sum(payload['data']), 7.25)
+
+    def test_unknown_period_falls_back_to_yearly(self):
+        self.client.force_login(self.user)
+        payload = self.client.get(reverse('dashboard:sales_data'), {'period': 'hourly'}).json()
+        self.assertEqual(payload['labels'][-1], str(timezone.localdate().year))
+        self.assertEqual(payload['data'], [0.0] * 5)
@@ -0,0 +1,65 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.test import TestCase
+from django.urls import reverse
+
+from Dashboard.models import InventoryMetrics, Item, SalesBucket, StockMovement, Transaction
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class SalesBatchTests(TestCase):
+    """/api/sales/batch/ sells the good lines and reports the bad ones."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.hammer = Item.objects.create(user=self.user, name='Hammer', price=Decimal('2.00'), stock=5, reorder_level=3)
+        self.saw = Item.objects.create(user=self.user, name='Saw', price=Decimal('10.00'), stock=1)
+        self.client.force_login(self.user)
+        self.url = reverse('dashboard:sales_batch')
+
+    def post(self, body):
+        return self.client.post(self.url, json.dumps(body), content_type='application/json')
+
+    def test_lines_succeed_or_fail_on_their_own(self):
+        response = self.post({'lines': [
+            {'item': self.hammer.pk, 'quantity': 2},
+            {'item': self.saw.pk, 'quantity': 1, 'amount': '9.50'},
+            {'item': self.saw.pk},
+            {'item': self.saw.pk + 100},
+            {'item': self.hammer.pk, 'quantity': 0},
+            {'item': self.hammer.pk, 'quantity': 3},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['sold'], body['failed']), (3, 3))
+        self.assertEqual([result['ok'] for result in body['results']], [True, True, False, False, False, True])
+        self.assertEqual(body['results'][2]['error'], 'only 0 in stock')
+        self.assertEqual(body['results'][3]['error'], 'unknown item')
+        self.assertEqual(body['results'][5]['stock'], 0)
+
+        self.hammer.refresh_from_db()
+        self.saw.refresh_from_db()
+        self.assertEqual((self.hammer.stock, self.saw.stock), (0, 0))
+        self.assertEqual(Transaction.objects.filter(user=self.user).aggregate(total=Sum('amount'))['total'], Decimal('19.50'))
+        self.assertEqual(StockMovement.objects.filter(item=self.hammer, kind=StockMovement.SALE).aggregate(total=Sum('quantity'))['total'], -5)
+        self.assertEqual(SalesBucket.objects.filter(user=self.user, period=SalesBucket.DAY).get().total, Decimal('19.50'))
+        metrics = InventoryMetrics.objects.get(user=self.user)
+        self.assertEqual((metrics.low_stock, metrics.total_value), (2, 0))
+
+    def test_malformed_requests_are_rejected(self):
+        self.assertEqual(self.client.post(self.url, 'not json', content_type='application/json').status_code, 400)
+        self.assertEqual(self.post({'lines': {}}).status_code, 400)
+        self.assertEqual(self.post({'lines': [{'item': self.hammer.pk}] * 1001}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_bad_amounts_fail_their_line(self):
+        body = self.post({'lines': [{'item': self.hammer.pk, 'amount': amount} for amount in ('NaN', 'Infinity', 'abc', '-1')]}).json()
+        self.assertEqual([result['error'] for result in body['results']],
+                         ['amount must be a number'] * 3 + ['amount must not be negative'])
+        self.assertFalse(Transaction.objects.exists())
@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Dashboard.models import Item, SalesBucket, Transaction
+from Dashboard.sharding import tenant_db, use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class SalesDataETagTests(TestCase):
+    """sales_data answers repeat polls with 304 until the user's sales change."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.item = Item.objects.create(user=self.user, name='Hammer', price='5.00', stock=10)
+        self.client.force_login(self.user)
+        self.url = reverse('dashboard:sales_data')
+
+    def sell(self, amount):
+        with self.captureOnCommitCallbacks(using=tenant_db(), execute=True):
+            Transaction.objects.create(item=self.item, amount=amount)
+
+    def test_matching_etag_gets_304_without_sales_queries(self):
+        self.sell('5.00')
+        first = self.client.get(self.url, {'period': 'weekly'})
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('private', first['Cache-Control'])
+
+        with CaptureQueriesContext(connections[tenant_db()]) as queries:
+            again = self.client.get(self.url, {'period': 'weekly'}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertFalse([q for q in queries if SalesBucket._meta.db_table in q['sql']])
+
+    def test_a_sale_changes_the_etag(self):
+        self.sell('5.00')
+        first = self.client.get(self.url, {'period': 'weekly'})
+        self.sell('2.50')
+
+        second = self.client.get(self.url, {'period': 'weekly'}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.json()['data'][-1], 7.5)
+
+    def test_etag_depends_on_the_period(self):
+        weekly = self.client.get(self.url, {'period': 'weekly'})
+        monthly = self.client.get(self.url, {'period': 'monthly'}, HTTP_IF_NONE_MATCH=weekly['ETag'])
+        self.assertEqual(monthly.status_code, 200)
+        self.assertEqual(len(monthly.json()['labels']), 12)
+
+    def test_payload_is_cached_per_sales_version(self):
+        self.sell('5.00')
+        self.client.get(self.url, {'period': 'weekly'})
+        # A rollup change that skips the version bump is not seen
+        SalesBucket.objects.filter(user=self.user).update(total=999)
+        self.assertEqual(self.client.get(self.url, {'period': 'weekly'}).json()['data'][-1], 5.0)
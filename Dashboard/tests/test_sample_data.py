@@ -0,0 +1,86 @@
+import datetime
+
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from Dashboard.models import Category, InventoryMetrics, Item, SalesBucket, Transaction
+from Dashboard.probes import ViewProbe, percentile, view_paths
+from Dashboard.sample_data import generate
+from Dashboard.sharding import tenant_db, use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class SampleDataTests(TestCase):
+    databases = PRIMARY_DATABASES
+
+    def summary(self, user):
+        with use_tenant(user):
+            items = list(Item.objects.filter(user=user).order_by('sn').values_list('sn', 'name', 'category__name', 'stock', 'price'))
+            amounts = sorted(Transaction.objects.filter(user=user).values_list('amount', flat=True))
+        return items, amounts
+
+    def test_generates_the_requested_rows_with_rollups(self):
+        users = generate(users=2, items=6, transactions=40, years=2, categories=3, seed=7)
+        self.assertEqual(len(users), 2)
+        for user in users:
+            with self.subTest(user=user.username), use_tenant(user):
+                self.assertEqual(Category.objects.filter(user=user).count(), 3)
+                self.assertEqual(sorted(Item.objects.filter(user=user).values_list('sn', flat=True)), [str(n) for n in range(1, 7)])
+                sales = Transaction.objects.filter(user=user)
+                self.assertEqual(sales.count(), 40)
+                self.assertFalse(sales.filter(created_at__lt=timezone.now() - datetime.timedelta(days=2 * 365)).exists())
+                self.assertEqual(InventoryMetrics.objects.get(user=user).total_items, 6)
+                self.assertEqual(
+                    SalesBucket.objects.filter(user=user, period=SalesBucket.YEAR).aggregate(total=Sum('total'))['total'],
+                    sales.aggregate(total=Sum('amount'))['total'],
+                )
+
+    def test_same_seed_gives_the_same_data(self):
+        first, = generate(items=5, transactions=20, seed=3, prefix='first')
+        second, = generate(items=5, transactions=20, seed=3, prefix='second')
+        self.assertEqual(self.summary(first), self.summary(second))
+
+    def test_rerunning_replaces_the_users_data(self):
+        first, = generate(items=5, transactions=20, seed=3)
+        before = self.summary(first)
+        again, = generate(items=5, transactions=20, seed=3)
+        self.assertEqual(again, first)
+        self.assertEqual(self.summary(again), before)
+        with use_tenant(again):
+            self.assertEqual(Category.objects.filter(user=again).count(), 5)
+            self.assertEqual(InventoryMetrics.objects.get(user=again).total_items, 5)
+
+    def test_every_probed_view_responds(self):
+        user, = generate(items=3, transactions=10)
+        self.client.force_login(user)
+        paths = list(view_paths(user))
+        self.assertIn(('sales_data', '/sales-data/?period=weekly'), paths)
+        for name, path in paths:
+            if name.startswith('async_'):
+                # Their worker threads cannot see this test's transaction (see test_async_views)
+                continue
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertLess(response.status_code, 500, name)
+
+
+    def test_probe_captures_queries_on_the_tenants_database(self):
+        user, = generate(items=3, transactions=10)
+        probe = ViewProbe(user)
+        # The test runner has already set up the test environment __enter__ would
+        probe.client = self.client
+        self.client.force_login(user)
+        response, queries = probe.get('/items/')
+        self.assertEqual(response.status_code, 200)
+        with use_tenant(user):
+            self.assertIn(tenant_db(), {query['alias'] for query in queries if 'Dashboard_item' in query['sql']})
+
+
+class PercentileTests(TestCase):
+    def test_nearest_rank(self):
+        samples = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(samples, 50), 3)
+        self.assertEqual(percentile(samples, 100), 5)
+        self.assertEqual(percentile(samples, 1), 1)
+        self.assertEqual(percentile([], 95), 0.0)
@@ -0,0 +1,67 @@
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from Dashboard import search
+from Dashboard.models import Category, Item
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'reads the SQLite FTS5 index')
+class ItemSearchTests(TestCase):
+    """Every query word matches as a prefix of the item's text columns."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.tools = Category.objects.create(user=self.user, name='Tools')
+        self.hammer = Item.objects.create(user=self.user, sn='H-100', name='Hammer', category=self.tools, price='5.00', stock=1)
+        self.sledge = Item.objects.create(user=self.user, sn='S-200', name='Sledge hammer', description='Heavy', price='9.00', stock=1)
+        self.hammock = Item.objects.create(user=self.user, name='Hammock', price='20.00', stock=1)
+
+    def names(self, query, **kwargs):
+        return [item.name for item in search.search_items(self.user, query, **kwargs)]
+
+    def test_prefixes_match_and_name_starts_rank_first(self):
+        self.assertEqual(self.names('ham'), ['Hammer', 'Hammock', 'Sledge hammer'])
+        self.assertEqual(self.names('hammer'), ['Hammer', 'Sledge hammer'])
+        self.assertEqual(self.names('ham heav'), ['Sledge hammer'])
+        self.assertEqual(self.names('tool'), ['Hammer'])
+        self.assertEqual(self.names('s 200'), ['Sledge hammer'])
+        self.assertEqual(self.names('ham', limit=1), ['Hammer'])
+        self.assertEqual(self.names('  '), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.hammock.name = 'Deck chair'
+        self.hammock.save()
+        self.tools.name = 'Workshop'
+        self.tools.save()
+        self.sledge.delete()
+        self.assertEqual(self.names('ham'), ['Hammer'])
+        self.assertEqual(self.names('deck'), ['Deck chair'])
+        self.assertEqual(self.names('workshop'), ['Hammer'])
+
+    def test_other_users_items_are_not_found(self):
+        other = User.objects.create_user('bob', password='secret-pass-1')
+        with use_tenant(other):
+            Item.objects.create(user=other, name='Hammer drill', price='1.00', stock=1)
+            self.assertEqual([item.name for item in search.search_items(other, 'ham')], ['Hammer drill'])
+        self.assertEqual(self.names('drill'), [])
+
+    def test_rebuild_refills_the_index(self):
+        self.assertEqual(search.rebuild_index(), Item.objects.count())
+        self.assertEqual(self.names('ham'), ['Hammer', 'Hammock', 'Sledge hammer'])
+
+    def test_typeahead_endpoint(self):
+        self.client.force_login(self.user)
+        url = reverse('dashboard:item_search')
+        results = self.client.get(url, {'q': 'hamm', 'limit': 2}).json()['results']
+        self.assertEqual(results[0], {'id': self.hammer.pk, 'sn': 'H-100', 'name': 'Hammer', 'category': 'Tools',
+                                      'stock': 1, 'price': '5.00'})
+        self.assertEqual(len(results), 2)
+        self.assertEqual(self.client.get(url, {'q': 'ham', 'limit': 'many'}).status_code, 400)
@@ -0,0 +1,46 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from Dashboard.models import Item
+from Dashboard.serials import allocate_sn, allocate_sns, peek_next_sn
+from Dashboard.sharding import use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class SerialAllocationTests(TestCase):
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+
+    def test_sequence_starts_after_existing_numeric_sns(self):
+        Item.objects.bulk_create([
+            Item(user=self.user, sn=sn, name=sn, price='1.00') for sn in ['7', '12', 'A-99', '']
+        ])
+        self.assertEqual(peek_next_sn(self.user.pk), 13)
+        self.assertEqual(allocate_sn(self.user.pk), 13)
+        self.assertEqual(list(allocate_sns(self.user.pk, 3)), [14, 15, 16])
+        self.assertEqual(peek_next_sn(self.user.pk), 17)
+
+    def test_users_have_separate_sequences(self):
+        other = User.objects.create_user('bob', password='secret-pass-1')
+        self.assertEqual(allocate_sn(self.user.pk), 1)
+        with use_tenant(other):
+            self.assertEqual(allocate_sn(other.pk), 1)
+        self.assertEqual(allocate_sn(self.user.pk), 2)
+
+    def test_count_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            allocate_sns(self.user.pk, 0)
+
+    def test_create_view_assigns_the_next_sn(self):
+        self.client.force_login(self.user)
+        for name in ('Hammer', 'Saw'):
+            response = self.client.post(reverse('dashboard:item_add'), {
+                'name': name, 'stock': 3, 'reorder_level': 1, 'price': '4.00',
+            })
+            self.assertRedirects(response, reverse('dashboard:index'), fetch_redirect_response=False)
+        self.assertEqual(list(Item.objects.filter(user=self.user).order_by('pk').values_list('name', 'sn')),
+                         [('Hammer', '1'), ('Saw', '2')])
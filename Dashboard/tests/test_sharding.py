@@ -0,0 +1,85 @@
+import unittest
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from Dashboard.models import Category, InventoryMetrics, Item, Job, TenantShard, Transaction
+from Dashboard.sharding import ADMIN_SHARD_SESSION_KEY, move_tenant, placement, shards, tenant_db, use_shard, use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+@unittest.skipUnless(len(shards()) > 1, 'needs several shards (IMS_SHARDS)')
+class ShardingTests(TestCase):
+    """Each user's inventory lives in, and is read from, their own shard."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', password='secret-pass-1')
+        self.home = placement(self.alice)[0]
+        self.other = next(alias for alias in shards() if alias != self.home)
+        with use_tenant(self.alice):
+            self.tools = Category.objects.create(user=self.alice, name='Tools')
+            self.hammer = Item.objects.create(user=self.alice, name='Hammer', category=self.tools, price=Decimal('5.00'), stock=4)
+            Transaction.objects.create(item=self.hammer, amount='5.00')
+
+    def test_new_users_are_placed_by_id(self):
+        self.assertEqual(self.home, shards()[self.alice.pk % len(shards())])
+        self.assertEqual(TenantShard.objects.get(user=self.alice).database, self.home)
+        # A stand-in user row keeps the shard's foreign keys valid
+        self.assertTrue(User.objects.using(self.home).filter(pk=self.alice.pk, is_active=False).exists())
+        self.assertTrue(Item.objects.using(self.home).filter(pk=self.hammer.pk, name='Hammer').exists())
+        self.assertFalse(Item.objects.using(self.other).filter(name='Hammer').exists())
+
+    def test_requests_read_the_users_shard(self):
+        self.client.force_login(self.alice)
+        self.assertContains(self.client.get(reverse('dashboard:items_list')), 'Hammer')
+
+    def test_writes_are_refused_while_the_user_moves(self):
+        TenantShard.objects.filter(user=self.alice).update(moving=True)
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('dashboard:items_list')).status_code, 200)
+        response = self.client.post(reverse('dashboard:item_add'), {'name': 'Saw', 'stock': 1, 'reorder_level': 0, 'price': '1.00'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_move_copies_everything_and_clears_the_source(self):
+        self.assertEqual(move_tenant(self.alice, self.other, settle=0), 8)  # category, item, sale, 3 sales buckets, 2 rollups
+        self.assertEqual(placement(self.alice), (self.other, False))
+        with use_shard(self.home):
+            self.assertFalse(Item.objects.filter(user=self.alice).exists())
+            self.assertFalse(Transaction.objects.filter(user=self.alice).exists())
+        with use_tenant(self.alice):
+            self.assertEqual(tenant_db(), self.other)
+            item = Item.objects.select_related('category').get(user=self.alice)
+            self.assertEqual((item.name, item.stock, item.category.name), ('Hammer', 4, 'Tools'))
+            self.assertEqual(Transaction.objects.get(user=self.alice).item, item)
+            self.assertEqual(InventoryMetrics.objects.get(user=self.alice).total_items, 1)
+        self.client.force_login(self.alice)
+        self.assertContains(self.client.get(reverse('dashboard:items_list')), 'Hammer')
+
+    def test_move_waits_for_running_jobs(self):
+        Job.objects.create(user=self.alice, task='export', status=Job.RUNNING)
+        with self.assertRaises(TimeoutError):
+            move_tenant(self.alice, self.other, settle=0, job_timeout=0)
+        self.assertEqual(placement(self.alice), (self.home, False))
+        with use_tenant(self.alice):
+            self.assertTrue(Item.objects.filter(user=self.alice).exists())
+
+    def test_admin_browses_the_chosen_shard(self):
+        staff = User.objects.create_superuser('admin', password='secret-pass-1')
+        self.client.force_login(staff)
+        url = reverse('admin:Dashboard_item_changelist')
+        response = self.client.get(url, {'_shard': self.home, 'q': 'ham'})
+        self.assertRedirects(response, f'{url}?q=ham', fetch_redirect_response=False)
+        self.assertEqual(self.client.session[ADMIN_SHARD_SESSION_KEY], self.home)
+        response = self.client.get(url)
+        self.assertContains(response, 'Hammer')
+        self.assertEqual(response.context['current_shard'], self.home)
+
+        self.client.get(url, {'_shard': self.other})
+        self.assertNotContains(self.client.get(url), 'Hammer')
+        # Unknown aliases are ignored
+        self.client.get(url, {'_shard': 'nowhere'})
+        self.assertEqual(self.client.session[ADMIN_SHARD_SESSION_KEY], self.other)
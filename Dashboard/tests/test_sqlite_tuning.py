@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test import SimpleTestCase
+
+from Dashboard.sqlite_tuning import journal_mode
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite' and settings.SQLITE_TUNED, 'needs the tuned SQLite settings')
+class SQLitePragmaTests(SimpleTestCase):
+    """Connections to an alias with PRAGMAS come up with them applied."""
+
+    def open(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = {**connection.settings_dict, 'NAME': os.path.join(directory.name, 'tuned.sqlite3')}
+        tuned = connections['default'].__class__(settings_dict, alias='tuned')
+        tuned.connect()
+        self.addCleanup(tuned.close)
+        return tuned
+
+    def pragma(self, conn, name):
+        with conn.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connections_get_the_configured_pragmas(self):
+        tuned = self.open()
+        self.assertEqual(journal_mode(tuned), 'wal')
+        self.assertEqual(self.pragma(tuned, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(tuned, 'cache_size'), -64 * 1024)
+        self.assertEqual(self.pragma(tuned, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(tuned, 'temp_store'), 2)  # MEMORY
+
+    def test_writers_take_the_lock_up_front(self):
+        self.assertEqual(connection.settings_dict['OPTIONS'].get('transaction_mode'), 'IMMEDIATE')
+        self.assertEqual(self.open().transaction_mode, 'IMMEDIATE')
@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.test import TestCase
+from django.urls import reverse
+
+from Dashboard import stock
+from Dashboard.models import InventoryMetrics, Item, StockMovement, Transaction
+from Dashboard.sharding import tenant_db, use_tenant
+from Dashboard.tests import PRIMARY_DATABASES
+
+
+class StockLedgerTests(TestCase):
+    """Every stock change goes through one guarded UPDATE and leaves a ledger row."""
+    databases = PRIMARY_DATABASES
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass-1')
+        self.enterContext(use_tenant(self.user))
+        self.item = Item.objects.create(user=self.user, name='Hammer', price=Decimal('2.00'), stock=5, reorder_level=3)
+        stock.record_opening_stock(self.item)
+
+    def assert_ledger_matches_stock(self):
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.movements.aggregate(total=Sum('quantity'))['total'], self.item.stock)
+        self.assertEqual(self.item.movements.latest('pk').stock_after, self.item.stock)
+
+    def test_receive_adjust_and_sell_are_logged(self):
+        stock.receive(self.item, 10, note='Delivery')
+        stock.adjust(self.item, -2, note='Count')
+        sale = stock.sell(self.item, 4)
+        self.assertEqual(sale.amount, Decimal('8.00'))
+        self.assertEqual(self.item.stock, 9)
+        self.assertEqual(
+            list(self.item.movements.order_by('pk').values_list('kind', 'quantity', 'stock_after')),
+            [('receipt', 5, 5), ('receipt', 10, 15), ('adjustment', -2, 13), ('sale', -4, 9)],
+        )
+        self.assertEqual(self.item.movements.get(kind=StockMovement.SALE).transaction, sale)
+        self.assert_ledger_matches_stock()
+
+    def test_overselling_changes_nothing(self):
+        with self.assertRaises(stock.InsufficientStock) as raised:
+            stock.sell(self.item, 6)
+        self.assertEqual((raised.exception.requested, raised.exception.available), (6, 5))
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(self.item.movements.count(), 1)
+        self.assert_ledger_matches_stock()
+
+    def test_selling_below_the_reorder_level_updates_the_rollup(self):
+        stock.sell(self.item, 3)
+        metrics = InventoryMetrics.objects.get(user=self.user)
+        self.assertEqual((metrics.low_stock, metrics.total_value), (1, Decimal('4.00')))
+
+    def test_item_edit_applies_the_change_to_the_current_stock(self):
+        self.client.force_login(self.user)
+        # A sale lands between rendering the edit form and submitting it
+        stock.sell(self.item, 1)
+        with self.captureOnCommitCallbacks(using=tenant_db(), execute=True):
+            response = self.client.post(reverse('dashboard:item_edit', args=[self.item.pk]), {
+                'name': 'Claw hammer', 'stock': 7, 'original_stock': 5, 'reorder_level': 3, 'price': '2.50',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.name, self.item.stock), ('Claw hammer', 6))
+        self.assertEqual(self.item.movements.latest('pk').note, 'Item edit')
+        self.assert_ledger_matches_stock()
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'dashboard'
 
@@ -13,11 +13,28 @@ urlpatterns = [
     path('items/', views.ItemListView.as_view(), name='items_list'),
     path('low-stock/', views.LowStockItemsView.as_view(), name='low_stock'),
     path('item/add/', views.ItemCreateView.as_view(), name='item_add'),
+    path('items/import/', views.import_items, name='item_import'),
+    path('api/items/search/', views.search_items, name='item_search'),
     path('item/<int:pk>/edit/', views.ItemUpdateView.as_view(), name='item_edit'),
     path('item/<int:pk>/delete/', views.ItemDeleteView.as_view(), name='item_delete'),
     # transactions
     path('transaction/record/', views.record_transaction, name='record_transaction'),
     path('transactions/', views.transaction_list, name='transaction_list'),
+    path('api/sales/batch/', views.record_sales_batch, name='sales_batch'),
+    # exports
+    path('export/<str:kind>/', views.export_data, name='export'),
+    # background jobs
+    path('api/jobs/', views.jobs_api, name='jobs'),
+    path('api/jobs/<int:pk>/', views.job_status, name='job_status'),
+    path('api/jobs/<int:pk>/download/', views.job_download, name='job_download'),
     # analytics
     path('sales-data/', views.sales_data, name='sales_data'),
+    path('api/sales/analytics/', views.sales_analytics, name='sales_analytics'),
+    # async (ASGI) variants of the read-only views
+    path('async/', async_views.index, name='async_index'),
+    path('async/metrics/', async_views.dashboard_metrics, name='async_metrics'),
+    path('async/items/', async_views.items_list, name='async_items_list'),
+    path('async/low-stock/', async_views.low_stock, name='async_low_stock'),
+    path('async/transactions/', async_views.transaction_list, name='async_transaction_list'),
+    path('async/sales-data/', async_views.sales_data, name='async_sales_data'),
 ]
@@ -1,14 +1,26 @@
-from django.shortcuts import render
+import json
+
+from django.shortcuts import get_object_or_404, render
 from django.contrib import messages
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic import ListView
-from django.db.models import F, Sum
-from django.db.models.functions import TruncDay, TruncMonth, TruncYear
+from django.db import transaction as db_transaction
+from django.db.models import F
 from django.utils import timezone
-from django.http import JsonResponse
-from .models import Item, Category, Transaction
-from .forms import ItemForm, TransactionForm
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from . import analytics, archive, caching, exporter, jobs, sales, search, stock
+from .models import Item, Category, Job, Transaction
+from .forms import ItemForm, ItemImportForm, TransactionForm
+from .importer import detect_format
+from .metrics import get_user_metrics
+from .pagination import KeysetPaginationMixin, KeysetPaginator
+from .replicas import replica_reads
+from .serials import allocate_sn, peek_next_sn
+from .sharding import tenant_db
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
@@ -16,16 +28,20 @@ from django.contrib.auth.decorators import login_required
 from .forms import RegistrationForm, LoginForm
 
 @login_required(login_url='dashboard:login')
+@replica_reads
 def index(request):
-    # Get real data from database for logged-in user only
-    low_stock_items = Item.objects.filter(user=request.user, stock__lt=20)
-    categories = Category.objects.filter(user=request.user)
-    
+    # Counts and totals come from the precomputed per-user rollup
+    # Low-stock panel reads the scanner's suggestions (see Dashboard.reorder);
+    # items restocked since its last pass drop out straight away
+    low_stock_items = request.user.reorder_suggestions.filter(item__stock__lt=F('item__reorder_level')).select_related('item')
+    categories = Category.objects.filter(user=request.user).select_related('metrics')
+    rollup = get_user_metrics(request.user)
+
     metrics = {
-        'total_items': Item.objects.filter(user=request.user).count(),
-        'categories': Category.objects.filter(user=request.user).count(),
-        'low_stock': low_stock_items.count(),
-        'total_value': Item.objects.filter(user=request.user).aggregate(total=Sum(F('stock') * F('price')))['total'] or 0
+        'total_items': rollup.total_items,
+        'categories': rollup.categories,
+        'low_stock': rollup.low_stock,
+        'total_value': rollup.total_value,
     }
     
     context = {
@@ -33,6 +49,8 @@ def index(request):
         'low_stock_items': low_stock_items,
         'metrics': metrics,
         'categories': categories,
+        # Fragment cache key; the querysets above only run on a cache miss
+        'data_version': caching.data_version(request.user.pk),
     }
     return render(request, 'Dashboard/index.html', context)
 
@@ -51,16 +69,8 @@ class ItemCreateView(CreateView):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Add New Item'
         
-        # Calculate and show next SN for this user
-        user_items = Item.objects.filter(user=self.request.user).order_by('-sn')
-        if user_items.exists():
-            try:
-                last_sn = int(user_items.first().sn)
-                next_sn = last_sn + 1
-            except (ValueError, TypeError):
-                next_sn = 1
-        else:
-            next_sn = 1
+        # Show the next SN from this user's sequence (not reserved until save)
+        next_sn = peek_next_sn(self.request.user.pk)
         
         context['next_sn'] = next_sn
         return context
@@ -68,21 +78,13 @@ class ItemCreateView(CreateView):
     def form_valid(self, form):
         form.instance.user = self.request.user
         
-        # Auto-generate SN for this user (per-user sequence: 1, 2, 3, 4...)
-        user_items = Item.objects.filter(user=self.request.user).order_by('-sn')
-        if user_items.exists():
-            # Get the highest numeric SN for this user and add 1
-            try:
-                last_sn = int(user_items.first().sn)
-                new_sn = last_sn + 1
-            except (ValueError, TypeError):
-                new_sn = 1
-        else:
-            # First item for this user gets SN 1
-            new_sn = 1
-        
-        form.instance.sn = str(new_sn)
-        response = super().form_valid(form)
+        # Allocate the SN from the per-user sequence (1, 2, 3, 4...); the
+        # allocation rolls back with the insert if saving fails
+        with db_transaction.atomic(using=tenant_db()):
+            new_sn = allocate_sn(self.request.user.pk)
+            form.instance.sn = str(new_sn)
+            response = super().form_valid(form)
+            stock.record_opening_stock(self.object)
         messages.success(self.request, f'Item added successfully! (SN: {new_sn})')
         return response
     
@@ -91,11 +93,14 @@ class ItemCreateView(CreateView):
             return redirect('dashboard:login')
         return super().dispatch(request, *args, **kwargs)
 
-class ItemListView(ListView):
+@method_decorator(replica_reads, name='dispatch')
+class ItemListView(KeysetPaginationMixin, ListView):
     model = Item
     template_name = 'Dashboard/items_list.html'
     context_object_name = 'items'
     paginate_by = 20
+    # pk follows the per-user SN sequence and avoids sorting SNs as text
+    keyset_ordering = ('pk',)
     
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -103,22 +108,23 @@ class ItemListView(ListView):
         return super().dispatch(request, *args, **kwargs)
     
     def get_queryset(self):
-        queryset = Item.objects.filter(user=self.request.user).order_by('sn')
-        # Add total_value as a property on each item
-        for item in queryset:
-            item.total_value = item.stock * item.price
-        return queryset
+        # total_value is computed in SQL for just the rows on the page
+        return Item.objects.filter(user=self.request.user).select_related('category', 'forecast').with_total_value()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'All Items'
+        context['data_version'] = caching.data_version(self.request.user.pk)
         return context
 
-class LowStockItemsView(ListView):
+@method_decorator(replica_reads, name='dispatch')
+class LowStockItemsView(KeysetPaginationMixin, ListView):
     model = Item
     template_name = 'Dashboard/items_list.html'
     context_object_name = 'items'
     paginate_by = 20
+    # pk follows the per-user SN sequence and avoids sorting SNs as text
+    keyset_ordering = ('pk',)
     
     def dispatch(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -126,15 +132,13 @@ class LowStockItemsView(ListView):
         return super().dispatch(request, *args, **kwargs)
     
     def get_queryset(self):
-        queryset = Item.objects.filter(user=self.request.user, stock__lt=20).order_by('sn')
-        # Add total_value as a property on each item
-        for item in queryset:
-            item.total_value = item.stock * item.price
-        return queryset
+        # total_value is computed in SQL for just the rows on the page
+        return Item.objects.filter(user=self.request.user).low_stock().select_related('category', 'forecast').with_total_value()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['title'] = 'Low Stock Items'
+        context['data_version'] = caching.data_version(self.request.user.pk)
         return context
 
 class ItemUpdateView(UpdateView):
@@ -162,25 +166,31 @@ class ItemUpdateView(UpdateView):
         return context
     
     def form_valid(self, form):
-        # Get the original item to compare stock
-        original_item = Item.objects.get(pk=self.object.pk)
-        original_stock = original_item.stock
-        new_stock = form.cleaned_data.get('stock')
-        stock_difference = original_stock - new_stock
-        
-        # If stock decreased, create a transaction record
-        if stock_difference > 0:
-            transaction_amount = stock_difference * original_item.price
-            Transaction.objects.create(
-                item=original_item,
-                amount=transaction_amount
-            )
-            messages.success(self.request, f'Item updated! Sold {stock_difference} units. Transaction recorded: Rs. {transaction_amount}')
+        # The stock field is applied as a change relative to the stock the
+        # form was rendered with, so concurrent edits and sales add up
+        # instead of overwriting each other
+        change = form.cleaned_data['stock'] - form.cleaned_data['original_stock']
+        item = form.save(commit=False)
+        sale = None
+        try:
+            with db_transaction.atomic(using=tenant_db()):
+                if change < 0:
+                    # Sold units are charged at the price before this edit
+                    sale = stock.sell(item, -change, amount=-change * form.initial['price'])
+                elif change > 0:
+                    stock.receive(item, change, note='Item edit')
+                # Save the other fields against the stock as it is now
+                item.refresh_from_db(fields=['stock'])
+                item.save(update_fields=[name for name in form.Meta.fields if name != 'stock'] + ['updated_at'])
+        except stock.InsufficientStock:
+            form.add_error('stock', 'Not enough stock left to sell that many units; reload the item and try again.')
+            return self.form_invalid(form)
+
+        if sale:
+            messages.success(self.request, f'Item updated! Sold {-change} units. Transaction recorded: Rs. {sale.amount}')
         else:
             messages.success(self.request, 'Item updated successfully!')
-        
-        response = super().form_valid(form)
-        return response
+        return redirect(self.get_success_url())
 
 class ItemDeleteView(DeleteView):
     model = Item
@@ -200,15 +210,50 @@ class ItemDeleteView(DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+@login_required(login_url='dashboard:login')
+def import_items(request):
+    """Queue a bulk import of items from an uploaded CSV/NDJSON file.
+
+    The run_jobs worker does the import; the page then follows the job
+    (``?job=<id>``) through its status endpoint.
+    """
+    if request.method == 'POST':
+        form = ItemImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            fmt = form.cleaned_data['format'] or detect_format(upload.name)
+            job = jobs.enqueue('import_items', request.user, path=jobs.save_upload(upload), format=fmt)
+            messages.success(request, f'Import queued (job #{job.pk}).')
+            return redirect(f"{reverse('dashboard:item_import')}?job={job.pk}")
+    else:
+        form = ItemImportForm()
+
+    job_id = request.GET.get('job', '')
+    context = {
+        'form': form,
+        'title': 'Import Items',
+        'job': Job.objects.filter(user=request.user, pk=job_id).first() if job_id.isdigit() else None,
+    }
+    return render(request, 'Dashboard/item_import.html', context)
+
+
 @login_required(login_url='dashboard:login')
 def record_transaction(request):
     """Record a new sales transaction."""
     if request.method == 'POST':
         form = TransactionForm(user=request.user, data=request.POST)
         if form.is_valid():
-            transaction = form.save()
-            messages.success(request, f'Transaction recorded: Rs. {transaction.amount}')
-            return redirect('dashboard:index')
+            try:
+                transaction = stock.sell(
+                    form.cleaned_data['item'],
+                    form.cleaned_data['quantity'],
+                    amount=form.cleaned_data['amount'],
+                )
+            except stock.InsufficientStock as exc:
+                form.add_error('quantity', f'Only {exc.available} in stock.')
+            else:
+                messages.success(request, f'Transaction recorded: Rs. {transaction.amount}')
+                return redirect('dashboard:index')
     else:
         form = TransactionForm(user=request.user)
     
@@ -220,72 +265,218 @@ def record_transaction(request):
 
 
 @login_required(login_url='dashboard:login')
+@replica_reads
 def transaction_list(request):
     """View all transactions for the logged-in user."""
-    transactions = Transaction.objects.filter(item__user=request.user).order_by('-created_at')
+    transactions = Transaction.objects.filter(user=request.user).select_related('item')
     
-    # Pagination
-    from django.core.paginator import Paginator
-    paginator = Paginator(transactions, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination: no OFFSET scan and no COUNT(*) over all transactions
+    paginator = KeysetPaginator(transactions, ['-created_at', '-pk'], 10)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    # Totals come from the yearly sales rollups
+    totals = sales.sales_totals(request.user)
     
     context = {
         'page_obj': page_obj,
         'transactions': page_obj,
+        'transaction_count': totals['count'],
+        'sum_transactions': totals['amount'],
+        'archived_until': archive.archived_until(request.user),
         'title': 'Sales Transactions'
     }
     return render(request, 'Dashboard/transaction_list.html', context)
 
 
+@login_required(login_url='dashboard:login')
+def export_data(request, kind):
+    """Stream the user's items or transactions as CSV/NDJSON.
+
+    GET parameters: format (csv|ndjson), category (id), start/end (YYYY-MM-DD),
+    archived (1 to include archived transactions).
+    """
+    if kind not in exporter.EXPORTS:
+        raise Http404
+    try:
+        filters = exporter.parse_filters(request.GET)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    fmt = filters.pop('format')
+
+    response = StreamingHttpResponse(exporter.EXPORTS[kind](request.user, fmt, **filters), content_type=exporter.CONTENT_TYPES[fmt])
+    filename = f"{kind}-{timezone.localdate():%Y%m%d}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required(login_url='dashboard:login')
+@require_POST
+def record_sales_batch(request):
+    """Record many sale lines from one JSON POST (point-of-sale terminals).
+
+    Body: {"lines": [{"item": <id>, "quantity": <n>, "amount": <optional>}, ...]}.
+    Responds with one result per line, in order; see stock.sell_batch.
+    """
+    try:
+        lines = json.loads(request.body)['lines']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'expected a JSON object with a "lines" list'}, status=400)
+    if not isinstance(lines, list):
+        return JsonResponse({'error': '"lines" must be a list'}, status=400)
+    if len(lines) > stock.MAX_BATCH_LINES:
+        return JsonResponse({'error': f'at most {stock.MAX_BATCH_LINES} lines per request'}, status=400)
+
+    results = stock.sell_batch(request.user, lines)
+    sold = sum(1 for result in results if result['ok'])
+    return JsonResponse({'sold': sold, 'failed': len(results) - sold, 'results': results})
+
+
+def _job_payload(job):
+    payload = jobs.describe(job)
+    payload['url'] = reverse('dashboard:job_status', args=[job.pk])
+    if job.task == 'export' and job.status == Job.SUCCEEDED:
+        payload['download'] = reverse('dashboard:job_download', args=[job.pk])
+    return payload
+
+
+@login_required(login_url='dashboard:login')
+def jobs_api(request):
+    """List the user's recent background jobs (GET) or queue one (POST).
+
+    Body: {"task": <one of jobs.USER_TASKS>, "params": {...}}. Exports take
+    kind (items|transactions), format, category, start/end and archived. Responds 202
+    with the job's status; poll its "url" for progress.
+    """
+    if request.method != 'POST':
+        recent = Job.objects.filter(user=request.user).order_by('-created_at')[:20]
+        return JsonResponse({'jobs': [_job_payload(job) for job in recent]})
+    try:
+        body = json.loads(request.body)
+        task, params = body['task'], body.get('params') or {}
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'expected a JSON object with a "task"'}, status=400)
+    if task not in jobs.USER_TASKS:
+        return JsonResponse({'error': f'task must be one of {", ".join(jobs.USER_TASKS)}'}, status=400)
+    if not isinstance(params, dict):
+        return JsonResponse({'error': '"params" must be an object'}, status=400)
+    if task == 'export':
+        kind = params.get('kind')
+        if not isinstance(kind, str) or kind not in exporter.EXPORTS:
+            return JsonResponse({'error': f'kind must be one of {", ".join(exporter.EXPORTS)}'}, status=400)
+        try:
+            exporter.parse_filters(params)
+        except ValueError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+        params = {key: params[key] for key in ('kind', 'format', 'category', 'start', 'end', 'archived') if params.get(key)}
+    else:
+        params = {}
+    job = jobs.enqueue(task, request.user, **params)
+    response = JsonResponse(_job_payload(job), status=202)
+    response['Location'] = reverse('dashboard:job_status', args=[job.pk])
+    return response
+
+
+@login_required(login_url='dashboard:login')
+def job_status(request, pk):
+    """JSON status and progress of one of the user's background jobs."""
+    return JsonResponse(_job_payload(get_object_or_404(Job, pk=pk, user=request.user)))
+
+
+@login_required(login_url='dashboard:login')
+def job_download(request, pk):
+    """Download the file written by a finished export job."""
+    job = get_object_or_404(Job, pk=pk, user=request.user, task='export', status=Job.SUCCEEDED)
+    try:
+        fileobj = open(jobs.job_file(job.result['file']), 'rb')
+    except FileNotFoundError:
+        raise Http404('The export file has been removed.')
+    filename = f"{job.result['kind']}-{job.created_at:%Y%m%d}.{job.result['format']}"
+    return FileResponse(fileobj, as_attachment=True, filename=filename, content_type=exporter.CONTENT_TYPES[job.result['format']])
+
+
+@login_required(login_url='dashboard:login')
+def search_items(request):
+    """JSON item search / typeahead: ?q=<words>&limit=<n>; every word matches as a prefix."""
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        return HttpResponseBadRequest('limit must be a number')
+    items = search.search_items(request.user, request.GET.get('q', ''), limit)
+    results = [
+        {
+            'id': item.pk,
+            'sn': item.sn,
+            'name': item.name,
+            'category': item.category.name if item.category else None,
+            'stock': item.stock,
+            'price': str(item.price),
+        }
+        for item in items
+    ]
+    return JsonResponse({'results': results})
+
+
+def _sales_etag(request):
+    period = sales.normalize_period(request.GET.get('period'))
+    return caching.sales_etag(request.user.pk, period, timezone.localdate())
+
+
+def _sales_last_modified(request):
+    return caching.sales_last_modified(request.user.pk)
+
+
+@login_required(login_url='dashboard:login')
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_sales_etag, last_modified_func=_sales_last_modified)
+@replica_reads
 def sales_data(request):
     """Return JSON sales data for requested period.
 
     Accepts GET parameter 'period' with values: weekly, monthly, yearly.
-    Aggregates amounts from the Transaction model. If no data exists,
-    returns zero-filled series for the selected period.
+    Reads the pre-aggregated SalesBucket rollups (at most 12 rows). If no
+    data exists, returns zero-filled series for the selected period.
+
+    Payloads are cached per (user, period, day, sales version) and carry an
+    ETag/Last-Modified, so a poll with a matching If-None-Match gets a 304
+    without running any sales query.
     """
-    from django.db.models import FloatField
-    from django.db.models.functions import Cast
-    
-    period = request.GET.get('period', 'monthly')
-    now = timezone.now()
-
-    if period == 'weekly':
-        # last 7 days - filter by user's transactions
-        end = now.date()
-        start = end - timezone.timedelta(days=6)
-        qs = Transaction.objects.filter(item__user=request.user, created_at__date__gte=start, created_at__date__lte=end)
-        # annotate by day
-        daily = qs.annotate(day=TruncDay('created_at')).values('day').annotate(total=Sum(Cast('amount', FloatField()))).order_by('day')
-        # build map date->total
-        totals_map = {entry['day'].date(): entry['total'] or 0.0 for entry in daily}
-        labels = []
-        data = []
-        for i in range(7):
-            d = start + timezone.timedelta(days=i)
-            labels.append(d.strftime('%a'))
-            data.append(totals_map.get(d, 0.0))
-        return JsonResponse({'labels': labels, 'data': data})
-
-    if period == 'monthly':
-        # current year months 1..12 - filter by user's transactions
-        year = now.year
-        qs = Transaction.objects.filter(item__user=request.user, created_at__year=year)
-        monthly = qs.annotate(month=TruncMonth('created_at')).values('month').annotate(total=Sum(Cast('amount', FloatField()))).order_by('month')
-        totals_map = {entry['month'].date().month: entry['total'] or 0.0 for entry in monthly}
-        labels = [timezone.datetime(year, m, 1).strftime('%b') for m in range(1, 13)]
-        data = [totals_map.get(m, 0.0) for m in range(1, 13)]
-        return JsonResponse({'labels': labels, 'data': data})
-
-    # yearly - filter by user's transactions
-    years = [now.year - i for i in range(4, -1, -1)]
-    qs = Transaction.objects.filter(item__user=request.user, created_at__year__in=years)
-    yearly = qs.annotate(y=TruncYear('created_at')).values('y').annotate(total=Sum(Cast('amount', FloatField()))).order_by('y')
-    totals_map = {entry['y'].date().year: entry['total'] or 0.0 for entry in yearly}
-    labels = [str(y) for y in years]
-    data = [totals_map.get(y, 0.0) for y in years]
-    return JsonResponse({'labels': labels, 'data': data})
+    period = sales.normalize_period(request.GET.get('period'))
+    today = timezone.localdate()
+
+    def build():
+        slots, rows = sales.chart_query(request.user, period, today)
+        return sales.chart_payload(slots, rows)
+
+    return JsonResponse(caching.cached_sales_payload(request.user.pk, period, today, build))
+
+
+@login_required(login_url='dashboard:login')
+def sales_analytics(request):
+    """JSON sales time series for any range.
+
+    GET parameters: start/end (ISO date or datetime; an end date is
+    inclusive; default the last 30 days), granularity (hour, day, week,
+    month, year; default the finest that fits), breakdown (category or
+    item) and top (number of categories/items kept, the rest is "Other").
+    See Dashboard.analytics.
+    """
+    params = request.GET
+    try:
+        end = analytics.parse_bound(params['end'], end=True) if params.get('end') else timezone.now()
+        start = analytics.parse_bound(params['start']) if params.get('start') else end - analytics.DEFAULT_RANGE
+        top = int(params.get('top', analytics.DEFAULT_TOP))
+        payload = analytics.sales_series(
+            request.user, start, end,
+            granularity=params.get('granularity') or None,
+            breakdown=params.get('breakdown') or None,
+            top=top,
+        )
+    except OverflowError:
+        # The default start reaches back before year 1
+        return JsonResponse({'error': 'start is before the first supported date'}, status=400)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(payload)
 
 
 def register_view(request):
@@ -20,15 +20,18 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.humanize',
     'Dashboard',
 ]
 
 MIDDLEWARE = [
+    'Dashboard.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'Dashboard.sharding.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -39,7 +42,6 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -47,6 +49,14 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are compiled once per process and kept in memory;
+            # the dev server's autoreloader still resets them on change
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -54,12 +64,86 @@ TEMPLATES = [
 WSGI_APPLICATION = 'IMS.wsgi.application'
 
 # Database
+# Production SQLite mode (set IMS_SQLITE_TUNED=0 for SQLite's defaults):
+# WAL journal, per-connection pragmas applied by Dashboard/sqlite_tuning.py,
+# persistent connections, and BEGIN IMMEDIATE so concurrent writers queue on
+# busy_timeout instead of failing with "database is locked".
+SQLITE_TUNED = os.environ.get('IMS_SQLITE_TUNED', '1') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB
+    'busy_timeout': 5000,  # ms
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+if SQLITE_TUNED:
+    DATABASES['default'].update({
+        'PRAGMAS': SQLITE_PRAGMAS,
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+    })
+
+# Tenant shards (see Dashboard/sharding.py): IMS_SHARDS=N spreads users'
+# inventory over the default database plus db-shard1.sqlite3 ...
+# db-shard<N-1>.sqlite3. Create them with "migrate --database shard<n>".
+SHARD_COUNT = int(os.environ.get('IMS_SHARDS', '1'))
+for n in range(1, SHARD_COUNT):
+    DATABASES[f'shard{n}'] = dict(DATABASES['default'], NAME=BASE_DIR / f'db-shard{n}.sqlite3')
+DASHBOARD_SHARDS = list(DATABASES)
+
+# Read replicas (see Dashboard/replicas.py): IMS_REPLICAS=1 gives every
+# database a read-only copy, <name>-replica.sqlite3, for the read-heavy
+# views. "refresh_replicas --loop" re-copies them every
+# REPLICA_REFRESH_SECONDS.
+REPLICA_REFRESH_SECONDS = 30
+REPLICA_MAX_LAG_SECONDS = 10 * REPLICA_REFRESH_SECONDS
+# How long a non-SQLite replica is assumed to lag behind its primary
+REPLICA_STICKY_SECONDS = 5
+DASHBOARD_REPLICAS = {}
+if os.environ.get('IMS_REPLICAS') == '1':
+    for alias in DASHBOARD_SHARDS:
+        primary = DATABASES[alias]
+        pragmas = {name: value for name, value in primary.get('PRAGMAS', {}).items() if name != 'journal_mode'}
+        DATABASES[f'{alias}_replica'] = dict(
+            primary,
+            NAME=primary['NAME'].with_name(f"{primary['NAME'].stem}-replica.sqlite3"),
+            PRAGMAS=dict(pragmas, query_only=1),
+            CONN_MAX_AGE=0,
+            OPTIONS={},
+            TEST={'MIRROR': alias},
+        )
+        DASHBOARD_REPLICAS[alias] = f'{alias}_replica'
+DATABASE_ROUTERS = ['Dashboard.replicas.ReplicaRouter', 'Dashboard.sharding.TenantRouter']
+
+# Files read and written by background jobs (uploaded imports, finished
+# exports); see Dashboard/jobs.py and "manage.py run_jobs"
+JOB_FILES_DIR = BASE_DIR / 'job_files'
+
+# "manage.py archive_transactions" moves transactions older than this many
+# days into per-year archive tables (see Dashboard/archive.py); the sales
+# summaries still count them
+TRANSACTION_ARCHIVE_AFTER_DAYS = 730
+
+# Cache for sales payloads and template fragments (per-process). Entries are
+# keyed by the per-user data/sales versions, which live in the database
+# (Dashboard.caching), so writes made by run_jobs or management commands
+# invalidate every process's entries. A shared backend such as Redis or
+# Memcached only saves each process building its own copies.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ims-default',
+    }
+}
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -100,6 +184,9 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Addresses allowed to scrape /metrics (staff users always can)
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
 # Email settings for password reset during development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'webmaster@localhost'
\ No newline at end of file
@@ -5,8 +5,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.contrib.auth import views as auth_views
 
+from Dashboard.instrumentation import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('Dashboard.urls', namespace='dashboard')),
 
     # Password reset (uses templates under Dashboard/templates/Dashboard/)